@@ -1,186 +1,183 @@
 import logging
-import threading
-import asyncio
 import time
-from typing import Any, Dict, List, Callable, Iterator
-
-import groq
-from google import genai
-from google.genai import types
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 from agents.registry import BaseAgent, AgentResult
-from config import GROQ_API_KEY, GEMINI_API_KEY, FAST_MODEL, SMART_MODEL
+from config import FAST_MODEL, SMART_MODEL
+from core.llm_router import Route, router
+from core.prompt_budget import PromptPacker, budget_for
+from core.response_cache import CachedResponse, response_cache
 
 logger = logging.getLogger(__name__)
 
-groq_client = groq.Groq(api_key=GROQ_API_KEY)
-gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-
 SYSTEM_PROMPT = (
     "You are Jarvis, a highly intelligent, concise assistant. "
     "Be direct and helpful. Use provided context when relevant."
 )
 
 
-def _build_system_prompt(memory_context: str, search_context: str, weather_context: str, intent: str) -> str:
-    parts = [SYSTEM_PROMPT]
-    if intent:
-        parts.append(f"Intent: {intent}")
-    if memory_context:
-        parts.append(memory_context)
-    if search_context:
-        parts.append(search_context)
-    if weather_context:
-        parts.append(weather_context)
-    return "\n\n".join(parts)
-
-_ERROR_SENTINEL = object()
-
+_SECTION_HEADERS = {
+    "weather": "",
+    "memory": "User memory context:",
+    "search": "Web search context:",
+}
 
-async def _stream_from_thread(iter_fn: Callable[[], Iterator[str]], on_token) -> str:
-    queue: asyncio.Queue[object] = asyncio.Queue()
-    loop = asyncio.get_running_loop()
 
-    def runner() -> None:
-        try:
-            for token in iter_fn():
-                loop.call_soon_threadsafe(queue.put_nowait, token)
-        except Exception as exc:
-            loop.call_soon_threadsafe(queue.put_nowait, (_ERROR_SENTINEL, exc))
-        finally:
-            loop.call_soon_threadsafe(queue.put_nowait, None)
-
-    threading.Thread(target=runner, daemon=True).start()
-
-    full = ""
-    while True:
-        item = await queue.get()
-        if item is None:
-            break
-        if isinstance(item, tuple) and item and item[0] is _ERROR_SENTINEL:
-            raise RuntimeError(str(item[1]))
-        token = item
-        full += token
-        await on_token(token)
-    return full
+def _pack_prompt(
+    model: str,
+    user_message: str,
+    intent: str,
+    sections: Dict[str, List[str]],
+    conversation_history: List[Dict[str, str]],
+) -> Tuple[str, List[Dict[str, str]], Dict[str, Any]]:
+    """Fit system prompt, context sections and history into the model's token budget."""
+    packer = PromptPacker(budget_for(model))
+    parts = [packer.fixed("system", SYSTEM_PROMPT)]
+    if intent:
+        parts.append(packer.fixed("system", f"Intent: {intent}"))
+    packer.fixed("user", user_message)
+    for name, header in _SECTION_HEADERS.items():
+        items = packer.items(name, sections.get(name) or [], header=header)
+        if not items:
+            continue
+        if header:
+            parts.append(header + "\n" + "\n".join(f"- {item}" for item in items))
+        else:
+            parts.append("\n".join(items))
+    history = packer.history(conversation_history)
+    return "\n\n".join(parts), history, packer.report()
+
+
+async def _consume_stream(tokens: AsyncIterator[str], on_token=None) -> str:
+    parts: List[str] = []
+    async with aclosing(tokens) as stream:
+        async for token in stream:
+            parts.append(token)
+            if on_token:
+                await on_token(token)
+    return "".join(parts)
+
+
+def _resolve_route(model: str, tier: str) -> Route:
+    """Map the orchestrator's model hint to a route; "auto" lets the router choose within `tier`."""
+    if model == "auto":
+        return router.pick(tier)
+    if model == "gemini":
+        return Route("gemini", SMART_MODEL)
+    if ":" in model:
+        provider, _, name = model.partition(":")
+        return Route(provider, name)
+    return Route("groq", FAST_MODEL)
 
 
 class ChatAgent(BaseAgent):
     name = "chat"
+    inputs = ("user_message", "classification", "memory", "search", "weather")
+    outputs = ("response",)
 
     async def run(self, context: Dict[str, Any]) -> AgentResult:
         user_message = context.get("user_message", "")
         conversation_history: List[Dict[str, str]] = context.get("conversation_history", [])
         model = context.get("model", "groq")
-        memory_context = context.get("memory_context", "")
-        search_context = context.get("search_context", "")
-        weather_context = context.get("weather_context", "")
+        sections = {
+            "memory": context.get("memory_items", []),
+            "search": context.get("search_items", []),
+            "weather": context.get("weather_items", []),
+        }
         intent = context.get("intent", "")
         stream_callback = context.get("stream_callback")
         start = time.perf_counter()
         status = "ok"
 
-        system_prompt = _build_system_prompt(memory_context, search_context, weather_context, intent)
-
-        if model == "gemini":
-            contents = []
-            for msg in conversation_history:
-                role = "user" if msg["role"] == "user" else "model"
-                contents.append(types.Content(role=role, parts=[types.Part(text=msg["content"])]))
-            contents.append(types.Content(role="user", parts=[types.Part(text=user_message)]))
-
-            full_response = ""
-            try:
-                if stream_callback:
-                    def _iter_gemini():
-                        stream = gemini_client.models.generate_content_stream(
-                            model=SMART_MODEL,
-                            contents=contents,
-                            config=types.GenerateContentConfig(
-                                system_instruction=system_prompt,
-                                max_output_tokens=1024,
-                            ),
-                        )
-                        for chunk in stream:
-                            if not chunk.candidates:
-                                continue
-                            for part in chunk.candidates[0].content.parts:
-                                if hasattr(part, "text") and part.text:
-                                    yield part.text
-
-                    full_response = await _stream_from_thread(_iter_gemini, stream_callback)
-                else:
-                    def _call_gemini() -> str:
-                        response = gemini_client.models.generate_content(
-                            model=SMART_MODEL,
-                            contents=contents,
-                            config=types.GenerateContentConfig(
-                                system_instruction=system_prompt,
-                                max_output_tokens=1024,
-                            ),
-                        )
-                        return response.candidates[0].content.parts[0].text if response.candidates else ""
-
-                    full_response = await asyncio.to_thread(_call_gemini)
-            except Exception as exc:
-                status = "error"
-                logger.warning("chat_agent gemini error: %s", exc)
-                full_response = ""
-
-            tokens = len(full_response.split())
-            result = AgentResult(
+        # Answers are replayed from cache through the same stream callback. The key
+        # covers everything the prompt is packed from, so "what is its population"
+        # only hits after the same conversation, memory and tool results.
+        cache_inputs = {
+            **sections,
+            "history": [f"{m.get('role', '')}:{m.get('content', '')}" for m in conversation_history],
+        }
+        cache_key = response_cache.key(user_message, intent, cache_inputs)
+        cached = response_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            full_response = await _consume_stream(response_cache.replay(cached.text), stream_callback)
+            latency_ms = int((time.perf_counter() - start) * 1000)
+            saved_ms = response_cache.record_saving(cached, latency_ms)
+            logger.info("agent=%s status=cache_hit latency_ms=%s saved_ms=%s", self.name, latency_ms, saved_ms)
+            return AgentResult(
                 agent_name=self.name,
-                data={"full_response": full_response, "model_used": SMART_MODEL, "tokens": tokens},
-                error=None if status == "ok" else "gemini_stream_failed",
+                data={
+                    "full_response": full_response,
+                    "model_used": cached.model,
+                    "provider": cached.provider,
+                    "tokens": len(full_response.split()),
+                    "prompt": {},
+                    "hedge": {},
+                    "cache": self._cache_info(True, saved_ms),
+                },
+                error=None,
                 latency_ms=0,
             )
-            latency_ms = int((time.perf_counter() - start) * 1000)
-            logger.info("agent=%s status=%s latency_ms=%s", self.name, status, latency_ms)
-            return result
+
+        route = _resolve_route(model, context.get("tier", "fast"))
+        system_prompt, conversation_history, prompt_report = _pack_prompt(
+            route.model,
+            user_message,
+            intent,
+            sections,
+            conversation_history,
+        )
 
         messages = [{"role": "system", "content": system_prompt}]
         messages.extend(conversation_history)
         messages.append({"role": "user", "content": user_message})
 
+        # Hedged: a second provider starts if this one is slow to its first token or fails.
+        hedge: Dict[str, Any] = {}
+        secondary = router.hedge_partner(route, context.get("tier", "fast"))
         full_response = ""
         try:
-            if stream_callback:
-                def _iter_groq():
-                    stream = groq_client.chat.completions.create(
-                        model=FAST_MODEL,
-                        messages=messages,
-                        stream=True,
-                        max_tokens=1024,
-                    )
-                    for chunk in stream:
-                        delta = chunk.choices[0].delta if chunk.choices else None
-                        if not delta or not delta.content:
-                            continue
-                        yield delta.content
-
-                full_response = await _stream_from_thread(_iter_groq, stream_callback)
-            else:
-                def _call_groq() -> str:
-                    response = groq_client.chat.completions.create(
-                        model=FAST_MODEL,
-                        messages=messages,
-                        max_tokens=1024,
-                    )
-                    return response.choices[0].message.content or ""
-
-                full_response = await asyncio.to_thread(_call_groq)
+            full_response = await _consume_stream(
+                router.hedged_stream(route, secondary, messages, max_tokens=1024, info=hedge),
+                stream_callback,
+            )
         except Exception as exc:
             status = "error"
-            logger.warning("chat_agent groq error: %s", exc)
+            logger.warning("chat_agent %s error: %s", route.provider, exc)
             full_response = ""
 
         tokens = len(full_response.split())
+        generation_ms = int((time.perf_counter() - start) * 1000)
+        if cache_key and status == "ok" and full_response.strip():
+            response_cache.set(
+                cache_key,
+                CachedResponse(full_response, generation_ms, hedge.get("model", route.model), hedge.get("provider", route.provider)),
+                has_context=any(cache_inputs.values()),
+            )
         result = AgentResult(
             agent_name=self.name,
-            data={"full_response": full_response, "model_used": FAST_MODEL, "tokens": tokens},
-            error=None if status == "ok" else "groq_stream_failed",
+            data={
+                "full_response": full_response,
+                "model_used": hedge.get("model", route.model),
+                "provider": hedge.get("provider", route.provider),
+                "tokens": tokens,
+                "prompt": prompt_report,
+                "hedge": {**hedge, **{k: v for k, v in router.hedge_summary().items() if k.endswith("_rate")}},
+                "cache": self._cache_info(False, 0) if cache_key else {"eligible": False},
+            },
+            error=None if status == "ok" else f"{route.provider}_stream_failed",
             latency_ms=0,
         )
-        latency_ms = int((time.perf_counter() - start) * 1000)
-        logger.info("agent=%s status=%s latency_ms=%s", self.name, status, latency_ms)
+        logger.info("agent=%s status=%s latency_ms=%s", self.name, status, generation_ms)
         return result
+
+    @staticmethod
+    def _cache_info(hit: bool, saved_ms: int) -> Dict[str, Any]:
+        stats = response_cache.stats()
+        return {
+            "eligible": True,
+            "hit": hit,
+            "saved_ms": saved_ms,
+            "hit_rate": stats["hit_rate"],
+            "total_saved_ms": stats["saved_ms"],
+        }
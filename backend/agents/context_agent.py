@@ -4,15 +4,14 @@ import logging
 import time
 from typing import Any, Dict
 
-import groq
-
+from agents.intent_rules import classify, normalize_message
 from agents.registry import BaseAgent, AgentResult
-from config import GROQ_API_KEY, FAST_MODEL, CONTEXT_LLM_TIMEOUT_S
+from config import FAST_MODEL, CONTEXT_LLM_TIMEOUT_S, CONTEXT_CACHE_MAX_ENTRIES, CONTEXT_CACHE_TTL_S
+from core.cache import TTLCache
+from core.llm_client import llm_client
 
 logger = logging.getLogger(__name__)
 
-groq_client = groq.Groq(api_key=GROQ_API_KEY)
-
 
 SYSTEM_PROMPT = (
     "Classify the user message and return JSON only with keys: "
@@ -26,26 +25,48 @@ SYSTEM_PROMPT = (
 
 class ContextAgent(BaseAgent):
     name = "context"
+    inputs = ("user_message",)
+    outputs = ("classification",)
+
+    def __init__(self) -> None:
+        self.cache = TTLCache(max_entries=CONTEXT_CACHE_MAX_ENTRIES, ttl_s=CONTEXT_CACHE_TTL_S)
+
+    def _finish(self, start: float, data: Dict[str, Any], source: str) -> AgentResult:
+        data = dict(data)
+        data["_source"] = source
+        data["_cache"] = {"hits": self.cache.hits, "misses": self.cache.misses}
+        latency_ms = int((time.perf_counter() - start) * 1000)
+        logger.info("agent=%s status=ok source=%s latency_ms=%s", self.name, source, latency_ms)
+        return AgentResult(agent_name=self.name, data=data, error=None, latency_ms=0)
 
     async def run(self, context: Dict[str, Any]) -> AgentResult:
         user_message = context.get("user_message", "")
         start = time.perf_counter()
         status = "ok"
 
-        def _call_llm() -> str:
-            response = groq_client.chat.completions.create(
-                model=FAST_MODEL,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_message},
-                ],
-                max_tokens=200,
-                temperature=0.1,
-            )
-            return response.choices[0].message.content or ""
+        key = normalize_message(user_message)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self._finish(start, cached, "cache")
+
+        ruled = classify(user_message)
+        if ruled is not None:
+            self.cache.set(key, ruled)
+            return self._finish(start, ruled, "rules")
 
         try:
-            raw = await asyncio.wait_for(asyncio.to_thread(_call_llm), timeout=CONTEXT_LLM_TIMEOUT_S)
+            raw = await asyncio.wait_for(
+                llm_client.complete(
+                    [
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": user_message},
+                    ],
+                    model=FAST_MODEL,
+                    max_tokens=200,
+                    temperature=0.1,
+                ),
+                timeout=CONTEXT_LLM_TIMEOUT_S,
+            )
             try:
                 data = json.loads(raw)
             except json.JSONDecodeError:
@@ -55,6 +76,8 @@ class ContextAgent(BaseAgent):
                     data = json.loads(raw[start_idx : end_idx + 1])
                 else:
                     raise
+            if key:
+                self.cache.set(key, dict(data))
         except Exception as exc:
             logger.warning("context_agent error: %s", exc)
             status = "error"
@@ -67,6 +90,8 @@ class ContextAgent(BaseAgent):
                 "suggested_model": "groq",
                 "_error": error_msg,
             }
+        data["_source"] = "llm" if status == "ok" else "fallback"
+        data["_cache"] = {"hits": self.cache.hits, "misses": self.cache.misses}
 
         latency_ms = int((time.perf_counter() - start) * 1000)
         logger.info("agent=%s status=%s latency_ms=%s", self.name, status, latency_ms)
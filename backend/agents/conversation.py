@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from agents.registry import registry
+from config import AGENT_TIMEOUT_SUMMARY, SUMMARY_CHUNK_MESSAGES, SUMMARY_MAX_RAW_MESSAGES, SUMMARY_MERGE_FANOUT
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationState:
+    """One session's history: recent messages verbatim plus rolling summaries of older ones.
+
+    levels[0] holds summaries of SUMMARY_CHUNK_MESSAGES raw messages each;
+    once a level collects SUMMARY_MERGE_FANOUT entries they are merged into a
+    single entry one level up. Every message and every summary is therefore
+    summarized exactly once. Compaction runs as a background task between
+    turns and swaps its result in with a single synchronous update, so
+    history() always sees either the old or the new state, never a mix.
+    """
+
+    def __init__(
+        self,
+        max_raw: int = SUMMARY_MAX_RAW_MESSAGES,
+        chunk_size: int = SUMMARY_CHUNK_MESSAGES,
+        fanout: int = SUMMARY_MERGE_FANOUT,
+    ) -> None:
+        self.max_raw = max_raw
+        self.chunk_size = chunk_size
+        self.fanout = fanout
+        self._messages: List[Dict[str, str]] = []
+        self._levels: List[List[str]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"chunks": 0, "merges": 0, "errors": 0}
+
+    def history(self) -> List[Dict[str, str]]:
+        """Snapshot handed to the orchestrator: one summary message (if any) + raw messages."""
+        summaries = [s for level in reversed(self._levels) for s in level]
+        history: List[Dict[str, str]] = []
+        if summaries:
+            history.append({"role": "system", "content": "Summary so far: " + "\n\n".join(summaries)})
+        history.extend(self._messages)
+        return history
+
+    def append_turn(self, user_message: str, assistant_response: str) -> None:
+        self._messages.append({"role": "user", "content": user_message})
+        self._messages.append({"role": "assistant", "content": assistant_response})
+
+    def needs_compaction(self) -> bool:
+        return len(self._messages) > self.max_raw
+
+    def schedule_compaction(self) -> None:
+        if not self.needs_compaction() or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._compact())
+        self._task.add_done_callback(self._log_error)
+
+    @staticmethod
+    def _log_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("conversation compaction failed: %s", task.exception())
+
+    async def _summarize(self, context: Dict) -> Optional[str]:
+        result = await registry.run_agent("summarizer", context, timeout_s=AGENT_TIMEOUT_SUMMARY)
+        summary = (result.data or {}).get("summary", "")
+        if result.error or not summary:
+            self.stats["errors"] += 1
+            return None
+        return summary
+
+    async def _compact(self) -> None:
+        while self.needs_compaction():
+            # Only this task removes messages and turns only append, so the
+            # chunk is still the head of the list when the summary comes back.
+            chunk = self._messages[: self.chunk_size]
+            summary = await self._summarize({"mode": "chunk", "messages": chunk})
+            if summary is None:
+                # Keep the raw messages; the next turn retries.
+                return
+            del self._messages[: len(chunk)]
+            self._push(0, summary)
+            self.stats["chunks"] += 1
+            await self._merge_levels()
+
+    async def _merge_levels(self) -> None:
+        level = 0
+        while level < len(self._levels):
+            if len(self._levels[level]) < self.fanout:
+                level += 1
+                continue
+            group = self._levels[level][: self.fanout]
+            merged = await self._summarize({"mode": "merge", "summaries": group})
+            if merged is None:
+                return
+            del self._levels[level][: len(group)]
+            self._push(level + 1, merged)
+            self.stats["merges"] += 1
+
+    def _push(self, level: int, summary: str) -> None:
+        while len(self._levels) <= level:
+            self._levels.append([])
+        self._levels[level].append(summary)
+
+    async def aclose(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
@@ -0,0 +1,134 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from config import FAST_MODEL_WORD_THRESHOLD
+
+# Local pre-classifier for ContextAgent. Only answers when exactly one rule
+# family matches; anything ambiguous is left to the LLM.
+
+_GREETING_RE = re.compile(
+    r"^(hi|hello|hey|hiya|yo|sup|howdy|good (morning|afternoon|evening|night)|"
+    r"thanks|thank you|thx|what'?s up|how are you|how's it going)"
+    r"( there)?( jarvis)?$"
+)
+_WEATHER_RE = re.compile(r"\b(weather|forecast|temperature|humidity|how (hot|cold|warm) is it)\b")
+# Condition words that are also ordinary nouns ("Purple Rain", "snow White") only count
+# as weather next to a second signal: a place, a time, or a question about conditions.
+_WEATHER_WORD_RE = re.compile(r"\b(raining|rain|rainy|snowing|snow|humid|sunny|umbrella)\b")
+_WEATHER_CUE_RE = re.compile(
+    r"\b(will it|is it|gonna|going to|should i (bring|take|wear)|do i need|"
+    r"today|tonight|tomorrow|now|later|this (morning|afternoon|evening|week|weekend))\b"
+)
+_MEMORY_RE = re.compile(
+    r"\b(do you remember|what do you know about me|remember (that|when)|"
+    r"what(?:'s| is| are) my|did i (tell|mention)|what did i say)\b"
+)
+_SEARCH_RE = re.compile(
+    r"\b(search for|look up|google|latest|news|headlines|who won|current price|"
+    r"stock price|price of|score of|release date|happening (today|now))\b"
+)
+_CITY_NAME = r"[A-Z][a-zA-Z'\-]+(?:\s+[A-Z][a-zA-Z'\-]+){0,2}"
+_CITY_RE = re.compile(rf"\b(?:in|at|for|of)\s+({_CITY_NAME}(?:\s*(?:,|and|or|vs)\s*{_CITY_NAME})*)")
+_CITY_SPLIT_RE = re.compile(r"\s*(?:,|\band\b|\bor\b|\bvs\b)\s*")
+_LOWER_CITY_RE = re.compile(
+    r"\b(?:in|at|for)\s+(?!(?:the|my|this|next|a|an|me|us)\b)([a-z][a-z'\- ]+?)"
+    r"(?:\s+(?:right now|today|tomorrow|now|tonight|this week(?:end)?))?$"
+)
+_NON_CITY = {"The", "Celsius", "Fahrenheit", "Today", "Tomorrow", "Monday", "Tuesday", "Wednesday",
+             "Thursday", "Friday", "Saturday", "Sunday", "January", "February", "March", "April",
+             "May", "June", "July", "August", "September", "October", "November", "December"}
+
+
+def normalize_message(message: str) -> str:
+    text = message.lower().strip()
+    text = re.sub(r"[^\w\s']", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def extract_cities(message: str) -> List[str]:
+    cities: List[str] = []
+    for match in _CITY_RE.finditer(message):
+        for name in _CITY_SPLIT_RE.split(match.group(1)):
+            words = [w for w in name.split() if w not in _NON_CITY]
+            if words:
+                cities.append(" ".join(words))
+    if not cities:
+        match = _LOWER_CITY_RE.search(normalize_message(message))
+        if match:
+            cities.append(match.group(1).strip().title())
+    return list(dict.fromkeys(cities))
+
+
+def _is_weather(normalized: str, message: str) -> bool:
+    if _WEATHER_RE.search(normalized):
+        return True
+    if not _WEATHER_WORD_RE.search(normalized):
+        return False
+    return bool(_WEATHER_CUE_RE.search(normalized) or extract_cities(message))
+
+
+def classify(message: str) -> Optional[Dict[str, Any]]:
+    normalized = normalize_message(message)
+    if not normalized:
+        return None
+
+    if _GREETING_RE.match(normalized):
+        return {
+            "intent": "greeting",
+            "needs_tools": [],
+            "complexity": "simple",
+            "entities": [],
+            "suggested_model": "groq",
+        }
+
+    matches = [
+        name
+        for name, hit in (
+            ("weather", _is_weather(normalized, message)),
+            ("memory", bool(_MEMORY_RE.search(normalized))),
+            ("search", bool(_SEARCH_RE.search(normalized))),
+        )
+        if hit
+    ]
+    if len(matches) != 1:
+        return None
+
+    is_complex = len(normalized.split()) > FAST_MODEL_WORD_THRESHOLD
+    complexity = "complex" if is_complex else "simple"
+
+    if matches[0] == "weather":
+        return {
+            "intent": "weather_query",
+            "needs_tools": ["weather"],
+            "complexity": "simple",
+            "entities": extract_cities(message),
+            "suggested_model": "groq",
+        }
+    if matches[0] == "memory":
+        return {
+            "intent": "memory_query",
+            "needs_tools": ["memory"],
+            "complexity": complexity,
+            "entities": [],
+            "suggested_model": "gemini" if is_complex else "groq",
+        }
+    return {
+        "intent": "search_needed",
+        "needs_tools": ["web_search"],
+        "complexity": complexity,
+        "entities": [],
+        "suggested_model": "gemini" if is_complex else "groq",
+    }
+
+
+def likely_tools(message: str) -> List[str]:
+    """Cheap signal for speculative tool runs; unlike classify() it may return several."""
+    normalized = normalize_message(message)
+    if not normalized or _GREETING_RE.match(normalized):
+        return []
+    tools = []
+    if _SEARCH_RE.search(normalized):
+        tools.append("search")
+    if _is_weather(normalized, message):
+        tools.append("weather")
+    return tools
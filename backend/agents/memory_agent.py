@@ -1,11 +1,10 @@
-import asyncio
 import logging
 import time
 from typing import Dict, Any, List
 
 from agents.registry import BaseAgent, AgentResult
-from memory.mem0_client import search_memory_list, get_recent_memories
-from config import AGENT_TIMEOUT_PREFLIGHT
+from memory.backend import get_memory_backend
+from config import USER_ID
 
 logger = logging.getLogger(__name__)
 
@@ -22,45 +21,24 @@ def _dedupe(items: List[str]) -> List[str]:
     return result
 
 
-def _cap_tokens(items: List[str], max_tokens: int = 800) -> List[str]:
-    # Approximate: 1 token ~= 1 word
-    count = 0
-    capped = []
-    for item in items:
-        words = item.split()
-        if count + len(words) > max_tokens:
-            break
-        capped.append(item)
-        count += len(words)
-    return capped
-
-
 class MemoryAgent(BaseAgent):
     name = "memory"
+    inputs = ("user_message",)
+    outputs = ("memory",)
 
     async def run(self, context: Dict[str, Any]) -> AgentResult:
         user_message = context.get("user_message", "")
+        user_id = context.get("user_id", USER_ID)
         start = time.perf_counter()
         status = "ok"
         try:
-            relevant_task = asyncio.wait_for(
-                asyncio.to_thread(search_memory_list, user_message, 5),
-                timeout=AGENT_TIMEOUT_PREFLIGHT,
-            )
-            recent_task = asyncio.wait_for(
-                asyncio.to_thread(get_recent_memories, 3),
-                timeout=AGENT_TIMEOUT_PREFLIGHT,
-            )
-            relevant, recent = await asyncio.gather(relevant_task, recent_task, return_exceptions=True)
-
-            if isinstance(relevant, Exception):
-                relevant = []
-            if isinstance(recent, Exception):
-                recent = []
+            hits = await get_memory_backend().retrieve(user_message, user_id, limit=5, recent=3)
+            relevant, recent, source = hits.relevant, hits.recent, hits.source
 
             relevant = _dedupe(relevant or [])
             recent = _dedupe(recent or [])
-            all_memories = _cap_tokens(_dedupe(relevant + recent), max_tokens=800)
+            # Relevant first; the chat prompt packer trims from the end to fit its budget.
+            all_memories = _dedupe(relevant + recent)
 
             formatted = ""
             if all_memories:
@@ -71,7 +49,9 @@ class MemoryAgent(BaseAgent):
                 data={
                     "relevant_memories": relevant,
                     "recent_memories": recent,
+                    "items": all_memories,
                     "formatted": formatted,
+                    "source": source,
                 },
                 error=None,
                 latency_ms=0,
@@ -81,7 +61,7 @@ class MemoryAgent(BaseAgent):
             status = "error"
             result = AgentResult(
                 agent_name=self.name,
-                data={"relevant_memories": [], "recent_memories": [], "formatted": ""},
+                data={"relevant_memories": [], "recent_memories": [], "items": [], "formatted": ""},
                 error=str(exc),
                 latency_ms=0,
             )
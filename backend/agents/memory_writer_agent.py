@@ -1,22 +1,20 @@
-import asyncio
 import json
 import logging
 import time
 from typing import Any, Dict
 
-import groq
-
 from agents.registry import BaseAgent, AgentResult
-from config import GROQ_API_KEY, FAST_MODEL, USER_ID
-from memory.mem0_client import store_memory
+from config import FAST_MODEL, USER_ID
+from core.llm_client import llm_client
+from memory.backend import get_memory_backend
 
 logger = logging.getLogger(__name__)
 
-groq_client = groq.Groq(api_key=GROQ_API_KEY)
-
 
 class MemoryWriterAgent(BaseAgent):
     name = "memory_writer"
+    inputs = ("user_message", "response")
+    outputs = ()
 
     async def run(self, context: Dict[str, Any]) -> AgentResult:
         user_message = context.get("user_message", "")
@@ -32,26 +30,22 @@ class MemoryWriterAgent(BaseAgent):
             "Do NOT store questions, greetings, or chit-chat."
         )
 
-        def _call_llm() -> str:
-            response = groq_client.chat.completions.create(
-                model=FAST_MODEL,
-                messages=[
+        try:
+            raw = await llm_client.complete(
+                [
                     {"role": "system", "content": prompt},
                     {"role": "user", "content": f"User: {user_message}\nAssistant: {assistant_response}"},
                 ],
+                model=FAST_MODEL,
                 max_tokens=120,
                 temperature=0.1,
             )
-            return response.choices[0].message.content or ""
-
-        try:
-            raw = await asyncio.to_thread(_call_llm)
             data = json.loads(raw)
             should_store = bool(data.get("store"))
             memory_text = (data.get("memory") or "").strip()
 
             if should_store and memory_text:
-                await asyncio.to_thread(store_memory, [{"role": "user", "content": memory_text}], user_id)
+                await get_memory_backend().add(memory_text, user_id)
                 result = AgentResult(agent_name=self.name, data={"stored": True, "memory_summary": memory_text}, error=None, latency_ms=0)
                 latency_ms = int((time.perf_counter() - start) * 1000)
                 logger.info("agent=%s status=%s latency_ms=%s", self.name, status, latency_ms)
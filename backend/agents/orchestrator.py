@@ -1,23 +1,63 @@
 import asyncio
 import logging
-import json
+import time
+from contextlib import aclosing
 from typing import Any, Dict, List, Tuple
 
-from agents.registry import registry, AgentResult
+from agents.intent_rules import extract_cities, likely_tools
+from agents.registry import registry, AgentResult, GraphNode, NodeRun
 from agents.memory_agent import MemoryAgent
 from agents.context_agent import ContextAgent
-from agents.search_agent import SearchAgent
-from agents.weather_agent import WeatherAgent
+from agents.search_agent import SearchAgent, build_queries
+from agents.weather_agent import WeatherAgent, resolve_cities
 from agents.summarization_agent import SummarizationAgent
 from agents.chat_agent import ChatAgent
 from agents.memory_writer_agent import MemoryWriterAgent
-from config import AGENT_TIMEOUT_PREFLIGHT, AGENT_TIMEOUT_TOOLS, AGENT_TIMEOUT_SUMMARY, USER_ID
+from config import AGENT_TIMEOUT_PREFLIGHT, AGENT_TIMEOUT_TOOLS, ROUTER_ENABLED, SPECULATIVE_TOOLS_ENABLED, USER_ID
+from core.metrics import turn_phase_latency
+from core.tracing import tracer
+from tools.weather import normalize_city
 
 logger = logging.getLogger(__name__)
 
 
-def _result_map(results: List[AgentResult]) -> Dict[str, AgentResult]:
-    return {r.agent_name: r for r in results}
+# Intents whose answers do not depend on who the user is; chat skips waiting for memory.
+_MEMORY_OPTIONAL_INTENTS = {"greeting", "question_factual", "search_needed", "weather_query"}
+
+
+def _data(blackboard: Dict[str, Any], key: str) -> Dict[str, Any]:
+    result = blackboard.get(key)
+    return (result.data or {}) if result is not None else {}
+
+
+def _wants_tool(classification: Dict[str, Any], name: str) -> bool:
+    needs_tools = classification.get("needs_tools", []) or []
+    intent = classification.get("intent", "casual_chat")
+    if name == "search":
+        return "web_search" in needs_tools or intent == "search_needed"
+    if name == "weather":
+        return "weather" in needs_tools or intent == "weather_query"
+    return False
+
+
+def _memory_relevant(classification: Dict[str, Any]) -> bool:
+    if "memory" in (classification.get("needs_tools", []) or []):
+        return True
+    return classification.get("intent", "casual_chat") not in _MEMORY_OPTIONAL_INTENTS
+
+
+def _suggested_model(classification: Dict[str, Any]) -> str:
+    intent = classification.get("intent", "casual_chat")
+    if intent in {"greeting", "casual_chat"} or classification.get("complexity") == "simple":
+        return "groq"
+    return classification.get("suggested_model", "groq")
+
+
+def _tool_key(name: str, user_message: str, entities: List[str]) -> Any:
+    # Two tool runs are interchangeable when they would hit the same upstream requests.
+    if name == "search":
+        return tuple(build_queries(user_message, entities, None))
+    return tuple(sorted(normalize_city(c) for c in resolve_cities(entities, user_message)))
 
 
 class JarvisOrchestrator:
@@ -29,110 +69,202 @@ class JarvisOrchestrator:
         registry.register(SummarizationAgent())
         registry.register(ChatAgent())
         registry.register(MemoryWriterAgent())
+        self._speculation_stats = {"started": 0, "hits": 0, "wasted": 0}
 
-    async def process(self, user_message: str, conversation_history: List[Dict[str, str]], stream_callback=None) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, str]]]:
-        trace: List[Dict[str, Any]] = []
+    def _speculate(self, user_message: str) -> Dict[str, Tuple[Any, "asyncio.Task[AgentResult]"]]:
+        if not SPECULATIVE_TOOLS_ENABLED:
+            return {}
+        entities = extract_cities(user_message)
+        started = {}
+        for name in likely_tools(user_message):
+            if name == "weather" and not entities:
+                continue
+            task = asyncio.create_task(
+                registry.run_agent(name, {"user_message": user_message, "entities": entities, "memory_context": ""}, timeout_s=AGENT_TIMEOUT_PREFLIGHT + AGENT_TIMEOUT_TOOLS)
+            )
+            started[name] = (_tool_key(name, user_message, entities), task)
+        self._speculation_stats["started"] += len(started)
+        return started
 
-        # Phase 1: preflight
-        preflight_results = await registry.run_parallel(
-            ["memory", "context"],
-            {"user_message": user_message, "conversation_history": conversation_history, "user_id": USER_ID},
-            timeout_s=AGENT_TIMEOUT_PREFLIGHT,
-        )
-        preflight_map = _result_map(preflight_results)
+    def _speculation_trace(self, started: List[str], used: List[str], wasted: List[str]) -> Dict[str, Any]:
+        stats = self._speculation_stats
+        return {
+            "agent": "speculation",
+            "duration_ms": 0,
+            "status": "ok" if started else "skipped",
+            "skipped": not started,
+            "started": started,
+            "used": used,
+            "wasted": wasted,
+            "hit_rate": round(stats["hits"] / stats["started"], 3) if stats["started"] else 0.0,
+            "waste_rate": round(stats["wasted"] / stats["started"], 3) if stats["started"] else 0.0,
+        }
 
-        for name in ["memory", "context"]:
-            res = preflight_map.get(name)
-            trace.append({"agent": name, "duration_ms": res.latency_ms if res else 0, "status": "error" if res and res.error else "ok", "skipped": False})
+    def _resolve_speculation(self, speculative, kept, user_message: str, classification: Dict[str, Any]) -> Dict[str, Any]:
+        entities = classification.get("entities", []) or []
+        used, wasted = [], []
+        for name, (key, task) in speculative.items():
+            if _wants_tool(classification, name) and key == _tool_key(name, user_message, entities):
+                used.append(name)
+                kept[name] = task
+            else:
+                wasted.append(name)
+                task.cancel()
+        self._speculation_stats["hits"] += len(used)
+        self._speculation_stats["wasted"] += len(wasted)
+        return self._speculation_trace(list(speculative), used, wasted)
 
-        memory_context = (preflight_map.get("memory") or AgentResult("memory")).data or {}
-        context_data = (preflight_map.get("context") or AgentResult("context")).data or {}
+    async def _run_tool(self, name: str, kept, blackboard: Dict[str, Any], context: Dict[str, Any]) -> AgentResult:
+        task = kept.pop(name, None)
+        if task is not None:
+            return await task
+        return await registry.run_agent(name, context, timeout_s=AGENT_TIMEOUT_TOOLS)
 
-        # Phase 2: conditional agents
-        needs_tools = context_data.get("needs_tools", []) or []
-        intent = context_data.get("intent", "casual_chat")
-        entities = context_data.get("entities", []) or []
-        suggested_model = context_data.get("suggested_model", "groq")
-        if intent in {"greeting", "casual_chat"} or context_data.get("complexity") == "simple":
-            suggested_model = "groq"
-
-        phase2_agents = []
-        if "web_search" in needs_tools or intent == "search_needed":
-            phase2_agents.append("search")
-        if "weather" in needs_tools or intent == "weather_query":
-            phase2_agents.append("weather")
-
-        phase2_results = []
-        if phase2_agents:
-            phase2_results = await registry.run_parallel(
-                phase2_agents,
-                {"user_message": user_message, "entities": entities, "memory_context": memory_context.get("formatted", "")},
-                timeout_s=AGENT_TIMEOUT_TOOLS,
-            )
+    def _chat_context(self, bb: Dict[str, Any], stream_callback) -> Dict[str, Any]:
+        classification = _data(bb, "classification")
+        weather = _data(bb, "weather")
+        return {
+            "user_message": bb["user_message"],
+            "conversation_history": bb["conversation_history"],
+            "model": "auto" if ROUTER_ENABLED else _suggested_model(classification),
+            "tier": "smart" if _suggested_model(classification) == "gemini" else "fast",
+            "memory_items": _data(bb, "memory").get("items", []),
+            # URL ahead of the snippet so budget truncation only ever shortens the snippet.
+            "search_items": [f"{r['title']} ({r['url']}): {r['snippet']}" for r in _data(bb, "search").get("results", [])],
+            "weather_items": [
+                f"Weather context for {w.get('city', '')}: {w.get('summary')} {w.get('recommendation', '')}"
+                for w in weather.get("cities") or [weather]
+                if w.get("summary")
+            ],
+            "intent": classification.get("intent", "casual_chat"),
+            "stream_callback": stream_callback,
+        }
 
-        phase2_map = _result_map(phase2_results)
-        for name in ["search", "weather"]:
-            if name in phase2_map:
-                res = phase2_map[name]
-                trace.append({"agent": name, "duration_ms": res.latency_ms, "status": "error" if res.error else "ok", "skipped": False})
-            else:
-                trace.append({"agent": name, "duration_ms": 0, "status": "skipped", "skipped": True})
-
-        # Phase 3: summarization
-        if len(conversation_history) > 16:
-            summary_result = await registry.run_agent("summarizer", {"conversation_history": conversation_history, "max_turns": 16}, timeout_s=AGENT_TIMEOUT_SUMMARY)
-            trace.append({"agent": "summarizer", "duration_ms": summary_result.latency_ms, "status": "error" if summary_result.error else "ok", "skipped": False})
-            conversation_history = summary_result.data.get("new_history", conversation_history)
-        else:
-            trace.append({"agent": "summarizer", "duration_ms": 0, "status": "skipped", "skipped": True})
-
-        # Phase 4: chat synthesis
-        search_context = (phase2_map.get("search") or AgentResult("search")).data or {}
-        weather_context = (phase2_map.get("weather") or AgentResult("weather")).data or {}
-
-        weather_context_str = ""
-        if weather_context.get("summary"):
-            weather_context_str = f"Weather context for {weather_context.get('city', '')}: {weather_context.get('summary')} {weather_context.get('recommendation', '')}"
-
-        chat_result = await registry.run_agent(
-            "chat",
-            {
-                "user_message": user_message,
-                "conversation_history": conversation_history,
-                "model": suggested_model,
-                "memory_context": memory_context.get("formatted", ""),
-                "search_context": search_context.get("formatted", ""),
-                "weather_context": weather_context_str,
-                "intent": intent,
-                "stream_callback": stream_callback,
-            },
-        )
+    def _build_graph(self, kept, stream_callback) -> List[GraphNode]:
+        def _weather_needs(bb: Dict[str, Any]) -> List[str]:
+            needs = ["user_message", "classification"]
+            if "classification" in bb:
+                classification = _data(bb, "classification")
+                entities = classification.get("entities", []) or []
+                # Only wait for memory when it is the sole place a location could come from.
+                if _wants_tool(classification, "weather") and not resolve_cities(entities, bb["user_message"]):
+                    needs.append("memory")
+            return needs
 
-        trace.append({"agent": "chat", "duration_ms": chat_result.latency_ms, "status": "error" if chat_result.error else "ok", "skipped": False})
+        def _chat_needs(bb: Dict[str, Any]) -> List[str]:
+            needs = ["user_message", "classification", "search", "weather"]
+            if "classification" not in bb or _memory_relevant(_data(bb, "classification")):
+                needs.append("memory")
+            return needs
 
-        if chat_result.error and suggested_model == "gemini":
-            fallback_result = await registry.run_agent(
-                "chat",
-                {
-                    "user_message": user_message,
-                    "conversation_history": conversation_history,
-                    "model": "groq",
-                    "memory_context": memory_context.get("formatted", ""),
-                    "search_context": search_context.get("formatted", ""),
-                    "weather_context": weather_context_str,
-                    "intent": intent,
-                    "stream_callback": stream_callback,
+        return [
+            GraphNode(
+                "memory",
+                build_context=lambda bb: {"user_message": bb["user_message"], "user_id": bb["user_id"]},
+                timeout_s=AGENT_TIMEOUT_PREFLIGHT,
+            ),
+            GraphNode(
+                "context",
+                build_context=lambda bb: {"user_message": bb["user_message"], "conversation_history": bb["conversation_history"]},
+                timeout_s=AGENT_TIMEOUT_PREFLIGHT,
+            ),
+            GraphNode(
+                "search",
+                build_context=lambda bb: {"user_message": bb["user_message"], "entities": _data(bb, "classification").get("entities", []) or []},
+                should_run=lambda bb: _wants_tool(_data(bb, "classification"), "search"),
+                run=lambda bb, ctx: self._run_tool("search", kept, bb, ctx),
+                timeout_s=AGENT_TIMEOUT_TOOLS,
+            ),
+            GraphNode(
+                "weather",
+                needs=_weather_needs,
+                build_context=lambda bb: {
+                    "user_message": bb["user_message"],
+                    "entities": _data(bb, "classification").get("entities", []) or [],
+                    "memory_context": _data(bb, "memory").get("formatted", ""),
                 },
-            )
-            trace.append({"agent": "chat_fallback", "duration_ms": fallback_result.latency_ms, "status": "error" if fallback_result.error else "ok", "skipped": False})
-            if fallback_result.data:
-                chat_result = fallback_result
+                should_run=lambda bb: _wants_tool(_data(bb, "classification"), "weather"),
+                run=lambda bb, ctx: self._run_tool("weather", kept, bb, ctx),
+                timeout_s=AGENT_TIMEOUT_TOOLS,
+            ),
+            GraphNode("chat", needs=_chat_needs, build_context=lambda bb: self._chat_context(bb, stream_callback)),
+        ]
+
+    async def process(self, user_message: str, conversation_history: List[Dict[str, str]], stream_callback=None) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, str]]]:
+        with tracer.span("orchestrate") as span:
+            full_response, trace = await self._process(user_message, conversation_history, stream_callback, span)
+        return full_response, trace, conversation_history
+
+    async def _process(self, user_message: str, conversation_history: List[Dict[str, str]], stream_callback, span) -> Tuple[str, List[Dict[str, Any]]]:
+        started = time.perf_counter()
+        trace: List[Dict[str, Any]] = []
+        blackboard: Dict[str, Any] = {"user_message": user_message, "conversation_history": conversation_history, "user_id": USER_ID}
+
+        # Speculatively start likely tool agents from local signals; kept or cancelled once classified.
+        speculative = self._speculate(user_message)
+        kept: Dict[str, "asyncio.Task[AgentResult]"] = {}
+        speculation_entry = self._speculation_trace([], [], [])
+        runs: Dict[str, NodeRun] = {}
+
+        try:
+            async with aclosing(registry.run_graph(self._build_graph(kept, stream_callback), blackboard)) as stream:
+                async for run in stream:
+                    runs[run.agent_name] = run
+                    if run.agent_name == "context":
+                        speculation_entry = self._resolve_speculation(speculative, kept, user_message, _data(blackboard, "classification"))
+                    elif run.agent_name == "chat":
+                        # Anything still running (e.g. an irrelevant memory fetch) is cancelled on close.
+                        break
+        finally:
+            for _, task in speculative.values():
+                task.cancel()
+
+        context_data = _data(blackboard, "classification")
+        intent = context_data.get("intent", "casual_chat")
+        suggested_model = _suggested_model(context_data)
+        used = speculation_entry.get("used", [])
+
+        for name in ["memory", "context", "speculation", "search", "weather", "chat"]:
+            if name == "speculation":
+                trace.append(speculation_entry)
+                continue
+            run = runs.get(name)
+            if run is None:
+                trace.append({"agent": name, "duration_ms": 0, "status": "skipped", "skipped": True, "abandoned": True})
+                continue
+            entry = {
+                "agent": name,
+                "duration_ms": run.result.latency_ms if run.result else 0,
+                "queue_wait_ms": run.result.queue_wait_ms if run.result else 0,
+                "status": run.status,
+                "skipped": run.status == "skipped",
+                "start_ms": run.start_ms,
+            }
+            if name == "context":
+                entry["source"] = context_data.get("_source", "none")
+                entry["cache"] = context_data.get("_cache", {})
+            if name == "chat" and run.result and run.result.data:
+                entry["prompt"] = run.result.data.get("prompt", {})
+                entry["provider"] = run.result.data.get("provider")
+                entry["model"] = run.result.data.get("model_used")
+                entry["hedge"] = run.result.data.get("hedge", {})
+                entry["response_cache"] = run.result.data.get("cache", {})
+            if name in used:
+                entry["speculative"] = True
+            trace.append(entry)
+
+        chat_run = runs.get("chat")
+        if chat_run is not None:
+            # Everything the chat node waited on: classification, memory, tools.
+            turn_phase_latency.observe_ms(chat_run.start_ms, "pre_chat")
+        turn_phase_latency.observe(time.perf_counter() - started, "orchestrate")
+        chat_result = chat_run.result if chat_run and chat_run.result else AgentResult("chat", error="not_run")
 
         full_response = ""
         if chat_result.data:
             full_response = chat_result.data.get("full_response", "")
 
-        # Phase 5: memory writer (fire-and-forget)
+        # Memory writer (fire-and-forget)
         asyncio.create_task(
             registry.run_agent(
                 "memory_writer",
@@ -148,19 +280,11 @@ class JarvisOrchestrator:
         for item in trace:
             logger.info("trace agent=%s status=%s duration_ms=%s", item["agent"], item["status"], item["duration_ms"])
 
-        logger.info(
-            "agent_trace_json=%s",
-            json.dumps(
-                {
-                    "event": "agent_trace",
-                    "trace": trace,
-                    "intent": intent,
-                    "model": suggested_model,
-                }
-            ),
-        )
+        # The full per-agent breakdown is exported as spans off the loop (core/tracing.py).
+        if span is not None:
+            span.set(intent=intent, model=suggested_model, chat_provider=(chat_result.data or {}).get("provider"))
 
-        return full_response, trace, conversation_history
+        return full_response, trace
 
 
 from typing import Optional
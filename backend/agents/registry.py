@@ -1,11 +1,14 @@
 import asyncio
 import logging
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
-from config import AGENT_TIMEOUT_DEFAULT
+from config import AGENT_BULKHEAD_DEFAULT, AGENT_BULKHEADS, AGENT_EXECUTORS, AGENT_TIMEOUT_DEFAULT
+from core.bulkhead import Bulkhead, BulkheadFull, BoundedExecutor
+from core.metrics import agent_errors, agent_latency, agent_queue_wait, agent_timeouts, error_label
+from core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -16,22 +19,73 @@ class AgentResult:
     data: Any = None
     error: Optional[str] = None
     latency_ms: int = 0
+    # Time spent waiting for the agent's bulkhead slot; latency_ms is execution only.
+    queue_wait_ms: int = 0
 
 
 class BaseAgent:
     name: str = "base"
+    # Blackboard keys this agent reads and writes when scheduled by run_graph().
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
 
     async def run(self, context: Dict[str, Any]) -> AgentResult:
         raise NotImplementedError
 
 
+@dataclass
+class GraphNode:
+    """One agent invocation in a run_graph() call.
+
+    inputs/outputs default to the agent's declarations. ``needs`` can narrow
+    the inputs at runtime from the blackboard (e.g. drop "memory" once the
+    classification says it is irrelevant); ``should_run`` decides, once
+    inputs are resolved, whether to run or skip; ``run`` replaces the plain
+    registry.run_agent() call.
+    """
+
+    agent_name: str
+    build_context: Callable[[Dict[str, Any]], Dict[str, Any]]
+    inputs: Optional[Tuple[str, ...]] = None
+    outputs: Optional[Tuple[str, ...]] = None
+    needs: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None
+    should_run: Optional[Callable[[Dict[str, Any]], bool]] = None
+    run: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[AgentResult]]] = None
+    timeout_s: float = AGENT_TIMEOUT_DEFAULT
+
+
+@dataclass
+class NodeRun:
+    agent_name: str
+    result: Optional[AgentResult] = None
+    status: str = "ok"
+    start_ms: int = 0
+    duration_ms: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
 class AgentRegistry:
+    """Agents plus the isolation around them.
+
+    Each agent runs behind its own bulkhead (AGENT_BULKHEADS) so a slow
+    agent only queues its own runs, and blocking SDK calls go to named
+    bounded thread pools (AGENT_EXECUTORS) instead of the loop's shared
+    default executor.
+    """
+
     def __init__(self) -> None:
         self._agents: Dict[str, BaseAgent] = {}
         self._stats: Dict[str, Dict[str, Any]] = {}
+        self._bulkheads: Dict[str, Bulkhead] = {}
+        self._executors: Dict[str, BoundedExecutor] = {
+            name: BoundedExecutor(name, workers, queue) for name, (workers, queue) in AGENT_EXECUTORS.items()
+        }
 
     def register(self, agent: BaseAgent) -> None:
         self._agents[agent.name] = agent
+        if agent.name not in self._bulkheads:
+            max_concurrent, max_queue = AGENT_BULKHEADS.get(agent.name, AGENT_BULKHEAD_DEFAULT)
+            self._bulkheads[agent.name] = Bulkhead(agent.name, max_concurrent, max_queue)
         if agent.name not in self._stats:
             self._stats[agent.name] = {
                 "last_run_ms": 0,
@@ -43,6 +97,13 @@ class AgentRegistry:
     def get(self, agent_name: str) -> Optional[BaseAgent]:
         return self._agents.get(agent_name)
 
+    def executor(self, name: str) -> BoundedExecutor:
+        return self._executors[name]
+
+    def shutdown_executors(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown()
+
     def _update_stats(self, agent_name: str, result: AgentResult) -> None:
         stats = self._stats.setdefault(agent_name, {})
         today = date.today()
@@ -59,16 +120,60 @@ class AgentRegistry:
             return AgentResult(agent_name=agent_name, data=None, error="agent_not_registered", latency_ms=0)
 
         start = time.perf_counter()
-        try:
-            result = await asyncio.wait_for(agent.run(context), timeout=timeout_s)
-        except asyncio.TimeoutError:
-            result = AgentResult(agent_name=agent.name, data=None, error="timeout", latency_ms=0)
-        except Exception as exc:
-            result = AgentResult(agent_name=agent.name, data=None, error=str(exc), latency_ms=0)
+        bulkhead = self._bulkheads[agent.name]
+        timing: Dict[str, float] = {}
+
+        async def _run_in_bulkhead() -> AgentResult:
+            async with bulkhead.slot() as waited:
+                timing["queue_wait"] = waited
+                timing["started"] = time.perf_counter()
+                return await agent.run(context)
+
+        with tracer.span(f"agent.{agent.name}") as span:
+            try:
+                # The timeout bounds queue wait plus execution, as callers budget for the whole call.
+                result = await asyncio.wait_for(_run_in_bulkhead(), timeout=timeout_s)
+            except asyncio.TimeoutError:
+                result = AgentResult(agent_name=agent.name, data=None, error="timeout", latency_ms=0)
+            except Exception as exc:
+                # Only this agent's own bulkhead sheds the run; a full executor inside
+                # agent.run() is an ordinary error of a run that did execute.
+                if isinstance(exc, BulkheadFull) and exc.name == bulkhead.name:
+                    agent_errors.inc(agent.name, "shed")
+                    result = AgentResult(agent_name=agent.name, data=None, error="shed", latency_ms=0)
+                else:
+                    agent_errors.inc(agent.name, type(exc).__name__)
+                    result = AgentResult(agent_name=agent.name, data=None, error=str(exc), latency_ms=0)
+            else:
+                if result.error:
+                    agent_errors.inc(agent.name, error_label(result.error))
+            end = time.perf_counter()
+            started = timing.get("started")
+            # A run that timed out before getting a slot spent its whole budget queued.
+            queue_wait = timing.get("queue_wait", end - start if result.error == "timeout" else 0.0)
+            elapsed = end - started if started is not None else 0.0
+            result.latency_ms = int(elapsed * 1000)
+            result.queue_wait_ms = int(queue_wait * 1000)
+            if span is not None:
+                span.set(queue_wait_ms=result.queue_wait_ms)
+                if result.error:
+                    span.status = "timeout" if result.error == "timeout" else "error"
+                    span.set(error=result.error)
 
-        result.latency_ms = int((time.perf_counter() - start) * 1000)
+        if started is not None:
+            agent_latency.observe(elapsed, agent.name, "error" if result.error else "ok")
+        if result.error != "shed":
+            agent_queue_wait.observe(queue_wait, agent.name)
+        if result.error == "timeout":
+            agent_timeouts.inc(agent.name)
         self._update_stats(agent.name, result)
-        logger.info("agent=%s status=%s latency_ms=%s", agent.name, "error" if result.error else "ok", result.latency_ms)
+        logger.info(
+            "agent=%s status=%s latency_ms=%s queue_wait_ms=%s",
+            agent.name,
+            "error" if result.error else "ok",
+            result.latency_ms,
+            result.queue_wait_ms,
+        )
         return result
 
     async def run_parallel(self, agents: List[str], context: Dict[str, Any], timeout_s: float = AGENT_TIMEOUT_DEFAULT) -> List[AgentResult]:
@@ -83,6 +188,87 @@ class AgentRegistry:
                 final_results.append(AgentResult(agent_name=agent_name, data=None, error=str(res), latency_ms=0))
         return final_results
 
+    async def run_graph(self, nodes: List[GraphNode], blackboard: Dict[str, Any]) -> AsyncIterator[NodeRun]:
+        """Run agents as soon as their inputs are resolved, yielding NodeRuns as they complete.
+
+        An output key is resolved when its producer finishes (value: the
+        AgentResult) or is skipped (value: None). Each result is yielded
+        before any dependent node is started, so the consumer can react to
+        it first. Closing the generator cancels nodes still running.
+        """
+        graph_start = time.perf_counter()
+        pending: Dict[str, GraphNode] = {node.agent_name: node for node in nodes}
+        running: Dict["asyncio.Task[AgentResult]", Tuple[GraphNode, float]] = {}
+
+        def _outputs(node: GraphNode) -> Tuple[str, ...]:
+            if node.outputs is not None:
+                return node.outputs
+            agent = self.get(node.agent_name)
+            return agent.outputs if agent else ()
+
+        def _inputs(node: GraphNode) -> Iterable[str]:
+            if node.needs is not None:
+                return node.needs(blackboard)
+            if node.inputs is not None:
+                return node.inputs
+            agent = self.get(node.agent_name)
+            return agent.inputs if agent else ()
+
+        def _offset_ms(t: float) -> int:
+            return int((t - graph_start) * 1000)
+
+        try:
+            while pending or running:
+                ready = True
+                while ready:
+                    ready = False
+                    for name, node in list(pending.items()):
+                        if not all(key in blackboard for key in _inputs(node)):
+                            continue
+                        ready = True
+                        del pending[name]
+                        now = time.perf_counter()
+                        if node.should_run is not None and not node.should_run(blackboard):
+                            for key in _outputs(node):
+                                blackboard[key] = None
+                            yield NodeRun(agent_name=name, status="skipped", start_ms=_offset_ms(now))
+                            continue
+                        context = node.build_context(blackboard)
+                        if node.run is not None:
+                            coro = node.run(blackboard, context)
+                        else:
+                            coro = self.run_agent(name, context, timeout_s=node.timeout_s)
+                        running[asyncio.ensure_future(coro)] = (node, now)
+
+                if not running:
+                    for name, node in list(pending.items()):
+                        del pending[name]
+                        for key in _outputs(node):
+                            blackboard[key] = None
+                        logger.warning("run_graph node=%s has unresolvable inputs", name)
+                        yield NodeRun(agent_name=name, status="error", result=AgentResult(agent_name=name, error="unresolved_inputs"))
+                    continue
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node, started = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as exc:
+                        result = AgentResult(agent_name=node.agent_name, error=str(exc))
+                    for key in _outputs(node):
+                        blackboard[key] = result
+                    yield NodeRun(
+                        agent_name=node.agent_name,
+                        result=result,
+                        status="error" if result.error else "ok",
+                        start_ms=_offset_ms(started),
+                        duration_ms=_offset_ms(time.perf_counter()) - _offset_ms(started),
+                    )
+        finally:
+            for task in running:
+                task.cancel()
+
     def get_status(self) -> List[Dict[str, Any]]:
         output = []
         for name in sorted(self._agents.keys()):
@@ -93,9 +279,13 @@ class AgentRegistry:
                     "last_run_ms": int(stats.get("last_run_ms", 0)),
                     "last_status": stats.get("last_status", "skipped"),
                     "runs_today": int(stats.get("runs_today", 0)),
+                    "bulkhead": self._bulkheads[name].stats(),
                 }
             )
         return output
 
+    def get_executor_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: executor.stats() for name, executor in self._executors.items()}
+
 
 registry = AgentRegistry()
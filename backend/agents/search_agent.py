@@ -4,31 +4,30 @@ import time
 from typing import Any, Dict, List, Optional
 
 from agents.registry import BaseAgent, AgentResult
-from tools.search import async_web_search
+from tools.search import async_web_search_cached, normalize_query
 from config import SEARCH_AGENT_TIMEOUT_S
 
 logger = logging.getLogger(__name__)
 
 
-def _build_queries(user_message: str, entities: List[str], query_override: Optional[str]) -> List[str]:
+def build_queries(user_message: str, entities: List[str], query_override: Optional[str]) -> List[str]:
+    """Queries SearchAgent would send for this input; the orchestrator keys speculative runs on it."""
     if query_override:
         return [query_override]
     queries = [user_message]
     for ent in entities[:2]:
         if ent and ent.lower() not in user_message.lower():
             queries.append(f"{ent} {user_message}")
-    return list(dict.fromkeys(queries))[:2]
-
-
-def _trim_words(text: str, max_words: int = 200) -> str:
-    words = text.split()
-    if len(words) <= max_words:
-        return text
-    return " ".join(words[:max_words])
+    unique = {}
+    for q in queries:
+        unique.setdefault(normalize_query(q), q)
+    return list(unique.values())[:2]
 
 
 class SearchAgent(BaseAgent):
     name = "search"
+    inputs = ("user_message", "classification")
+    outputs = ("search",)
 
     async def run(self, context: Dict[str, Any]) -> AgentResult:
         user_message = context.get("user_message", "")
@@ -37,10 +36,10 @@ class SearchAgent(BaseAgent):
         start = time.perf_counter()
         status = "ok"
 
-        queries = _build_queries(user_message, entities, query_override)
+        queries = build_queries(user_message, entities, query_override)
 
         async def _search(q: str) -> dict:
-            return await asyncio.wait_for(async_web_search(q, max_results=5), timeout=SEARCH_AGENT_TIMEOUT_S)
+            return await asyncio.wait_for(async_web_search_cached(q, max_results=5), timeout=SEARCH_AGENT_TIMEOUT_S)
 
         try:
             responses = await asyncio.gather(*[_search(q) for q in queries], return_exceptions=True)
@@ -52,7 +51,7 @@ class SearchAgent(BaseAgent):
                     results.append(
                         {
                             "title": r.get("title", "Untitled"),
-                            "snippet": _trim_words(r.get("content", ""), 200),
+                            "snippet": r.get("content", ""),
                             "url": r.get("url", ""),
                         }
                     )
@@ -1,58 +1,61 @@
-import asyncio
 import logging
 import time
 from typing import Any, Dict, List
 
-import groq
-
 from agents.registry import BaseAgent, AgentResult
-from config import GROQ_API_KEY, FAST_MODEL
+from config import FAST_MODEL
+from core.llm_client import llm_client
 
 logger = logging.getLogger(__name__)
 
-groq_client = groq.Groq(api_key=GROQ_API_KEY)
+_CHUNK_PROMPT = "Summarize this part of a conversation into a single paragraph under 120 words. Keep names, facts and decisions."
+_MERGE_PROMPT = "Merge these consecutive conversation summaries, oldest first, into a single paragraph under 150 words. Keep names, facts and decisions."
 
 
 class SummarizationAgent(BaseAgent):
+    """Summarizes one chunk of messages ("chunk") or a run of summaries ("merge").
+
+    Scheduling and which messages to hand over is ConversationState's job;
+    this agent never sees the same message twice.
+    """
+
     name = "summarizer"
+    inputs = ("messages",)
+    outputs = ("summary",)
 
     async def run(self, context: Dict[str, Any]) -> AgentResult:
-        history: List[Dict[str, str]] = context.get("conversation_history", [])
-        max_turns = int(context.get("max_turns", 16))
+        mode = context.get("mode", "chunk")
         start = time.perf_counter()
         status = "ok"
 
-        if len(history) <= max_turns:
-            result = AgentResult(agent_name=self.name, data={"was_compressed": False, "new_history": history, "summary": ""}, error=None, latency_ms=0)
-            latency_ms = int((time.perf_counter() - start) * 1000)
-            logger.info("agent=%s status=%s latency_ms=%s", self.name, status, latency_ms)
-            return result
+        if mode == "merge":
+            summaries: List[str] = context.get("summaries", [])
+            prompt = _MERGE_PROMPT
+            content = "\n\n".join(summaries)
+        else:
+            messages: List[Dict[str, str]] = context.get("messages", [])
+            prompt = _CHUNK_PROMPT
+            content = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
 
-        oldest = history[:8]
-        rest = history[8:]
-        content = "\n".join(f"{m['role']}: {m['content']}" for m in oldest)
+        if not content.strip():
+            return AgentResult(agent_name=self.name, data={"summary": "", "mode": mode}, error=None, latency_ms=0)
 
-        def _call_llm() -> str:
-            response = groq_client.chat.completions.create(
-                model=FAST_MODEL,
-                messages=[
-                    {"role": "system", "content": "Summarize the conversation into a single paragraph under 150 words. Start with 'Summary so far:'."},
+        try:
+            summary = await llm_client.complete(
+                [
+                    {"role": "system", "content": prompt},
                     {"role": "user", "content": content},
                 ],
-                max_tokens=180,
+                model=FAST_MODEL,
+                max_tokens=200 if mode == "merge" else 160,
                 temperature=0.2,
             )
-            return response.choices[0].message.content or ""
-
-        try:
-            summary = await asyncio.to_thread(_call_llm)
-            new_history = [{"role": "system", "content": summary}] + rest
-            result = AgentResult(agent_name=self.name, data={"was_compressed": True, "new_history": new_history, "summary": summary}, error=None, latency_ms=0)
+            result = AgentResult(agent_name=self.name, data={"summary": summary.strip(), "mode": mode}, error=None, latency_ms=0)
         except Exception as exc:
             logger.warning("summarization_agent error: %s", exc)
             status = "error"
-            result = AgentResult(agent_name=self.name, data={"was_compressed": False, "new_history": history, "summary": ""}, error=str(exc), latency_ms=0)
+            result = AgentResult(agent_name=self.name, data={"summary": "", "mode": mode}, error=str(exc), latency_ms=0)
 
         latency_ms = int((time.perf_counter() - start) * 1000)
-        logger.info("agent=%s status=%s latency_ms=%s", self.name, status, latency_ms)
+        logger.info("agent=%s mode=%s status=%s latency_ms=%s", self.name, mode, status, latency_ms)
         return result
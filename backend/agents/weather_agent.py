@@ -1,10 +1,12 @@
+import asyncio
 import logging
 import re
 import time
 from typing import Any, Dict, List, Optional
 
 from agents.registry import BaseAgent, AgentResult
-from tools.weather import async_get_weather
+from config import WEATHER_MAX_CITIES
+from tools.weather import async_get_weather_cached, normalize_city
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,21 @@ def _extract_city(entities: List[str], user_message: str, memory_context: str =
     return None
 
 
+def resolve_cities(entities: List[str], user_message: str, memory_context: str = "") -> List[str]:
+    """Cities WeatherAgent would fetch for this input; the orchestrator keys speculative runs on it."""
+    cities = []
+    seen = set()
+    for ent in entities:
+        key = normalize_city(ent) if ent else ""
+        if key and key not in seen:
+            seen.add(key)
+            cities.append(ent)
+    if cities:
+        return cities[:WEATHER_MAX_CITIES]
+    city = _extract_city([], user_message, memory_context)
+    return [city] if city else []
+
+
 def _summarize(temp_c: float, description: str) -> str:
     if temp_c <= 5:
         feel = "freezing"
@@ -50,6 +67,20 @@ def _recommendation(description: str) -> str:
 
 class WeatherAgent(BaseAgent):
     name = "weather"
+    inputs = ("user_message", "classification", "memory")
+    outputs = ("weather",)
+
+    async def _lookup(self, city: str) -> Dict[str, Any]:
+        raw, age_s = await async_get_weather_cached(city)
+        description = raw["weather"][0]["description"]
+        temp_c = float(raw["main"]["temp"])
+        return {
+            "city": city,
+            "raw": raw,
+            "summary": _summarize(temp_c, description),
+            "recommendation": _recommendation(description),
+            "cache_age_s": round(age_s, 1),
+        }
 
     async def run(self, context: Dict[str, Any]) -> AgentResult:
         entities = context.get("entities", []) or []
@@ -58,30 +89,36 @@ class WeatherAgent(BaseAgent):
         start = time.perf_counter()
         status = "ok"
 
-        city = _extract_city(entities, user_message, memory_context)
-        if not city:
+        cities = resolve_cities(entities, user_message, memory_context)
+        if not cities:
             status = "error"
-            result = AgentResult(agent_name=self.name, data={"city": "", "raw": {}, "summary": "", "recommendation": ""}, error="no_city", latency_ms=0)
+            result = AgentResult(agent_name=self.name, data={"city": "", "raw": {}, "summary": "", "recommendation": "", "cities": []}, error="no_city", latency_ms=0)
             latency_ms = int((time.perf_counter() - start) * 1000)
             logger.info("agent=%s status=%s latency_ms=%s", self.name, status, latency_ms)
             return result
 
-        try:
-            raw = await async_get_weather(city)
-            description = raw["weather"][0]["description"]
-            temp_c = float(raw["main"]["temp"])
-            summary = _summarize(temp_c, description)
-            rec = _recommendation(description)
+        lookups = await asyncio.gather(*[self._lookup(city) for city in cities], return_exceptions=True)
+        reports = [r for r in lookups if not isinstance(r, BaseException)]
+        errors = [r for r in lookups if isinstance(r, BaseException)]
+        for exc in errors:
+            logger.warning("weather_agent error: %s", exc)
+
+        if reports:
+            first = reports[0]
             result = AgentResult(
                 agent_name=self.name,
-                data={"city": city, "raw": raw, "summary": summary, "recommendation": rec},
+                data={**first, "cities": reports},
                 error=None,
                 latency_ms=0,
             )
-        except Exception as exc:
-            logger.warning("weather_agent error: %s", exc)
+        else:
             status = "error"
-            result = AgentResult(agent_name=self.name, data={"city": city, "raw": {}, "summary": "", "recommendation": ""}, error=str(exc), latency_ms=0)
+            result = AgentResult(
+                agent_name=self.name,
+                data={"city": cities[0], "raw": {}, "summary": "", "recommendation": "", "cities": []},
+                error=str(errors[0]) if errors else "weather_failed",
+                latency_ms=0,
+            )
 
         latency_ms = int((time.perf_counter() - start) * 1000)
         logger.info("agent=%s status=%s latency_ms=%s", self.name, status, latency_ms)
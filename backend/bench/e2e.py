@@ -0,0 +1,322 @@
+"""End-to-end turn latency through /ws against local provider stubs.
+
+Starts bench.stubs and a backend (uvicorn main:app) wired to them, plays
+scripted text and audio conversations over the websocket, and reports
+p50/p95/p99 of:
+  ttft_ms   turn start -> first llm_token
+  ttfa_ms   turn start -> first audio chunk
+  turn_ms   turn start -> status idle (all audio delivered)
+Turn start is when the text was sent, or when the last audio frame was sent
+for spoken turns (so STT endpointing is included).
+
+    cd backend
+    python -m bench.e2e --repeat 5 --set llm.ttft_ms=500
+    python -m bench.e2e --compare bench/results/e2e-20250101-120000.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import websockets
+
+from bench.stubs import AUDIO_MARKER, BASE_PORT, StubServers, backend_env, load_profile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(BACKEND_DIR, "bench")
+METRICS = ("ttft_ms", "ttfa_ms", "turn_ms")
+AUDIO_FRAME_MS = 20
+AUDIO_FRAME_BYTES = 640  # 20 ms of 16 kHz 16-bit mono
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.50), 1),
+        "p95": round(percentile(values, 0.95), 1),
+        "p99": round(percentile(values, 0.99), 1),
+        "mean": round(sum(values) / len(values), 1),
+        "max": round(max(values), 1),
+    }
+
+
+def summarize_turns(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {}
+    for scope in ("all", "text", "audio"):
+        rows = [t for t in turns if scope == "all" or t["mode"] == scope]
+        if not rows:
+            continue
+        summary[scope] = {m: summarize([t[m] for t in rows if t.get(m) is not None]) for m in METRICS}
+        summary[scope]["turns"] = len(rows)
+        summary[scope]["failed"] = sum(1 for t in rows if t.get("error"))
+    return summary
+
+
+def _audio_frame(text: str, progress: float, last: bool) -> bytes:
+    payload = AUDIO_MARKER + json.dumps({"text": text, "progress": round(progress, 3), "last": last}).encode() + b"\x00"
+    return payload.ljust(AUDIO_FRAME_BYTES, b"\x00")
+
+
+async def _speak(ws, text: str, speech_ms: int) -> None:
+    """Stream marker frames in real time, as a microphone would."""
+    frames = max(1, speech_ms // AUDIO_FRAME_MS)
+    for index in range(frames):
+        await ws.send(_audio_frame(text, (index + 1) / frames, index == frames - 1))
+        await asyncio.sleep(AUDIO_FRAME_MS / 1000)
+
+
+async def _recv_json(ws, timeout: float) -> Dict[str, Any]:
+    while True:
+        message = await asyncio.wait_for(ws.recv(), timeout=timeout)
+        if isinstance(message, str):
+            return json.loads(message)
+
+
+async def run_turn(ws, turn: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    mode = turn.get("mode", "text")
+    result: Dict[str, Any] = {"mode": mode, "text": turn["text"], "ttft_ms": None, "ttfa_ms": None, "turn_ms": None, "error": None}
+    if mode == "audio":
+        await _speak(ws, turn["text"], int(turn.get("speech_ms", 1500)))
+    else:
+        await ws.send(json.dumps({"type": "text_message", "text": turn["text"]}))
+    start = time.perf_counter()
+    completed = False
+
+    def _elapsed() -> float:
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    deadline = start + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            result["error"] = "timeout"
+            return result
+        try:
+            message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+        except asyncio.TimeoutError:
+            result["error"] = "timeout"
+            return result
+        if isinstance(message, bytes):
+            if result["ttfa_ms"] is None:
+                result["ttfa_ms"] = _elapsed()
+            continue
+        data = json.loads(message)
+        kind = data.get("type")
+        if kind == "llm_token" and result["ttft_ms"] is None:
+            result["ttft_ms"] = _elapsed()
+        elif kind == "audio_chunk" and result["ttfa_ms"] is None:
+            result["ttfa_ms"] = _elapsed()
+        elif kind == "response_complete":
+            completed = True
+            result["chars"] = len(data.get("full_text", ""))
+        elif kind == "agent_trace":
+            result["turn_id"] = data.get("turn_id")
+            chat = next((e for e in data.get("trace", []) if e.get("agent") == "chat"), {})
+            result["provider"] = chat.get("provider")
+        elif kind == "error" and result["error"] is None:
+            result["error"] = data.get("message")
+        elif kind == "status" and data.get("status") == "idle" and completed:
+            result["turn_ms"] = _elapsed()
+            return result
+
+
+async def run_conversation(ws_url: str, conversation: Dict[str, Any], timeout: float) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "hello", "protocol": 2, "binary_audio": True}))
+        await _recv_json(ws, timeout)
+        listening = False
+        for index, turn in enumerate(conversation["turns"]):
+            if turn.get("mode") == "audio" and not listening:
+                await ws.send(json.dumps({"type": "start_listening"}))
+                status = await _recv_json(ws, timeout)
+                listening = status.get("status") == "listening"
+                if not listening:
+                    rows.append({"mode": "audio", "text": turn["text"], "error": "stt_unavailable", "conversation": conversation["name"], "turn": index})
+                    continue
+            row = await run_turn(ws, turn, timeout)
+            row.update({"conversation": conversation["name"], "turn": index})
+            rows.append(row)
+    return rows
+
+
+async def wait_for_backend(base_url: str, process: Optional[subprocess.Popen], timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"backend exited with code {process.returncode}; see its log")
+            try:
+                if (await client.get(f"{base_url}/agents/status", timeout=2)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError("backend did not become ready in time")
+
+
+def start_backend(port: int, base_port: int, env_overrides: Dict[str, str], log_path: str) -> subprocess.Popen:
+    env = {**os.environ, **backend_env(base_port), **env_overrides}
+    log = open(log_path, "w", encoding="utf-8")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def stop_backend(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def bench_env(args: argparse.Namespace, results_dir: str) -> Dict[str, str]:
+    """Backend settings for a repeatable run: no warm caches unless asked, artifacts under results/."""
+    env = {
+        "MEMORY_BACKEND": args.memory_backend,
+        "MEMORY_LOCAL_DIR": os.path.join(results_dir, "memory"),
+        "TRACE_DIR": os.path.join(results_dir, "traces"),
+        "SEARCH_CACHE_PATH": "",
+    }
+    if not args.keep_caches:
+        env.update({"TTS_CACHE_ENABLED": "0", "RESPONSE_CACHE_ENABLED": "0"})
+    return env
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    for scope, metrics in summary.items():
+        print(f"[{scope}] turns={metrics['turns']} failed={metrics['failed']}")
+        for metric in METRICS:
+            stats = metrics[metric]
+            if not stats.get("count"):
+                print(f"  {metric:8} n=0")
+                continue
+            print(f"  {metric:8} n={stats['count']:<4} p50={stats['p50']:>8} p95={stats['p95']:>8} p99={stats['p99']:>8} max={stats['max']:>8}")
+
+
+def print_comparison(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    print(f"compare: {old['meta'].get('label') or old['meta'].get('started')} -> {new['meta'].get('label') or new['meta'].get('started')}")
+    for scope, metrics in new["summary"].items():
+        before_scope = old["summary"].get(scope, {})
+        for metric in METRICS:
+            for q in ("p50", "p95", "p99"):
+                before = before_scope.get(metric, {}).get(q)
+                after = metrics.get(metric, {}).get(q)
+                if before is None or after is None:
+                    continue
+                delta = (after - before) / before * 100 if before else 0.0
+                print(f"  [{scope}] {metric:8} {q}: {before:>8} -> {after:>8} ({delta:+.1f}%)")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    started = time.strftime("%Y%m%d-%H%M%S")
+    results_dir = os.path.abspath(args.output)
+    os.makedirs(results_dir, exist_ok=True)
+    with open(args.conversations, "r", encoding="utf-8") as fh:
+        conversations = json.load(fh)
+    if args.text_only:
+        conversations = [c for c in conversations if all(t.get("mode", "text") == "text" for t in c["turns"])]
+
+    profile = load_profile(args.profile, args.set)
+    stubs = StubServers(profile, base_port=args.base_port)
+    await stubs.start()
+    process = None
+    base_url = args.backend_url or f"http://127.0.0.1:{args.port}"
+    try:
+        if not args.backend_url:
+            process = start_backend(args.port, args.base_port, bench_env(args, results_dir), os.path.join(results_dir, f"backend-{started}.log"))
+        await wait_for_backend(base_url, process)
+        ws_url = base_url.replace("http", "ws", 1) + "/ws"
+
+        for _ in range(args.warmup):
+            await run_conversation(ws_url, conversations[0], args.turn_timeout)
+
+        turns: List[Dict[str, Any]] = []
+        for iteration in range(args.repeat):
+            for conversation in conversations:
+                for row in await run_conversation(ws_url, conversation, args.turn_timeout):
+                    row["iteration"] = iteration
+                    turns.append(row)
+    finally:
+        if process is not None:
+            stop_backend(process)
+        await stubs.stop()
+
+    report = {
+        "meta": {
+            "kind": "e2e",
+            "started": started,
+            "label": args.label,
+            "git_commit": git_commit(),
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "memory_backend": args.memory_backend,
+            "keep_caches": args.keep_caches,
+            "profile": profile,
+            "stub_requests": stubs.stats(),
+        },
+        "summary": summarize_turns(turns),
+        "turns": turns,
+    }
+    path = os.path.join(results_dir, f"e2e-{started}{'-' + args.label if args.label else ''}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print_summary(report["summary"])
+    print(f"saved {path}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            print_comparison(json.load(fh), report)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end /ws latency benchmark against local stubs")
+    parser.add_argument("--conversations", default=os.path.join(BENCH_DIR, "conversations.json"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1, help="conversations run first and not recorded")
+    parser.add_argument("--profile", help="JSON file with stub latency overrides")
+    parser.add_argument("--set", action="append", default=[], help="stub override, e.g. llm.ttft_ms=500")
+    parser.add_argument("--port", type=int, default=8765, help="port for the spawned backend")
+    parser.add_argument("--base-port", type=int, default=BASE_PORT, help="first stub port")
+    parser.add_argument("--backend-url", help="use an already running backend (must point at the stubs)")
+    parser.add_argument("--memory-backend", default="mem0", choices=["mem0", "local"])
+    parser.add_argument("--keep-caches", action="store_true", help="leave TTS/response caches on")
+    parser.add_argument("--text-only", action="store_true", help="skip conversations with spoken turns")
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results"))
+    parser.add_argument("--label", default="")
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
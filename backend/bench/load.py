@@ -0,0 +1,309 @@
+"""Concurrent /ws session load test against local provider stubs, for capacity planning.
+
+Ramps the number of simultaneous sessions through --steps. At each step every
+session loops over the scripted text conversations for --step-duration
+seconds. Each step reports:
+- throughput and turn latency percentiles (TTFT, time-to-first-audio, turn)
+- backend event-loop lag and RSS per session
+- load-generator loop lag, so a saturated client is not mistaken for a
+  saturated server
+
+The saturation point is the first step where p95 turn time exceeds
+--saturation-factor x the single-session baseline, errors pass
+--max-error-rate, or added sessions stop adding throughput.
+
+    cd backend
+    python -m bench.load --steps 1,2,4,8,16,32 --step-duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import websockets
+
+from bench.e2e import (
+    BENCH_DIR,
+    bench_env,
+    git_commit,
+    percentile,
+    run_turn,
+    start_backend,
+    stop_backend,
+    summarize,
+    wait_for_backend,
+)
+from bench.stubs import BASE_PORT, HOST, PORTS, load_profile
+
+PROBE_INTERVAL_S = 0.25
+LAG_INTERVAL_S = 0.05
+
+
+def read_rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size from /proc (Linux); None elsewhere."""
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+async def _loop_lag(samples: List[float], stop: asyncio.Event) -> None:
+    """Lag of this process's loop: how late a fixed-interval sleep wakes up."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL_S)
+        samples.append(max(0.0, (time.perf_counter() - start - LAG_INTERVAL_S) * 1000))
+
+
+async def _probe(base_url: str, samples: List[float], loop_stats: List[Dict[str, Any]], stop: asyncio.Event) -> None:
+    """Round-trip of a trivial endpoint; above the idle baseline it is time spent queued on the backend loop.
+
+    Also collects the backend's own loop monitor readings when it has one.
+    """
+    async with httpx.AsyncClient(timeout=10) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                response = await client.get(f"{base_url}/agents/status")
+                samples.append((time.perf_counter() - start) * 1000)
+                loop = response.json().get("loop")
+                if loop:
+                    loop_stats.append(loop)
+            except (httpx.HTTPError, ValueError):
+                pass
+            await asyncio.sleep(PROBE_INTERVAL_S)
+
+
+async def _session(ws_url: str, index: int, conversations: List[Dict[str, Any]], stop_at: float, args: argparse.Namespace, rows: List[Dict[str, Any]]) -> None:
+    try:
+        async with websockets.connect(ws_url, max_size=None, open_timeout=args.turn_timeout) as ws:
+            await ws.send(json.dumps({"type": "hello", "protocol": 2, "binary_audio": True}))
+            await asyncio.wait_for(ws.recv(), timeout=args.turn_timeout)
+            cycle = index
+            while time.perf_counter() < stop_at:
+                conversation = conversations[cycle % len(conversations)]
+                cycle += 1
+                for turn in conversation["turns"]:
+                    if time.perf_counter() >= stop_at:
+                        return
+                    row = await run_turn(ws, turn, args.turn_timeout)
+                    row.update({"session": index, "finished": time.perf_counter()})
+                    rows.append(row)
+                    if row.get("error") == "timeout":
+                        return
+                    await asyncio.sleep(args.think_ms / 1000)
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as exc:
+        rows.append({"session": index, "mode": "text", "error": f"connect: {exc}", "finished": time.perf_counter()})
+
+
+async def run_step(sessions: int, ws_url: str, base_url: str, conversations: List[Dict[str, Any]], args: argparse.Namespace, backend_pid: Optional[int]) -> Dict[str, Any]:
+    rows: List[Dict[str, Any]] = []
+    probe_ms: List[float] = []
+    client_lag_ms: List[float] = []
+    loop_stats: List[Dict[str, Any]] = []
+    rss_samples: List[int] = []
+    stop = asyncio.Event()
+    monitors = [asyncio.create_task(_probe(base_url, probe_ms, loop_stats, stop)), asyncio.create_task(_loop_lag(client_lag_ms, stop))]
+
+    start = time.perf_counter()
+    stop_at = start + args.step_duration
+    workers = []
+    for index in range(sessions):
+        workers.append(asyncio.create_task(_session(ws_url, index, conversations, stop_at, args, rows)))
+        # Stagger connects so every session doesn't send its first turn in the same tick.
+        await asyncio.sleep(min(0.05, args.step_duration / max(sessions, 1) / 10))
+    while not all(w.done() for w in workers):
+        if backend_pid is not None:
+            rss = read_rss_bytes(backend_pid)
+            if rss is not None:
+                rss_samples.append(rss)
+        await asyncio.sleep(0.5)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*monitors, return_exceptions=True)
+
+    completed = [r for r in rows if not r.get("error") and r.get("turn_ms") is not None]
+    errors = [r for r in rows if r.get("error")]
+    return {
+        "sessions": sessions,
+        "duration_s": round(elapsed, 2),
+        "turns": len(completed),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(rows), 4) if rows else 0.0,
+        "error_samples": sorted({str(r["error"])[:120] for r in errors})[:5],
+        "throughput_turns_per_s": round(len(completed) / elapsed, 3) if elapsed else 0.0,
+        "ttft_ms": summarize([r["ttft_ms"] for r in completed if r.get("ttft_ms") is not None]),
+        "ttfa_ms": summarize([r["ttfa_ms"] for r in completed if r.get("ttfa_ms") is not None]),
+        "turn_ms": summarize([r["turn_ms"] for r in completed]),
+        "probe_ms": summarize(probe_ms),
+        "client_loop_lag_ms": summarize(client_lag_ms),
+        # Backend loop monitor: p99 over its recent window and stalls during this step.
+        "backend_loop_lag_p99_ms": max((s.get("lag_p99_ms") or 0 for s in loop_stats), default=None),
+        "backend_loop_blocks": (loop_stats[-1]["blocks"] - loop_stats[0]["blocks"]) if len(loop_stats) > 1 else None,
+        "rss_peak_bytes": max(rss_samples) if rss_samples else None,
+    }
+
+
+def find_saturation(steps: List[Dict[str, Any]], args: argparse.Namespace) -> Dict[str, Any]:
+    if not steps:
+        return {"sessions": None, "reason": "no steps run"}
+    baseline = steps[0]["turn_ms"].get("p95")
+    best_throughput = 0.0
+    for step in steps:
+        p95 = step["turn_ms"].get("p95")
+        if step["error_rate"] > args.max_error_rate:
+            return {"sessions": step["sessions"], "reason": f"error rate {step['error_rate']:.1%} > {args.max_error_rate:.1%}"}
+        if baseline and p95 and p95 > baseline * args.saturation_factor:
+            return {"sessions": step["sessions"], "reason": f"p95 turn {p95} ms > {args.saturation_factor}x baseline {baseline} ms"}
+        if step is not steps[0] and step["throughput_turns_per_s"] < best_throughput * 1.05:
+            return {"sessions": step["sessions"], "reason": "throughput stopped increasing"}
+        best_throughput = max(best_throughput, step["throughput_turns_per_s"])
+    return {"sessions": None, "reason": f"not reached up to {steps[-1]['sessions']} sessions"}
+
+
+def annotate_steps(steps: List[Dict[str, Any]], idle_rss: Optional[int], idle_probe_ms: Optional[float]) -> None:
+    for step in steps:
+        peak = step.get("rss_peak_bytes")
+        step["rss_per_session_bytes"] = int((peak - idle_rss) / step["sessions"]) if peak and idle_rss else None
+        p95 = step["probe_ms"].get("p95")
+        step["backend_loop_lag_ms"] = round(max(0.0, p95 - idle_probe_ms), 1) if p95 is not None and idle_probe_ms is not None else None
+
+
+def start_stubs(args: argparse.Namespace, log_path: str) -> subprocess.Popen:
+    command = [sys.executable, "-m", "bench.stubs", "--base-port", str(args.base_port)]
+    if args.profile:
+        command += ["--profile", args.profile]
+    for item in args.set:
+        command += ["--set", item]
+    log = open(log_path, "w", encoding="utf-8")
+    return subprocess.Popen(command, cwd=os.path.dirname(BENCH_DIR), stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_for_stubs(base_port: int, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    url = f"http://{HOST}:{base_port + PORTS['mem0']}/v1/ping/"
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("stub servers exited; see their log")
+            try:
+                if (await client.get(url, timeout=1)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("stub servers did not start in time")
+
+
+async def idle_probe(base_url: str, count: int = 20) -> Optional[float]:
+    samples: List[float] = []
+    async with httpx.AsyncClient(timeout=10) as client:
+        for _ in range(count):
+            start = time.perf_counter()
+            await client.get(f"{base_url}/agents/status")
+            samples.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.02)
+    return percentile(samples, 0.95)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    started = time.strftime("%Y%m%d-%H%M%S")
+    results_dir = os.path.abspath(args.output)
+    os.makedirs(results_dir, exist_ok=True)
+    with open(args.conversations, "r", encoding="utf-8") as fh:
+        conversations = [c for c in json.load(fh) if all(t.get("mode", "text") == "text" for t in c["turns"])]
+    steps_plan = [int(s) for s in args.steps.split(",") if s.strip()]
+
+    stubs = start_stubs(args, os.path.join(results_dir, f"stubs-{started}.log"))
+    backend = None
+    base_url = args.backend_url or f"http://127.0.0.1:{args.port}"
+    steps: List[Dict[str, Any]] = []
+    idle_rss = idle_probe_ms = None
+    try:
+        await wait_for_stubs(args.base_port, stubs)
+        if not args.backend_url:
+            backend = start_backend(args.port, args.base_port, bench_env(args, results_dir), os.path.join(results_dir, f"backend-load-{started}.log"))
+        await wait_for_backend(base_url, backend)
+        idle_probe_ms = await idle_probe(base_url)
+        idle_rss = read_rss_bytes(backend.pid) if backend else None
+        ws_url = base_url.replace("http", "ws", 1) + "/ws"
+
+        for sessions in steps_plan:
+            step = await run_step(sessions, ws_url, base_url, conversations, args, backend.pid if backend else None)
+            steps.append(step)
+            print(
+                f"sessions={sessions:<4} turns/s={step['throughput_turns_per_s']:<7} "
+                f"p95_turn={step['turn_ms'].get('p95')} p95_ttft={step['ttft_ms'].get('p95')} "
+                f"errors={step['errors']} probe_p95={step['probe_ms'].get('p95')}",
+                flush=True,
+            )
+            if args.stop_at_saturation and find_saturation(steps, args)["sessions"] is not None:
+                break
+            await asyncio.sleep(args.cooldown)
+    finally:
+        if backend is not None:
+            stop_backend(backend)
+        stop_backend(stubs)
+
+    annotate_steps(steps, idle_rss, idle_probe_ms)
+    report = {
+        "meta": {
+            "kind": "load",
+            "started": started,
+            "label": args.label,
+            "git_commit": git_commit(),
+            "steps": steps_plan,
+            "step_duration_s": args.step_duration,
+            "think_ms": args.think_ms,
+            "memory_backend": args.memory_backend,
+            "keep_caches": args.keep_caches,
+            "profile": load_profile(args.profile, args.set),
+            "idle_rss_bytes": idle_rss,
+            "idle_probe_p95_ms": idle_probe_ms,
+        },
+        "steps": steps,
+        "saturation": find_saturation(steps, args),
+    }
+    path = os.path.join(results_dir, f"load-{started}{'-' + args.label if args.label else ''}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"saturation: {report['saturation']}")
+    print(f"saved {path}")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ramp concurrent /ws sessions against local stubs")
+    parser.add_argument("--steps", default="1,2,4,8,16,32", help="comma-separated session counts")
+    parser.add_argument("--step-duration", type=float, default=20.0, help="seconds per step")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="pause between a session's turns")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="seconds between steps")
+    parser.add_argument("--saturation-factor", type=float, default=2.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--stop-at-saturation", action="store_true")
+    parser.add_argument("--conversations", default=os.path.join(BENCH_DIR, "conversations.json"))
+    parser.add_argument("--profile", help="JSON file with stub latency overrides")
+    parser.add_argument("--set", action="append", default=[], help="stub override, e.g. llm.ttft_ms=500")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--base-port", type=int, default=BASE_PORT)
+    parser.add_argument("--backend-url", help="use an already running backend (must point at the stubs)")
+    parser.add_argument("--memory-backend", default="mem0", choices=["mem0", "local"])
+    parser.add_argument("--keep-caches", action="store_true")
+    parser.add_argument("--turn-timeout", type=float, default=60.0)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results"))
+    parser.add_argument("--label", default="")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Local vector memory search latency at realistic store sizes.
+
+Fills a throwaway LocalVectorStore with synthetic personal facts, then
+times LocalVectorStore.search() for short natural-language queries and
+reports p50/p95/p99 in microseconds. The same queries are also scored with
+a full mat-vec over every mapped row (what search() did before the
+inverted index); both must return equally scored top-k memories.
+
+    cd backend
+    python -m bench.memory_search --memories 20000 --users 1
+    python -m bench.memory_search --memories 50000 --users 4 --queries 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from bench.e2e import BENCH_DIR, git_commit, summarize
+from memory.local_store import LocalVectorStore
+
+_CITIES = ["Berlin", "Paris", "Tokyo", "Lisbon", "Toronto", "Nairobi", "Austin", "Seoul", "Oslo", "Lima"]
+_THINGS = ["jazz", "sushi", "chess", "hiking", "espresso", "sci-fi novels", "cycling", "pottery", "tennis", "ramen"]
+_PEOPLE = ["Anna", "Ben", "Chloe", "Dev", "Emma", "Farid", "Grace", "Hugo", "Ines", "Jon"]
+_TEMPLATES = [
+    "User lives in {city}",
+    "User likes {thing}",
+    "User's friend {person} lives in {city}",
+    "User is allergic to {thing}",
+    "User's sister {person} enjoys {thing}",
+    "User travelled to {city} in {year}",
+    "User wants to learn {thing} next year",
+    "User had dinner with {person} on {day}",
+]
+_QUERIES = [
+    "Where do I live",
+    "What food do I like",
+    "Who is {person}",
+    "Have I been to {city}",
+    "what am I allergic to",
+    "What does my sister enjoy",
+    "{thing}",
+    "{city}",
+]
+_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def _fill(template: str, rng: random.Random, serial: int) -> str:
+    text = template.format(
+        city=rng.choice(_CITIES),
+        thing=rng.choice(_THINGS),
+        person=rng.choice(_PEOPLE),
+        year=rng.randint(2000, 2025),
+        day=rng.choice(_DAYS),
+    )
+    # Unique facts, as a real store has no exact duplicates.
+    return f"{text} (note {serial})"
+
+
+def _dense_search(store: LocalVectorStore, query: str, user_id: str, limit: int, min_score: float = 0.05) -> List[str]:
+    """Previous search(): full mat-vec over every mapped row, then mask to the user's live rows."""
+    code = store._user_codes[user_id]
+    query_vec = store.embedder.embed([query])[0]
+    scores = store._vectors[: store._count] @ query_vec
+    mask = (store._owners[: store._count] == code) & store._alive[: store._count]
+    scores = np.where(mask, scores, -np.inf)
+    k = min(limit, int(mask.sum()))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [store._texts[int(i)] for i in top if scores[i] >= min_score]
+
+
+def _scores(store: LocalVectorStore, query: str, texts: List[str]) -> np.ndarray:
+    """Cosine scores of `texts` against `query`, highest first."""
+    query_vec = store.embedder.embed([query])[0]
+    return np.sort(np.array([float(store.embedder.embed([text])[0] @ query_vec) for text in texts]))[::-1]
+
+
+def _time_us(fn, queries: List[tuple]) -> List[float]:
+    samples = []
+    for query, user_id in queries:
+        start = time.perf_counter()
+        fn(query, user_id)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    users = [f"user-{i}" for i in range(args.users)]
+    directory = tempfile.mkdtemp(prefix="memory-bench-")
+    try:
+        store = LocalVectorStore(directory)
+        store.open()
+        fill_start = time.perf_counter()
+        for serial in range(args.memories):
+            store.add(_fill(rng.choice(_TEMPLATES), rng, serial), users[serial % len(users)])
+        add_ms = (time.perf_counter() - fill_start) * 1000 / args.memories
+
+        store.close()
+        open_start = time.perf_counter()
+        store.open()
+        open_ms = (time.perf_counter() - open_start) * 1000
+
+        queries = [(_fill(rng.choice(_QUERIES), rng, 0).split(" (note")[0], rng.choice(users)) for _ in range(args.queries)]
+        for query, user_id in queries[: args.warmup]:
+            store.search(query, user_id, args.limit)
+
+        indexed = _time_us(lambda q, u: store.search(q, u, args.limit), queries)
+        full_scan = _time_us(lambda q, u: _dense_search(store, q, u, args.limit), queries[: args.dense_queries])
+
+        mismatches = 0
+        for query, user_id in queries[: args.dense_queries]:
+            # Synthetic facts tie a lot, so compare the scores of what came back, not the texts.
+            got = _scores(store, query, store.search(query, user_id, args.limit))
+            expected = _scores(store, query, _dense_search(store, query, user_id, args.limit))
+            if len(got) != len(expected) or not np.allclose(got, expected, atol=1e-5):
+                mismatches += 1
+        store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        "started": time.strftime("%Y%m%d-%H%M%S"),
+        "commit": git_commit(),
+        "config": {
+            "memories": args.memories,
+            "users": args.users,
+            "dim": store.dim,
+            "embedder": store.signature,
+            "queries": args.queries,
+            "limit": args.limit,
+        },
+        "search_us": summarize(indexed),
+        "full_scan_us": summarize(full_scan),
+        "result_mismatches": mismatches,
+        "add_ms_avg": round(add_ms, 3),
+        "open_ms": round(open_ms, 1),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        path = os.path.join(args.output, f"memory-search-{report['started']}{'-' + args.label if args.label else ''}.json")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"saved {path}")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local vector memory search latency")
+    parser.add_argument("--memories", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--dense-queries", type=int, default=200, help="queries also timed/checked with the full scan")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results"))
+    parser.add_argument("--label", default="")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
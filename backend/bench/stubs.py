@@ -0,0 +1,470 @@
+"""Local stand-ins for every upstream Jarvis talks to, with tunable latency.
+
+Each provider runs on its own port and follows a profile:
+  ttft_ms       delay before the first byte/token/result
+  tokens_per_s  streaming rate after the first token (LLMs; bytes/s for TTS)
+  jitter_ms     uniform +/- noise added to ttft_ms
+  error_rate    fraction of requests answered with a 503
+
+Run standalone:
+    python -m bench.stubs --set llm.ttft_ms=600 --set tts.error_rate=0.05
+and point the backend at them with the variables printed on start
+(`backend_env()` builds the same mapping for bench.e2e).
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+HOST = "127.0.0.1"
+BASE_PORT = 9300
+
+PORTS = {"llm": 0, "gemini": 1, "search": 2, "weather": 3, "tts": 4, "stt": 5, "mem0": 6}
+
+DEFAULT_PROFILE: Dict[str, Dict[str, float]] = {
+    "llm": {"ttft_ms": 350, "tokens_per_s": 250, "jitter_ms": 80, "error_rate": 0.0, "classify_ms": 180, "answer_tokens": 60},
+    "gemini": {"ttft_ms": 600, "tokens_per_s": 180, "jitter_ms": 150, "error_rate": 0.0, "answer_tokens": 90},
+    "search": {"ttft_ms": 700, "jitter_ms": 200, "error_rate": 0.0, "results": 5},
+    "weather": {"ttft_ms": 250, "jitter_ms": 60, "error_rate": 0.0},
+    # tokens_per_s is bytes/s here; ~16 KB/s is real-time mp3_44100_128.
+    "tts": {"ttft_ms": 280, "tokens_per_s": 64000, "jitter_ms": 60, "error_rate": 0.0, "bytes_per_char": 900, "chunk_bytes": 4096},
+    # ttft_ms is the endpointing delay between the last audio frame and the final transcript.
+    "stt": {"ttft_ms": 300, "jitter_ms": 50, "error_rate": 0.0, "interim_every": 10},
+    "mem0": {"ttft_ms": 220, "jitter_ms": 60, "error_rate": 0.0},
+}
+
+# Binary frames from bench.e2e carry the scripted transcript instead of real speech.
+AUDIO_MARKER = b"\x00JARVIS-BENCH\x00"
+
+_WORDS = (
+    "Sure, here is what I found. The short answer is that it depends on a few things, "
+    "mostly timing and context. First, consider the basics. Second, weigh the trade-offs "
+    "carefully. In practice most people pick the simpler option and adjust later. "
+    "Let me know if you want more detail on any part of this."
+).split(" ")
+
+
+def load_profile(path: Optional[str] = None, overrides: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    profile = copy.deepcopy(DEFAULT_PROFILE)
+    if path:
+        with open(path, "r", encoding="utf-8") as fh:
+            for name, values in json.load(fh).items():
+                profile.setdefault(name, {}).update(values)
+    for item in overrides or []:
+        key, _, value = item.partition("=")
+        name, _, field = key.partition(".")
+        if name not in profile or not field:
+            raise ValueError(f"bad override {item!r}; expected provider.field=value")
+        profile[name][field] = float(value)
+    return profile
+
+
+def backend_env(base_port: int = BASE_PORT) -> Dict[str, str]:
+    """Environment that points backend/config.py at the stubs."""
+    url = {name: f"http://{HOST}:{base_port + offset}" for name, offset in PORTS.items()}
+    env = {
+        "GROQ_BASE_URL": f"{url['llm']}/openai/v1",
+        "CEREBRAS_BASE_URL": f"{url['llm']}/openai/v1",
+        "MISTRAL_BASE_URL": f"{url['llm']}/openai/v1",
+        "OPENROUTER_BASE_URL": f"{url['llm']}/openai/v1",
+        "GEMINI_BASE_URL": url["gemini"],
+        "TAVILY_BASE_URL": url["search"],
+        "OPENWEATHER_BASE_URL": url["weather"],
+        "ELEVENLABS_BASE_URL": url["tts"],
+        "DEEPGRAM_URL": url["stt"],
+        "MEM0_HOST": url["mem0"],
+        "ELEVENLABS_VOICE_ID": "bench-voice",
+    }
+    for key in ("GROQ", "CEREBRAS", "MISTRAL", "OPENROUTER", "GEMINI", "TAVILY", "OPENWEATHER", "ELEVENLABS", "DEEPGRAM", "MEM0"):
+        env[f"{key}_API_KEY"] = "bench"
+    return env
+
+
+class _Provider:
+    def __init__(self, name: str, profile: Dict[str, float]) -> None:
+        self.name = name
+        self.profile = profile
+        self.requests = 0
+        self.errors = 0
+
+    def get(self, field: str, default: float = 0.0) -> float:
+        return float(self.profile.get(field, default))
+
+    def first_delay(self, field: str = "ttft_ms") -> float:
+        jitter = self.get("jitter_ms")
+        return max(0.0, self.get(field) + random.uniform(-jitter, jitter)) / 1000
+
+    def should_fail(self) -> bool:
+        self.requests += 1
+        if random.random() < self.get("error_rate"):
+            self.errors += 1
+            return True
+        return False
+
+    def token_gap(self) -> float:
+        rate = self.get("tokens_per_s")
+        return 1.0 / rate if rate > 0 else 0.0
+
+
+def _unavailable() -> JSONResponse:
+    return JSONResponse({"error": {"message": "stub injected failure"}}, status_code=503)
+
+
+def _system_text(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+
+
+def _last_user(messages: List[Dict[str, Any]]) -> str:
+    for m in reversed(messages):
+        if m.get("role") == "user":
+            return str(m.get("content", ""))
+    return ""
+
+
+def _classification(text: str) -> Dict[str, Any]:
+    lowered = text.lower()
+    if re.search(r"\b(weather|rain|forecast|temperature|umbrella)\b", lowered):
+        cities = re.findall(r"\b(?:in|for)\s+([A-Z][a-z]+)", text)
+        return {"intent": "weather_query", "needs_tools": ["weather"], "complexity": "simple", "entities": cities or ["London"], "suggested_model": "groq"}
+    if re.search(r"\b(latest|news|search|price|who won)\b", lowered):
+        return {"intent": "search_needed", "needs_tools": ["web_search"], "complexity": "simple", "entities": [], "suggested_model": "groq"}
+    if re.search(r"\b(remember|my name|about me)\b", lowered):
+        return {"intent": "memory_query", "needs_tools": ["memory"], "complexity": "simple", "entities": [], "suggested_model": "groq"}
+    if re.search(r"\b(why|explain|compare|plan)\b", lowered):
+        return {"intent": "question_reasoning", "needs_tools": [], "complexity": "complex", "entities": [], "suggested_model": "gemini"}
+    return {"intent": "question_factual", "needs_tools": [], "complexity": "simple", "entities": [], "suggested_model": "groq"}
+
+
+def _completion_text(messages: List[Dict[str, Any]]) -> str:
+    system = _system_text(messages)
+    if system.startswith("Classify"):
+        return json.dumps(_classification(_last_user(messages)))
+    if "Return JSON" in system and "store" in system:
+        return json.dumps({"store": False, "memory": ""})
+    if "ummar" in system:
+        return "The user and Jarvis chatted about a few everyday questions."
+    return " ".join(_WORDS[:40])
+
+
+def _answer_tokens(count: int) -> List[str]:
+    words = [_WORDS[i % len(_WORDS)] for i in range(max(1, count))]
+    return [words[0]] + [" " + w for w in words[1:]]
+
+
+def openai_app(provider: _Provider) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if provider.should_fail():
+            await asyncio.sleep(provider.first_delay())
+            return _unavailable()
+        model = body.get("model", "stub")
+        messages = body.get("messages") or []
+        if not body.get("stream"):
+            await asyncio.sleep(provider.first_delay("classify_ms"))
+            return {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": _completion_text(messages)}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+
+        async def events():
+            await asyncio.sleep(provider.first_delay())
+            chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            for token in _answer_tokens(int(provider.get("answer_tokens", 60))):
+                payload = {
+                    "id": chunk_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(payload)}\n\n"
+                await asyncio.sleep(provider.token_gap())
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def gemini_app(provider: _Provider) -> FastAPI:
+    app = FastAPI()
+
+    def _chunk(text: str, finish: bool = False) -> Dict[str, Any]:
+        candidate: Dict[str, Any] = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if finish:
+            candidate["finishReason"] = "STOP"
+        return {"candidates": [candidate], "modelVersion": "stub"}
+
+    @app.post("/{version}/models/{model_action}")
+    async def generate(version: str, model_action: str, request: Request):
+        await request.body()
+        if provider.should_fail():
+            await asyncio.sleep(provider.first_delay())
+            return _unavailable()
+        _, _, action = model_action.partition(":")
+        tokens = _answer_tokens(int(provider.get("answer_tokens", 90)))
+        if action != "streamGenerateContent":
+            await asyncio.sleep(provider.first_delay() + provider.token_gap() * len(tokens))
+            return _chunk("".join(tokens), finish=True)
+
+        async def events():
+            await asyncio.sleep(provider.first_delay())
+            for index, token in enumerate(tokens):
+                yield f"data: {json.dumps(_chunk(token, finish=index == len(tokens) - 1))}\r\n\r\n"
+                await asyncio.sleep(provider.token_gap())
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def search_app(provider: _Provider) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = await request.json()
+        await asyncio.sleep(provider.first_delay())
+        if provider.should_fail():
+            return _unavailable()
+        query = body.get("query", "")
+        count = min(int(body.get("max_results", 5)), int(provider.get("results", 5)))
+        results = [
+            {
+                "title": f"Result {i + 1} for {query}",
+                "url": f"https://example.com/{i + 1}",
+                "content": " ".join(_WORDS[: 30 + 5 * i]),
+                "score": round(1 - i * 0.1, 2),
+            }
+            for i in range(count)
+        ]
+        return {"query": query, "results": results, "response_time": provider.get("ttft_ms") / 1000}
+
+    return app
+
+
+def weather_app(provider: _Provider) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/data/2.5/weather")
+    async def weather(q: str = "London"):
+        await asyncio.sleep(provider.first_delay())
+        if provider.should_fail():
+            return _unavailable()
+        return {
+            "name": q.split(",")[0].title(),
+            "weather": [{"main": "Rain", "description": "light rain"}],
+            "main": {"temp": 11.5, "feels_like": 9.8, "humidity": 81},
+            "wind": {"speed": 4.1},
+        }
+
+    return app
+
+
+def tts_app(provider: _Provider) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/text-to-speech/{voice_id}/stream")
+    async def speak(voice_id: str, request: Request):
+        body = await request.json()
+        if provider.should_fail():
+            await asyncio.sleep(provider.first_delay())
+            return _unavailable()
+        total = max(1, int(len(body.get("text", "")) * provider.get("bytes_per_char", 900)))
+        chunk_bytes = int(provider.get("chunk_bytes", 4096))
+
+        async def audio():
+            await asyncio.sleep(provider.first_delay())
+            sent = 0
+            while sent < total:
+                size = min(chunk_bytes, total - sent)
+                yield b"\xff\xfb" + bytes(size - 2) if size > 2 else bytes(size)
+                sent += size
+                await asyncio.sleep(provider.token_gap() * size)
+
+        return StreamingResponse(audio(), media_type="audio/mpeg")
+
+    return app
+
+
+def _stt_result(text: str, is_final: bool, start: float) -> Dict[str, Any]:
+    words = [{"word": w, "start": start, "end": start, "confidence": 0.99, "punctuated_word": w} for w in text.split()]
+    return {
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": 1.0,
+        "start": start,
+        "is_final": is_final,
+        "speech_final": is_final,
+        "from_finalize": False,
+        "channel": {"alternatives": [{"transcript": text, "confidence": 0.99, "words": words}]},
+        "metadata": {
+            "request_id": str(uuid.uuid4()),
+            "model_info": {"name": "stub", "version": "0", "arch": "stub"},
+            "model_uuid": str(uuid.uuid4()),
+        },
+    }
+
+
+def stt_app(provider: _Provider) -> FastAPI:
+    """Deepgram live transcription over a websocket; transcripts come from the bench's marker frames."""
+    app = FastAPI()
+
+    @app.websocket("/v1/listen")
+    async def listen(websocket: WebSocket):
+        await websocket.accept()
+        provider.requests += 1
+        frames = 0
+        started = time.monotonic()
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                if data is None:
+                    text = message.get("text") or ""
+                    if '"CloseStream"' in text:
+                        break
+                    continue
+                if not data.startswith(AUDIO_MARKER):
+                    continue
+                frames += 1
+                script = json.loads(data[len(AUDIO_MARKER) :].split(b"\x00", 1)[0])
+                words = script["text"].split()
+                offset = time.monotonic() - started
+                if script.get("last"):
+                    await asyncio.sleep(provider.first_delay())
+                    await websocket.send_text(json.dumps(_stt_result(script["text"], True, offset)))
+                elif frames % max(1, int(provider.get("interim_every", 10))) == 0:
+                    heard = words[: max(1, int(len(words) * script.get("progress", 0.5)))]
+                    await websocket.send_text(json.dumps(_stt_result(" ".join(heard), False, offset)))
+        except WebSocketDisconnect:
+            pass
+
+    return app
+
+
+def mem0_app(provider: _Provider) -> FastAPI:
+    """Enough of the mem0 platform API for MemoryClient: ping, add, search, list."""
+    app = FastAPI()
+    memories: List[Dict[str, Any]] = [
+        {"id": str(uuid.uuid4()), "memory": "User's name is Sam", "user_id": "jarvis_user_1"},
+        {"id": str(uuid.uuid4()), "memory": "Prefers metric units", "user_id": "jarvis_user_1"},
+    ]
+
+    @app.api_route("/{path:path}", methods=["GET", "POST"])
+    async def handle(path: str, request: Request):
+        if path.startswith("v1/ping"):
+            return {"status": "ok", "org_id": "stub", "project_id": "stub", "user_email": "bench@example.com"}
+        await asyncio.sleep(provider.first_delay())
+        if provider.should_fail():
+            return _unavailable()
+        body: Dict[str, Any] = {}
+        if request.method == "POST":
+            try:
+                body = await request.json()
+            except ValueError:
+                body = {}
+        if "search" in path:
+            return memories[: int(body.get("limit") or body.get("top_k") or 5)]
+        if request.method == "POST" and "memories" in path:
+            return {"results": []}
+        if "memories" in path:
+            return memories
+        return Response(status_code=404)
+
+    return app
+
+
+_FACTORIES = {
+    "llm": openai_app,
+    "gemini": gemini_app,
+    "search": search_app,
+    "weather": weather_app,
+    "tts": tts_app,
+    "stt": stt_app,
+    "mem0": mem0_app,
+}
+
+
+class StubServers:
+    """All stubs in one event loop, one uvicorn server per provider."""
+
+    def __init__(self, profile: Optional[Dict[str, Dict[str, float]]] = None, base_port: int = BASE_PORT) -> None:
+        self.profile = profile or load_profile()
+        self.base_port = base_port
+        self.providers = {name: _Provider(name, self.profile.get(name, {})) for name in PORTS}
+        self._servers: List[uvicorn.Server] = []
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        for name, offset in PORTS.items():
+            config = uvicorn.Config(
+                _FACTORIES[name](self.providers[name]),
+                host=HOST,
+                port=self.base_port + offset,
+                log_level="warning",
+                lifespan="off",
+            )
+            server = uvicorn.Server(config)
+            self._servers.append(server)
+            self._tasks.append(asyncio.create_task(server.serve()))
+        while not all(server.started for server in self._servers):
+            if any(task.done() for task in self._tasks):
+                raise RuntimeError("a stub server failed to start (port in use?)")
+            await asyncio.sleep(0.05)
+
+    async def stop(self) -> None:
+        for server in self._servers:
+            server.should_exit = True
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._servers.clear()
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: {"requests": p.requests, "errors": p.errors} for name, p in self.providers.items()}
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    stubs = StubServers(load_profile(args.profile, args.set), base_port=args.base_port)
+    await stubs.start()
+    for key, value in sorted(backend_env(args.base_port).items()):
+        print(f"export {key}={value}")
+    print("# stubs running; Ctrl+C to stop", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stubs.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run local provider stubs for benchmarking")
+    parser.add_argument("--profile", help="JSON file with per-provider overrides")
+    parser.add_argument("--set", action="append", default=[], help="override, e.g. llm.ttft_ms=500")
+    parser.add_argument("--base-port", type=int, default=BASE_PORT)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,14 @@ OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 MEM0_API_KEY = os.getenv("MEM0_API_KEY")
 USER_ID = os.getenv("USER_ID", "jarvis_user_1")
 
+# Upstream endpoints; overridden to point at local stubs (see bench/stubs.py)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+TAVILY_BASE_URL = os.getenv("TAVILY_BASE_URL", "https://api.tavily.com")
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org")
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+DEEPGRAM_URL = os.getenv("DEEPGRAM_URL")
+MEM0_HOST = os.getenv("MEM0_HOST")
+
 # Model routing config
 FAST_MODEL = "llama-3.3-70b-versatile"   # Groq - fastest inference
 SMART_MODEL = "gemini-2.0-flash"          # Gemini - best free reasoning
@@ -24,8 +32,8 @@ SMART_MODEL = "gemini-2.0-flash"          # Gemini - best free reasoning
 # Word threshold for routing
 FAST_MODEL_WORD_THRESHOLD = 15
 
-# Model registries for future provider expansion
-GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+# Model registries; base URLs can point at local stub servers for testing
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
 GROQ_MODELS = {
     "groq_llama33_70b": "llama-3.3-70b-versatile",
     "groq_llama31_8b": "llama-3.1-8b-instant",
@@ -42,7 +50,7 @@ GEMINI_MODELS = {
     "gemini_20_thinking": "gemini-2.0-flash-thinking-exp",
 }
 
-OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 OPENROUTER_MODELS = {
     "openrouter_gemini20": "google/gemini-2.0-flash-exp:free",
     "openrouter_llama33": "meta-llama/llama-3.3-70b-instruct:free",
@@ -51,13 +59,13 @@ OPENROUTER_MODELS = {
     "openrouter_qwen25": "qwen/qwen-2.5-72b-instruct:free",
 }
 
-CEREBRAS_BASE_URL = "https://api.cerebras.ai/v1"
+CEREBRAS_BASE_URL = os.getenv("CEREBRAS_BASE_URL", "https://api.cerebras.ai/v1")
 CEREBRAS_MODELS = {
     "cerebras_llama33_70b": "llama-3.3-70b",
     "cerebras_llama31_8b": "llama-3.1-8b",
 }
 
-MISTRAL_BASE_URL = "https://api.mistral.ai/v1"
+MISTRAL_BASE_URL = os.getenv("MISTRAL_BASE_URL", "https://api.mistral.ai/v1")
 MISTRAL_MODELS = {
     "mistral_nemo": "open-mistral-nemo",
     "mistral_small": "mistral-small-latest",
@@ -68,7 +76,229 @@ MISTRAL_MODELS = {
 AGENT_TIMEOUT_DEFAULT = 4.0
 AGENT_TIMEOUT_PREFLIGHT = 2.0
 AGENT_TIMEOUT_TOOLS = 3.0
-AGENT_TIMEOUT_SUMMARY = 1.5
+# Summaries run in the background after a turn, so this only bounds one chunk/merge call
+AGENT_TIMEOUT_SUMMARY = 10.0
 ORCHESTRATOR_VERSION = "2.0"
 CONTEXT_LLM_TIMEOUT_S = 0.6
+CONTEXT_CACHE_MAX_ENTRIES = 1024
+CONTEXT_CACHE_TTL_S = 600.0
 SEARCH_AGENT_TIMEOUT_S = 3.0
+# Start likely tool agents from local signals while preflight is still running
+SPECULATIVE_TOOLS_ENABLED = True
+# Per-agent bulkheads: name -> (max concurrent runs, max queued runs); runs beyond the queue are shed
+AGENT_BULKHEADS = {
+    "context": (32, 64),
+    "memory": (16, 32),
+    "search": (16, 32),
+    "weather": (16, 32),
+    "chat": (32, 64),
+    "summarizer": (4, 8),
+    "memory_writer": (4, 16),
+}
+AGENT_BULKHEAD_DEFAULT = (16, 32)
+# Named thread pools for blocking SDK calls: name -> (threads, max queued calls).
+# Reads and writes are split so background memory writes cannot take the threads turn-path reads need.
+AGENT_EXECUTORS = {
+    "memory_read": (8, 16),
+    "memory_write": (2, 32),
+    "memory_sync": (1, 4),
+}
+
+# Weather cache: fresh for TTL, served stale (with a background refresh) until STALE
+WEATHER_CACHE_TTL_S = 600.0
+WEATHER_CACHE_STALE_S = 3600.0
+WEATHER_CACHE_MAX_ENTRIES = 512
+WEATHER_MAX_CITIES = 3
+
+# Search cache: TTL per freshness class, bounded by entries and cached text size
+SEARCH_CACHE_TTLS = {
+    "news": 300.0,
+    "recent": 3600.0,
+    "evergreen": 86400.0,
+}
+SEARCH_CACHE_MAX_ENTRIES = 2048
+SEARCH_CACHE_MAX_BYTES = 8 * 1024 * 1024
+# Set to a file path to persist the search cache across restarts
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "")
+
+# Local mirror of mem0 memories
+MEMORY_MIRROR_RECENT_SIZE = 32
+MEMORY_MIRROR_REFRESH_S = 300.0
+# Local writes are kept in the mirror until mem0 returns them (or this long, as mem0 may reword them)
+MEMORY_MIRROR_LOCAL_ADD_TTL_S = 3600.0
+
+# Shared HTTP client pool (one keep-alive pool per upstream host)
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+HTTP_POOL_HTTP2 = os.getenv("HTTP_POOL_HTTP2", "0") == "1"
+HTTP_POOL_KEEPALIVE_EXPIRY_S = 30.0
+HTTP_TIMEOUT_CONNECT_S = 3.0
+# name -> (max_connections, max_keepalive_connections)
+HTTP_POOL_LIMITS = {
+    "default": (20, 10),
+    "search": (10, 5),
+    "weather": (10, 5),
+    "tts": (8, 4),
+    "llm": (64, 32),
+}
+# name -> read/write timeout in seconds
+HTTP_TIMEOUTS = {
+    "default": 5.0,
+    "search": 5.0,
+    "weather": 5.0,
+    "tts": 30.0,
+    "llm": 60.0,
+}
+
+# Upper bound on concurrent LLM calls/streams across all agents and sessions
+LLM_MAX_CONCURRENCY = 32
+
+# Memory backend: "mem0" (hosted, mirrored locally) or "local" (offline vector store)
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "mem0")
+MEMORY_LOCAL_DIR = os.getenv("MEMORY_LOCAL_DIR", "data/memory")
+MEMORY_EMBED_DIM = 1024
+# Compact the local store on startup once this fraction of rows is deleted
+MEMORY_COMPACT_RATIO = 0.25
+
+# Rolling conversation summaries: once more than SUMMARY_MAX_RAW_MESSAGES are kept
+# verbatim, the oldest SUMMARY_CHUNK_MESSAGES are summarized (once) in the background;
+# every SUMMARY_MERGE_FANOUT summaries on one level are merged into the next level up.
+SUMMARY_MAX_RAW_MESSAGES = 16
+SUMMARY_CHUNK_MESSAGES = 8
+SUMMARY_MERGE_FANOUT = 4
+
+# Prompt budgets (estimated input tokens) per chat model
+PROMPT_TOKEN_BUDGETS = {
+    "default": 3000,
+    FAST_MODEL: 3000,
+    SMART_MODEL: 6000,
+}
+# Context sections in priority order: name -> (section cap, per-item cap) in tokens.
+# History gets whatever is left, newest messages first.
+PROMPT_SECTIONS = {
+    "weather": (300, 120),
+    "memory": (600, 120),
+    "search": (1200, 300),
+}
+
+# WebSocket protocol: clients that send {"type": "hello", "binary_audio": true}
+# exchange audio as raw binary frames; everyone else keeps base64-in-JSON.
+WS_PROTOCOL_VERSION = 2
+WS_BINARY_AUDIO_ENABLED = os.getenv("WS_BINARY_AUDIO_ENABLED", "1") == "1"
+
+# TTS sentence segmentation. The first chunk of a turn is flushed early (a short
+# sentence, or a clause once it is long enough) to cut time-to-first-audio; later
+# chunks gather whole sentences up to SEGMENT_MIN_CHARS for smoother prosody.
+SEGMENT_FIRST_MIN_CHARS = 8
+SEGMENT_FIRST_CLAUSE_CHARS = 30
+SEGMENT_FIRST_MAX_CHARS = 90
+SEGMENT_MIN_CHARS = 60
+SEGMENT_MAX_CHARS = 280
+
+# TTS pipeline: sentences synthesized ahead of the one currently streaming, and a
+# cap on audio buffered for them (the sentence being played is never held back)
+TTS_PREFETCH_DEPTH = 2
+TTS_PREFETCH_MAX_BYTES = 512 * 1024
+
+# Content-addressed TTS audio cache on disk (LRU by total size)
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") == "1"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "data/tts_cache")
+TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TTS_CACHE_CHUNK_BYTES = 4096
+# Pre-rendered in the background at startup so stock replies never wait on ElevenLabs
+TTS_WARMUP_PHRASES = [
+    "Sorry, I didn't catch that.",
+    "One moment.",
+    "Sure.",
+    "Got it.",
+    "Hello! How can I help you today?",
+    "Something went wrong. Please try again.",
+]
+
+# Session turns. "interrupt": new speech or text cancels the running turn (LLM
+# stream, queued TTS and client-side audio). "queue": it waits for the running
+# turn; at most TURN_QUEUE_MAX turns wait, the oldest is dropped beyond that.
+TURN_POLICY = os.getenv("TURN_POLICY", "interrupt")
+TURN_QUEUE_MAX = 2
+TURN_AUDIO_DRAIN_TIMEOUT_S = 30.0
+# A voice final transcript this soon after an unanswered voice turn was cancelled is the rest of
+# the same utterance (split by STT endpointing) and is sent together with it
+TURN_MERGE_WINDOW_S = 3.0
+# Stop speaking as soon as an interim transcript shows the user talking over Jarvis
+BARGE_IN_ENABLED = os.getenv("BARGE_IN_ENABLED", "1") == "1"
+BARGE_IN_MIN_CHARS = 3
+# Only barge in once the turn is audible; before that an interim transcript is usually the
+# rest of the same utterance after an endpointing pause (see TURN_MERGE_WINDOW_S)
+BARGE_IN_REQUIRE_AUDIO = os.getenv("BARGE_IN_REQUIRE_AUDIO", "1") == "1"
+
+# OpenAI-compatible chat providers, all served by one SSE code path: name -> (base_url, api_key)
+OPENAI_COMPAT_PROVIDERS = {
+    "groq": (GROQ_BASE_URL, GROQ_API_KEY),
+    "cerebras": (CEREBRAS_BASE_URL, CEREBRAS_API_KEY),
+    "mistral": (MISTRAL_BASE_URL, MISTRAL_API_KEY),
+    "openrouter": (OPENROUTER_BASE_URL, OPENROUTER_API_KEY),
+}
+# Latency-aware chat routing. Candidates per tier as (provider, model), in preference
+# order until enough latency samples exist; providers without an API key are skipped.
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1") == "1"
+ROUTER_TIERS = {
+    "fast": [
+        ("groq", GROQ_MODELS["groq_llama33_70b"]),
+        ("cerebras", CEREBRAS_MODELS["cerebras_llama33_70b"]),
+        ("mistral", MISTRAL_MODELS["mistral_small"]),
+        ("groq", GROQ_MODELS["groq_llama31_8b"]),
+    ],
+    "smart": [
+        ("gemini", SMART_MODEL),
+        ("openrouter", OPENROUTER_MODELS["openrouter_gemini20"]),
+        ("groq", GROQ_MODELS["groq_llama33_70b"]),
+    ],
+}
+ROUTER_EWMA_ALPHA = 0.2
+ROUTER_WINDOW = 64            # samples kept per route for percentiles
+ROUTER_MIN_SAMPLES = 3        # below this a route is ranked by preference order
+ROUTER_EXPLORE_RATE = 0.05    # chance of trying an under-sampled route instead
+ROUTER_EXPECTED_TOKENS = 120  # response length used to weigh TTFT against tokens/sec
+ROUTER_FAILURES_TO_TRIP = 3
+ROUTER_COOLDOWN_S = 30.0
+
+# Hedged chat: if the primary route has no first token after the hedge delay, start a
+# second provider; the first to produce a token wins and the other is cancelled.
+# The delay is the primary's p95 TTFT (clamped) once it has samples, else the default.
+CHAT_HEDGE_ENABLED = os.getenv("CHAT_HEDGE_ENABLED", "1") == "1"
+CHAT_HEDGE_DEFAULT_DELAY_MS = 800
+CHAT_HEDGE_MIN_DELAY_MS = 250
+CHAT_HEDGE_MAX_DELAY_MS = 2500
+
+# Chat response cache for answers that do not depend on who is asking or on the
+# conversation so far. Answers built on search/weather context expire sooner.
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_INTENTS = {"question_factual", "search_needed", "weather_query"}
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+RESPONSE_CACHE_TTL_S = 24 * 3600
+RESPONSE_CACHE_CONTEXT_TTL_S = 600
+# Delay between replayed tokens on a hit, so TTS segmentation and the UI see a normal stream
+RESPONSE_CACHE_REPLAY_TOKEN_MS = 15
+
+# Prometheus-format /metrics; recording is a dict lookup and a bisect per sample.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_LATENCY_BUCKETS_S = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+# Per-turn span tracing to a rotating JSONL file (data/traces/spans.jsonl).
+# A sampled fraction of turns is kept, plus every slow or failed turn.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+TRACE_SLOW_TURN_MS = 2000
+TRACE_DIR = os.getenv("TRACE_DIR", "data/traces")
+TRACE_FILE_MAX_BYTES = 16 * 1024 * 1024
+TRACE_FILE_BACKUPS = 5
+TRACE_BUFFER_MAX_SPANS = 20000
+TRACE_FLUSH_INTERVAL_S = 1.0
+
+# Event-loop health: lag sampling plus a watchdog thread that logs the loop
+# thread's stack when one callback holds the loop past the threshold.
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "1") == "1"
+LOOP_MONITOR_INTERVAL_MS = 50
+LOOP_MONITOR_WINDOW = 1200
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "250"))
+LOOP_BLOCK_STACK_DEPTH = 30
+LOOP_BLOCK_MAX_REPORTS = 20
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, TypeVar
+
+from core.metrics import bulkhead_queued, bulkhead_shed, executor_queue_wait
+
+T = TypeVar("T")
+
+
+class BulkheadFull(Exception):
+    """Raised instead of queueing when a bulkhead's wait queue is already at its cap."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"bulkhead_full:{name}")
+        self.name = name
+
+
+class Bulkhead:
+    """Concurrency limit plus a capped wait queue.
+
+    Up to ``max_concurrent`` holders run at once and up to ``max_queue``
+    more wait for a slot; anything beyond that is refused immediately with
+    BulkheadFull, so an overloaded dependency fails fast instead of
+    building an unbounded backlog.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int) -> None:
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+        bulkhead_queued.set_function(lambda: self.waiting, name)
+
+    async def acquire(self) -> float:
+        """Take a slot and return the seconds spent waiting for it."""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.shed += 1
+            bulkhead_shed.inc(self.name)
+            raise BulkheadFull(self.name)
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return time.perf_counter() - start
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        waited = await self.acquire()
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "shed": self.shed,
+        }
+
+
+class BoundedExecutor:
+    """Named thread pool for blocking SDK calls, fronted by a Bulkhead.
+
+    ThreadPoolExecutor queues without limit, so submissions are gated by a
+    bulkhead sized to the thread count: a submitted call always has a free
+    thread and the backlog lives in the bulkhead's capped queue. The slot is
+    released when the thread finishes, not when the awaiting coroutine gives
+    up, so a caller timing out cannot let more work pile onto busy threads.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int) -> None:
+        self.name = name
+        self.bulkhead = Bulkhead(f"executor.{name}", max_workers, max_queue)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.max_workers = max_workers
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"exec-{self.name}")
+        return self._pool
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        await self.bulkhead.acquire()
+        started: list = []
+
+        def _call() -> T:
+            started.append(time.perf_counter())
+            return fn(*args)
+
+        def _release(_: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(self.bulkhead.release)
+            except RuntimeError:
+                # Loop already closed during shutdown; nothing is waiting on the slot.
+                pass
+
+        try:
+            future = self._executor().submit(_call)
+        except BaseException:
+            self.bulkhead.release()
+            raise
+        future.add_done_callback(_release)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            # Observed here rather than on the worker so metrics are only touched from the loop.
+            if started:
+                executor_queue_wait.observe(started[0] - submitted, self.name)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"threads": self.max_workers, **self.bulkhead.stats()}
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """Small LRU cache with a per-entry TTL and hit/miss counters.
+
+    With max_weight and weigher set, entries are also evicted (LRU first)
+    until the summed weight fits. Not thread-safe; meant to be used from
+    the event loop only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_s: float,
+        max_weight: Optional[int] = None,
+        weigher: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_weight = max_weight
+        self._weigher = weigher
+        self._weights: Dict[Hashable, int] = {}
+        self.weight = 0
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, stored_at, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_with_age(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Like get(), but returns (value, age_s) so callers can apply their own freshness rules."""
+        entry = self._data.get(key)
+        now = time.monotonic()
+        if entry is None or now >= entry[2]:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0], now - entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        now = time.monotonic()
+        ttl = self.ttl_s if ttl_s is None else ttl_s
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, now, now + ttl)
+        if self._weigher is not None:
+            weight = int(self._weigher(value))
+            self._weights[key] = weight
+            self.weight += weight
+        while len(self._data) > self.max_entries or (
+            self.max_weight is not None and self.weight > self.max_weight and len(self._data) > 1
+        ):
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> Optional[Tuple[Any, float, float]]:
+        entry = self._data.pop(key, None)
+        self.weight -= self._weights.pop(key, 0)
+        return entry
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._remove(key)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._weights.clear()
+        self.weight = 0
+
+    def snapshot(self) -> List[Tuple[Hashable, Any, float]]:
+        """Live entries as (key, value, remaining_ttl_s), oldest first; pair with set() to restore."""
+        now = time.monotonic()
+        return [(key, value, expires_at - now) for key, (value, _, expires_at) in self._data.items() if expires_at > now]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and time.monotonic() < entry[2]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "weight": self.weight,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight task.
+
+    Waiters are shielded, so one caller timing out does not cancel the
+    shared fetch for everybody else.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.shared = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def start(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+            return task
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+
+        def _done(t: "asyncio.Task[Any]") -> None:
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+            if not t.cancelled():
+                t.exception()
+
+        task.add_done_callback(_done)
+        return task
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        return await asyncio.shield(self.start(key, fn))
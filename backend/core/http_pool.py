@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+import httpx
+
+from config import (
+    HTTP_POOL_HTTP2,
+    HTTP_POOL_KEEPALIVE_EXPIRY_S,
+    HTTP_POOL_LIMITS,
+    HTTP_TIMEOUT_CONNECT_S,
+    HTTP_TIMEOUTS,
+)
+from core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+
+class _PoolStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.hits = 0
+        self.new_connections = 0
+        self.errors = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.connect_ms_total = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hits": self.hits,
+            "new_connections": self.new_connections,
+            "errors": self.errors,
+            "wait_ms_avg": round(self.wait_ms_total / self.requests, 2) if self.requests else 0.0,
+            "wait_ms_max": round(self.wait_ms_max, 2),
+            "connect_ms_avg": round(self.connect_ms_total / self.new_connections, 2) if self.new_connections else 0.0,
+        }
+
+
+class _RequestTracer:
+    """httpcore trace hook: tells apart reused and freshly dialled connections.
+
+    Pool wait runs from the request hook to the first connection event (a
+    dial starting, or headers going out on a reused connection); dialling
+    and TLS are counted separately as connect time.
+    """
+
+    def __init__(self, stats: _PoolStats) -> None:
+        self._stats = stats
+        self._start = time.perf_counter()
+        self._connect_start = 0.0
+        self._waited = False
+        self._sent = False
+
+    def _end_wait(self, now: float) -> None:
+        if self._waited:
+            return
+        self._waited = True
+        wait_ms = (now - self._start) * 1000
+        self._stats.wait_ms_total += wait_ms
+        self._stats.wait_ms_max = max(self._stats.wait_ms_max, wait_ms)
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.started":
+            self._connect_start = time.perf_counter()
+            self._end_wait(self._connect_start)
+        elif event_name.endswith("send_request_headers.started") and not self._sent:
+            self._sent = True
+            now = time.perf_counter()
+            self._end_wait(now)
+            if self._connect_start:
+                self._stats.new_connections += 1
+                self._stats.connect_ms_total += (now - self._connect_start) * 1000
+            else:
+                self._stats.hits += 1
+
+
+class _TracedTransport(httpx.AsyncBaseTransport):
+    """Ends the request's http.* span when the call never reaches the response hook.
+
+    Connect errors, timeouts and cancellations skip httpx's response hooks;
+    those are exactly the calls a slow-turn trace needs to show.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, stats: _PoolStats) -> None:
+        self._inner = inner
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            return await self._inner.handle_async_request(request)
+        except asyncio.CancelledError:
+            span = request.extensions.get("jarvis_span")
+            if span is not None:
+                span.end("cancelled")
+            raise
+        except Exception as exc:
+            self._stats.errors += 1
+            span = request.extensions.get("jarvis_span")
+            if span is not None:
+                span.set(error=type(exc).__name__)
+                span.end("error")
+            raise
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class HttpClientPool:
+    """Named, long-lived httpx clients (one per upstream host) owned by the app lifespan."""
+
+    def __init__(self) -> None:
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, _PoolStats] = {}
+
+    def _build(self, name: str) -> httpx.AsyncClient:
+        max_connections, max_keepalive = HTTP_POOL_LIMITS.get(name, HTTP_POOL_LIMITS["default"])
+        read_timeout = HTTP_TIMEOUTS.get(name, HTTP_TIMEOUTS["default"])
+        http2 = HTTP_POOL_HTTP2 and _H2_AVAILABLE
+        if HTTP_POOL_HTTP2 and not _H2_AVAILABLE:
+            logger.warning("http_pool http2 requested but h2 is not installed; using HTTP/1.1")
+
+        stats = self._stats.setdefault(name, _PoolStats())
+
+        async def _on_request(request: httpx.Request) -> None:
+            stats.requests += 1
+            request.extensions["trace"] = _RequestTracer(stats)
+            request.extensions["jarvis_span"] = tracer.start_span(f"http.{name}", method=request.method, host=request.url.host)
+
+        async def _on_response(response: httpx.Response) -> None:
+            if response.status_code >= 500:
+                stats.errors += 1
+            # Ends at response headers; streamed bodies are covered by the caller's span.
+            span = response.request.extensions.get("jarvis_span")
+            if span is not None:
+                span.set(status_code=response.status_code)
+                span.end("error" if response.status_code >= 500 else None)
+
+        transport = httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY_S,
+            ),
+        )
+        return httpx.AsyncClient(
+            transport=_TracedTransport(transport, stats),
+            timeout=httpx.Timeout(read_timeout, connect=HTTP_TIMEOUT_CONNECT_S),
+            event_hooks={"request": [_on_request], "response": [_on_response]},
+        )
+
+    def client(self, name: str = "default") -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build(name)
+            self._clients[name] = client
+        return client
+
+    async def start(self) -> None:
+        for name in HTTP_POOL_LIMITS:
+            if name != "default":
+                self.client(name)
+        logger.info("http_pool started clients=%s http2=%s", sorted(self._clients), HTTP_POOL_HTTP2 and _H2_AVAILABLE)
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as exc:
+                logger.warning("http_pool close error: %s", exc)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stats.as_dict() for name, stats in sorted(self._stats.items())}
+
+
+http_pool = HttpClientPool()
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import groq
+from google import genai
+from google.genai import types
+
+from config import (
+    FAST_MODEL,
+    GEMINI_API_KEY,
+    GEMINI_BASE_URL,
+    GROQ_API_KEY,
+    GROQ_BASE_URL,
+    LLM_MAX_CONCURRENCY,
+    OPENAI_COMPAT_PROVIDERS,
+    SMART_MODEL,
+)
+from core.http_pool import http_pool
+
+logger = logging.getLogger(__name__)
+
+
+def _gemini_contents(messages: List[Dict[str, str]]) -> Tuple[str, List[types.Content]]:
+    """OpenAI-style messages -> (system_instruction, contents); later system messages speak as the model."""
+    system_prompt = ""
+    if messages and messages[0]["role"] == "system":
+        system_prompt, messages = messages[0]["content"], messages[1:]
+    contents = [
+        types.Content(role="user" if m["role"] == "user" else "model", parts=[types.Part(text=m["content"])])
+        for m in messages
+    ]
+    return system_prompt, contents
+
+
+class LLMClient:
+    """Shared async Groq/Gemini access for every agent.
+
+    All calls go through one semaphore so a burst of sessions queues here
+    instead of piling up threads. Streams are async generators: closing or
+    cancelling the consumer closes the upstream HTTP response.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY) -> None:
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._groq: Optional[groq.AsyncGroq] = None
+        self._groq_http = None
+        self._gemini: Optional[genai.Client] = None
+        self.in_flight = 0
+
+    def _groq_client(self) -> groq.AsyncGroq:
+        http_client = http_pool.client("llm")
+        if self._groq is None or self._groq_http is not http_client:
+            # The SDK appends /openai/v1 itself.
+            base_url = GROQ_BASE_URL.rsplit("/openai/v1", 1)[0]
+            self._groq = groq.AsyncGroq(api_key=GROQ_API_KEY, base_url=base_url, http_client=http_client)
+            self._groq_http = http_client
+        return self._groq
+
+    def _gemini_client(self):
+        if self._gemini is None:
+            http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+            self._gemini = genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+        return self._gemini.aio
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = FAST_MODEL,
+        max_tokens: int = 1024,
+        temperature: Optional[float] = None,
+    ) -> str:
+        kwargs: Dict[str, Any] = {"model": model, "messages": messages, "max_tokens": max_tokens}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                response = await self._groq_client().chat.completions.create(**kwargs)
+            finally:
+                self.in_flight -= 1
+        return response.choices[0].message.content or ""
+
+    async def stream_gemini(
+        self,
+        contents: List[types.Content],
+        system_prompt: str,
+        model: str = SMART_MODEL,
+        max_tokens: int = 1024,
+    ) -> AsyncIterator[str]:
+        async with self._semaphore:
+            self.in_flight += 1
+            stream = None
+            try:
+                stream = await self._gemini_client().models.generate_content_stream(
+                    model=model,
+                    contents=contents,
+                    config=types.GenerateContentConfig(system_instruction=system_prompt, max_output_tokens=max_tokens),
+                )
+                async for chunk in stream:
+                    if not chunk.candidates:
+                        continue
+                    for part in chunk.candidates[0].content.parts or []:
+                        if getattr(part, "text", None):
+                            yield part.text
+            finally:
+                self.in_flight -= 1
+                if stream is not None and hasattr(stream, "aclose"):
+                    await stream.aclose()
+
+    async def stream_openai(
+        self,
+        provider: str,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int = 1024,
+    ) -> AsyncIterator[str]:
+        """Stream from any OpenAI-compatible /chat/completions endpoint over the shared pool."""
+        base_url, api_key = OPENAI_COMPAT_PROVIDERS[provider]
+        payload = {"model": model, "messages": messages, "max_tokens": max_tokens, "stream": True}
+        headers = {"Authorization": f"Bearer {api_key}"}
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                async with http_pool.client("llm").stream("POST", f"{base_url}/chat/completions", headers=headers, json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(data)
+                        except json.JSONDecodeError:
+                            continue
+                        choices = chunk.get("choices") or []
+                        content = (choices[0].get("delta") or {}).get("content") if choices else None
+                        if content:
+                            yield content
+            finally:
+                self.in_flight -= 1
+
+    def stream_chat(
+        self,
+        provider: str,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int = 1024,
+    ) -> AsyncIterator[str]:
+        """One entry point for chat streams: Gemini natively, everything else via stream_openai."""
+        if provider == "gemini":
+            system_prompt, contents = _gemini_contents(messages)
+            return self.stream_gemini(contents, system_prompt, model=model, max_tokens=max_tokens)
+        return self.stream_openai(provider, messages, model=model, max_tokens=max_tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"in_flight": self.in_flight, "max_concurrency": LLM_MAX_CONCURRENCY}
+
+    async def aclose(self) -> None:
+        if self._gemini is not None and hasattr(self._gemini.aio, "aclose"):
+            try:
+                await self._gemini.aio.aclose()
+            except Exception as exc:
+                logger.warning("llm_client gemini close error: %s", exc)
+        self._gemini = None
+        self._groq = None
+        self._groq_http = None
+
+
+llm_client = LLMClient()
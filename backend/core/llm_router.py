@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, NamedTuple, Optional
+
+from config import (
+    CHAT_HEDGE_DEFAULT_DELAY_MS,
+    CHAT_HEDGE_ENABLED,
+    CHAT_HEDGE_MAX_DELAY_MS,
+    CHAT_HEDGE_MIN_DELAY_MS,
+    GEMINI_API_KEY,
+    OPENAI_COMPAT_PROVIDERS,
+    ROUTER_COOLDOWN_S,
+    ROUTER_EWMA_ALPHA,
+    ROUTER_EXPECTED_TOKENS,
+    ROUTER_EXPLORE_RATE,
+    ROUTER_FAILURES_TO_TRIP,
+    ROUTER_MIN_SAMPLES,
+    ROUTER_TIERS,
+    ROUTER_WINDOW,
+)
+from core.llm_client import llm_client
+from core.metrics import llm_failures, llm_ttft
+from core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class Route(NamedTuple):
+    provider: str
+    model: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+def _percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class RouteStats:
+    """Rolling latency for one provider/model: EWMA for ranking, a window for percentiles."""
+
+    ttft_ewma_ms: Optional[float] = None
+    tps_ewma: Optional[float] = None
+    ttft_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=ROUTER_WINDOW))
+    tps: Deque[float] = field(default_factory=lambda: deque(maxlen=ROUTER_WINDOW))
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+
+    def record_ttft(self, ttft_ms: float) -> None:
+        self.ttft_ms.append(ttft_ms)
+        self.ttft_ewma_ms = ttft_ms if self.ttft_ewma_ms is None else (
+            ROUTER_EWMA_ALPHA * ttft_ms + (1 - ROUTER_EWMA_ALPHA) * self.ttft_ewma_ms
+        )
+
+    def record_success(self, tokens: int, stream_s: float) -> None:
+        self.successes += 1
+        self.consecutive_failures = 0
+        if tokens > 1 and stream_s > 0:
+            rate = tokens / stream_s
+            self.tps.append(rate)
+            self.tps_ewma = rate if self.tps_ewma is None else (
+                ROUTER_EWMA_ALPHA * rate + (1 - ROUTER_EWMA_ALPHA) * self.tps_ewma
+            )
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= ROUTER_FAILURES_TO_TRIP:
+            self.cooldown_until = time.monotonic() + ROUTER_COOLDOWN_S
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def expected_ms(self) -> Optional[float]:
+        if len(self.ttft_ms) < ROUTER_MIN_SAMPLES or self.ttft_ewma_ms is None:
+            return None
+        generation_ms = ROUTER_EXPECTED_TOKENS / self.tps_ewma * 1000 if self.tps_ewma else 0.0
+        return self.ttft_ewma_ms + generation_ms
+
+    def ttft_percentile(self, q: float) -> Optional[float]:
+        return _percentile(list(self.ttft_ms), q)
+
+    def snapshot(self) -> Dict[str, Any]:
+        def _round(value):
+            return None if value is None else round(value, 1)
+
+        return {
+            "ttft_ewma_ms": _round(self.ttft_ewma_ms),
+            "ttft_p50_ms": _round(self.ttft_percentile(0.5)),
+            "ttft_p95_ms": _round(self.ttft_percentile(0.95)),
+            "tps_ewma": _round(self.tps_ewma),
+            "tps_p50": _round(_percentile(list(self.tps), 0.5)),
+            "samples": len(self.ttft_ms),
+            "successes": self.successes,
+            "failures": self.failures,
+            "healthy": self.healthy(),
+        }
+
+
+class LLMRouter:
+    """Picks the fastest healthy provider/model for a tier and measures every stream it serves."""
+
+    def __init__(self, tiers: Optional[Dict[str, List[tuple]]] = None) -> None:
+        self.tiers = {name: [Route(*r) for r in routes] for name, routes in (tiers or ROUTER_TIERS).items()}
+        self._stats: Dict[Route, RouteStats] = {}
+        self.hedge_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0}
+
+    def stats_for(self, route: Route) -> RouteStats:
+        stats = self._stats.get(route)
+        if stats is None:
+            stats = RouteStats()
+            self._stats[route] = stats
+        return stats
+
+    @staticmethod
+    def available(route: Route) -> bool:
+        if route.provider == "gemini":
+            return bool(GEMINI_API_KEY)
+        provider = OPENAI_COMPAT_PROVIDERS.get(route.provider)
+        return provider is not None and bool(provider[1])
+
+    def rank(self, tier: str) -> List[Route]:
+        """Healthy routes, fastest expected first; unmeasured routes keep config order after them."""
+        candidates = [r for r in self.tiers.get(tier) or self.tiers["fast"] if self.available(r)]
+        healthy = [r for r in candidates if self.stats_for(r).healthy()] or candidates
+        measured = sorted((r for r in healthy if self.stats_for(r).expected_ms() is not None), key=lambda r: self.stats_for(r).expected_ms())
+        unmeasured = [r for r in healthy if self.stats_for(r).expected_ms() is None]
+        if unmeasured and measured and random.random() < ROUTER_EXPLORE_RATE:
+            return unmeasured[:1] + measured + unmeasured[1:]
+        return measured + unmeasured if measured else unmeasured
+
+    def pick(self, tier: str) -> Route:
+        ranked = self.rank(tier)
+        if not ranked:
+            # Nothing configured has a key; let the request fail loudly downstream.
+            return (self.tiers.get(tier) or self.tiers["fast"])[0]
+        return ranked[0]
+
+    async def stream(self, route: Route, messages: List[Dict[str, str]], max_tokens: int = 1024) -> AsyncIterator[str]:
+        stats = self.stats_for(route)
+        start = time.perf_counter()
+        first_at: Optional[float] = None
+        tokens = 0
+        try:
+            async for token in llm_client.stream_chat(route.provider, messages, model=route.model, max_tokens=max_tokens):
+                if first_at is None:
+                    first_at = time.perf_counter()
+                    stats.record_ttft((first_at - start) * 1000)
+                    llm_ttft.observe(first_at - start, route.provider, route.model)
+                    tracer.event("llm.first_token", provider=route.provider, model=route.model, ttft_ms=round((first_at - start) * 1000, 1))
+                tokens += 1
+                yield token
+        except Exception:
+            stats.record_failure()
+            llm_failures.inc(route.provider, route.model)
+            logger.warning("llm_router route=%s failed after tokens=%s", route.key, tokens)
+            raise
+        if first_at is None:
+            stats.record_failure()
+            llm_failures.inc(route.provider, route.model)
+            return
+        stats.record_success(tokens, time.perf_counter() - first_at)
+
+    def hedge_partner(self, primary: Route, tier: str) -> Optional[Route]:
+        """Best other route, preferring a different provider so one outage cannot take out both."""
+        ranked = [r for r in self.rank(tier) + self.rank("fast") if r != primary]
+        for route in ranked:
+            if route.provider != primary.provider:
+                return route
+        return ranked[0] if ranked else None
+
+    def hedge_delay_ms(self, route: Route) -> float:
+        stats = self.stats_for(route)
+        p95 = stats.ttft_percentile(0.95) if len(stats.ttft_ms) >= ROUTER_MIN_SAMPLES else None
+        if p95 is None:
+            return CHAT_HEDGE_DEFAULT_DELAY_MS
+        return min(CHAT_HEDGE_MAX_DELAY_MS, max(CHAT_HEDGE_MIN_DELAY_MS, p95))
+
+    async def hedged_stream(
+        self,
+        primary: Route,
+        secondary: Optional[Route],
+        messages: List[Dict[str, str]],
+        max_tokens: int = 1024,
+        info: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        """Stream from whichever route produces a first token first; the other is cancelled.
+
+        The secondary starts after the hedge delay, or immediately if the
+        primary fails before its first token. Tokens only ever come from the
+        winner, so callers never see two streams interleaved.
+        """
+        info = info if info is not None else {}
+        delay_ms = self.hedge_delay_ms(primary) if CHAT_HEDGE_ENABLED else None
+        info.update({"hedged": False, "winner": primary.key, "provider": primary.provider, "model": primary.model, "role": "primary", "delay_ms": delay_ms})
+        self.hedge_stats["requests"] += 1
+
+        streams = {primary: self.stream(primary, messages, max_tokens)}
+        firsts = {asyncio.ensure_future(streams[primary].__anext__()): primary}
+        winner: Optional[Route] = None
+        first_token = ""
+        last_error: Optional[BaseException] = None
+
+        def _start_secondary() -> None:
+            if secondary is None or secondary in streams:
+                return
+            info["hedged"] = True
+            self.hedge_stats["hedged"] += 1
+            streams[secondary] = self.stream(secondary, messages, max_tokens)
+            firsts[asyncio.ensure_future(streams[secondary].__anext__())] = secondary
+
+        try:
+            timeout = None if delay_ms is None or secondary is None else delay_ms / 1000
+            while firsts and winner is None:
+                done, _ = await asyncio.wait(list(firsts), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                timeout = None
+                if not done:
+                    _start_secondary()
+                    continue
+                for task in done:
+                    route = firsts.pop(task)
+                    if winner is None and not task.exception():
+                        winner, first_token = route, task.result()
+                    elif task.exception():
+                        last_error = task.exception()
+                        if route == primary:
+                            self.hedge_stats["failovers"] += 1
+                            _start_secondary()
+            if winner is None:
+                if isinstance(last_error, StopAsyncIteration):
+                    return
+                raise last_error or RuntimeError("no route produced a token")
+        finally:
+            for task, route in firsts.items():
+                task.cancel()
+            if firsts:
+                await asyncio.wait(list(firsts))
+            for route, stream in streams.items():
+                if route != winner:
+                    await stream.aclose()
+
+        if winner != primary:
+            info.update({"winner": winner.key, "provider": winner.provider, "model": winner.model, "role": "secondary"})
+            self.hedge_stats["hedge_wins"] += 1
+        try:
+            yield first_token
+            async for token in streams[winner]:
+                yield token
+        finally:
+            await streams[winner].aclose()
+
+    def hedge_summary(self) -> Dict[str, Any]:
+        stats = self.hedge_stats
+        return {
+            **stats,
+            "hedge_rate": round(stats["hedged"] / stats["requests"], 3) if stats["requests"] else 0.0,
+            "win_rate": round(stats["hedge_wins"] / stats["hedged"], 3) if stats["hedged"] else 0.0,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"routes": {route.key: stats.snapshot() for route, stats in self._stats.items()}, "hedging": self.hedge_summary()}
+
+
+router = LLMRouter()
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from config import (
+    LOOP_BLOCK_MAX_REPORTS,
+    LOOP_BLOCK_STACK_DEPTH,
+    LOOP_BLOCK_THRESHOLD_MS,
+    LOOP_MONITOR_ENABLED,
+    LOOP_MONITOR_INTERVAL_MS,
+    LOOP_MONITOR_WINDOW,
+)
+from core.metrics import loop_blocks, loop_lag
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoopMonitor:
+    """Event-loop health: continuous scheduling-lag samples plus a blocked-loop watchdog.
+
+    A task on the loop sleeps for a fixed interval and records how late it
+    woke up; each wake-up is also a heartbeat. A daemon thread checks the
+    heartbeat and, when it goes stale past LOOP_BLOCK_THRESHOLD_MS, grabs
+    the loop thread's current stack, which is the code hogging the loop
+    right now. Cost is one timer per interval and one thread wake-up per
+    half-threshold.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = LOOP_MONITOR_INTERVAL_MS,
+        threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS,
+    ) -> None:
+        self.interval_s = interval_ms / 1000
+        self.threshold_s = threshold_ms / 1000
+        self._lags_ms: Deque[float] = deque(maxlen=LOOP_MONITOR_WINDOW)
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.blocks: Deque[Dict[str, Any]] = deque(maxlen=LOOP_BLOCK_MAX_REPORTS)
+        self.block_count = 0
+        # Set by the watchdog while a stall is in progress; completed by the sampler.
+        self._open_block: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        if not LOOP_MONITOR_ENABLED or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info("loop_monitor started interval_ms=%s threshold_ms=%s", self.interval_s * 1000, self.threshold_s * 1000)
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, 1.0)
+            self._thread = None
+
+    async def _sample(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag_s = max(0.0, now - expected)
+            self._lags_ms.append(lag_s * 1000)
+            loop_lag.observe(lag_s)
+            block = self._open_block
+            if block is not None:
+                self._open_block = None
+                block["blocked_ms"] = round(lag_s * 1000, 1)
+                # Counted here rather than in the watchdog so metrics are only touched from the loop.
+                loop_blocks.inc()
+                logger.warning("loop_monitor loop resumed after blocked_ms=%s", block["blocked_ms"])
+
+    def _watch(self) -> None:
+        poll_s = self.threshold_s / 2
+        while not self._stop.wait(poll_s):
+            stale_s = time.monotonic() - self._heartbeat - self.interval_s
+            if stale_s < self.threshold_s or self._open_block is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame, limit=LOOP_BLOCK_STACK_DEPTH) if frame is not None else []
+            block = {"at": time.time(), "stalled_ms": round(stale_s * 1000, 1), "blocked_ms": None, "stack": [line.rstrip() for line in stack]}
+            self._open_block = block
+            self.blocks.append(block)
+            self.block_count += 1
+            logger.warning("loop_monitor event loop blocked for >%sms; loop thread stack:\n%s", round(stale_s * 1000), "".join(stack))
+
+    def stats(self) -> Dict[str, Any]:
+        samples = list(self._lags_ms)
+
+        def _round(value):
+            return None if value is None else round(value, 2)
+
+        last = self.blocks[-1] if self.blocks else None
+        return {
+            "enabled": self._task is not None,
+            "lag_p50_ms": _round(_percentile(samples, 0.5)),
+            "lag_p99_ms": _round(_percentile(samples, 0.99)),
+            "lag_max_ms": _round(max(samples) if samples else None),
+            "blocks": self.block_count,
+            # Innermost frames only; the full stack is in the warning log.
+            "last_block": None if last is None else {**{k: last[k] for k in ("at", "stalled_ms", "blocked_ms")}, "stack_top": last["stack"][-3:]},
+        }
+
+
+loop_monitor = LoopMonitor()
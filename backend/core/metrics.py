@@ -0,0 +1,204 @@
+import math
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import METRICS_ENABLED, METRICS_LATENCY_BUCKETS_S
+
+_ERROR_CODE_RE = re.compile(r"^[a-z0-9_]{1,40}$")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def error_label(error: str) -> str:
+    """Agent error codes ("timeout", "groq_stream_failed") pass through; free-form messages collapse."""
+    return error if _ERROR_CODE_RE.match(error) else "exception"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(v) for v in labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Set directly, or bound to a callable that is read at scrape time (free on the hot path)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, fn: Callable[[], float], *labels: str) -> None:
+        self._functions[self._key(labels)] = fn
+
+    def samples(self) -> List[str]:
+        values = dict(self._values)
+        for key, fn in self._functions.items():
+            try:
+                values[key] = float(fn())
+            except Exception:
+                continue
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = METRICS_LATENCY_BUCKETS_S,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum.
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = ([0] * (len(self.buckets) + 1), [0.0])
+            self._series[key] = series
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def observe_ms(self, value_ms: Optional[float], *labels: str) -> None:
+        if value_ms is not None:
+            self.observe(value_ms / 1000, *labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total[0])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """All process metrics; rendered in Prometheus text exposition format for /metrics."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = METRICS_LATENCY_BUCKETS_S) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+agent_latency = metrics.histogram("jarvis_agent_latency_seconds", "Agent run time, excluding bulkhead queue wait, including timeouts.", ("agent", "status"))
+agent_errors = metrics.counter("jarvis_agent_errors_total", "Agent runs that returned an error, by error code.", ("agent", "error"))
+agent_queue_wait = metrics.histogram("jarvis_agent_queue_wait_seconds", "Time an agent run waited for a bulkhead slot.", ("agent",))
+bulkhead_shed = metrics.counter("jarvis_bulkhead_shed_total", "Calls refused because a bulkhead queue was full.", ("bulkhead",))
+bulkhead_queued = metrics.gauge("jarvis_bulkhead_queued", "Calls currently waiting for a bulkhead slot.", ("bulkhead",))
+executor_queue_wait = metrics.histogram("jarvis_executor_queue_wait_seconds", "Time a blocking call waited for a thread.", ("executor",))
+agent_timeouts = metrics.counter("jarvis_agent_timeouts_total", "Agent runs cut off by their timeout.", ("agent",))
+turn_phase_latency = metrics.histogram("jarvis_turn_phase_seconds", "Time spent in each phase of a turn.", ("phase",))
+ttft = metrics.histogram("jarvis_ttft_seconds", "Turn start to first LLM token sent to the client.")
+ttfa = metrics.histogram("jarvis_ttfa_seconds", "Turn start to first audio byte sent to the client.")
+llm_ttft = metrics.histogram("jarvis_llm_ttft_seconds", "Provider time to first token per route.", ("provider", "model"))
+llm_failures = metrics.counter("jarvis_llm_failures_total", "LLM streams that failed or produced no tokens.", ("provider", "model"))
+turns = metrics.counter("jarvis_turns_total", "Finished turns by outcome.", ("outcome",))
+active_sessions = metrics.gauge("jarvis_active_sessions", "Open /ws sessions.")
+queue_depth = metrics.gauge("jarvis_queue_depth", "Items waiting in per-session queues, summed over sessions.", ("queue",))
+cache_hit_ratio = metrics.gauge("jarvis_cache_hit_ratio", "Cache hit ratio since start.", ("cache",))
+loop_lag = metrics.histogram(
+    "jarvis_loop_lag_seconds",
+    "How late the event loop ran a timer scheduled every LOOP_MONITOR_INTERVAL_MS.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+loop_blocks = metrics.counter("jarvis_loop_blocked_total", "Times the loop stayed blocked past LOOP_BLOCK_THRESHOLD_MS.")
+cache_entries = metrics.gauge("jarvis_cache_entries", "Entries currently held by each cache.", ("cache",))
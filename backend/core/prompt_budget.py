@@ -0,0 +1,113 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from config import PROMPT_SECTIONS, PROMPT_TOKEN_BUDGETS
+
+# Per-message framing the chat APIs add on top of the content (role markers etc.)
+_MESSAGE_OVERHEAD = 4
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token for English), cached per string.
+
+    History messages and memories repeat turn after turn, so most lookups hit
+    the cache instead of rescanning the text.
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[: max_tokens * 4]
+    space = cut.rfind(" ")
+    if space > len(cut) // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def budget_for(model: str) -> int:
+    return PROMPT_TOKEN_BUDGETS.get(model, PROMPT_TOKEN_BUDGETS["default"])
+
+
+@dataclass
+class PromptPacker:
+    """Fills one model's prompt budget section by section, in the order sections are added.
+
+    Fixed parts (system prompt, user message) are always kept; item sections
+    get at most their configured cap; history takes what is left, newest
+    first, with a leading summary message pinned ahead of the raw turns.
+    """
+
+    budget: int
+    used: int = 0
+    sections: Dict[str, int] = field(default_factory=dict)
+    dropped: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.budget - self.used)
+
+    def _charge(self, section: str, tokens: int) -> None:
+        self.used += tokens
+        self.sections[section] = self.sections.get(section, 0) + tokens
+
+    def fixed(self, section: str, text: str) -> str:
+        self._charge(section, estimate_tokens(text))
+        return text
+
+    def items(self, section: str, items: List[str], header: str = "", cap: Optional[int] = None, item_cap: Optional[int] = None) -> List[str]:
+        if cap is None or item_cap is None:
+            default_cap, default_item_cap = PROMPT_SECTIONS.get(section, (self.remaining, self.remaining))
+            cap = default_cap if cap is None else cap
+            item_cap = default_item_cap if item_cap is None else item_cap
+        allowance = min(cap, self.remaining) - (estimate_tokens(header) if header else 0)
+        kept: List[str] = []
+        spent = 0
+        for item in items:
+            room = min(item_cap, allowance - spent)
+            if room < 8:
+                break
+            text = truncate_to_tokens(item, room)
+            kept.append(text)
+            spent += estimate_tokens(text) + 1
+        if kept:
+            self._charge(section, spent + (estimate_tokens(header) if header else 0))
+        if len(kept) < len(items):
+            self.dropped[section] = len(items) - len(kept)
+        return kept
+
+    def history(self, messages: List[Dict[str, str]], section: str = "history") -> List[Dict[str, str]]:
+        summary: List[Dict[str, str]] = []
+        turns = messages
+        if messages and messages[0].get("role") == "system":
+            summary, turns = messages[:1], messages[1:]
+
+        kept: List[Dict[str, str]] = []
+        spent = 0
+        for message in summary:
+            cost = estimate_tokens(message["content"]) + _MESSAGE_OVERHEAD
+            if cost <= self.remaining:
+                kept.append(message)
+                spent += cost
+        picked: List[Dict[str, str]] = []
+        for message in reversed(turns):
+            cost = estimate_tokens(message["content"]) + _MESSAGE_OVERHEAD
+            if spent + cost > self.remaining:
+                break
+            picked.append(message)
+            spent += cost
+        kept.extend(reversed(picked))
+        self._charge(section, spent)
+        if len(kept) < len(messages):
+            self.dropped[section] = len(messages) - len(kept)
+        return kept
+
+    def report(self) -> Dict[str, Any]:
+        return {"tokens": self.used, "budget": self.budget, "sections": dict(self.sections), "dropped": dict(self.dropped)}
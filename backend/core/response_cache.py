@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from config import (
+    RESPONSE_CACHE_CONTEXT_TTL_S,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_INTENTS,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_REPLAY_TOKEN_MS,
+    RESPONSE_CACHE_TTL_S,
+)
+from core.cache import TTLCache
+
+_FILLER_RE = re.compile(r"\b(?:hey|hi|jarvis|please|can you|could you|would you|tell me|i want to know)\b")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_REPLAY_RE = re.compile(r"\S+\s*|\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase, drop punctuation and politeness filler; word order is kept so "who"/"how" still differ."""
+    text = _PUNCT_RE.sub(" ", text.lower().replace("'", ""))
+    return " ".join(_FILLER_RE.sub(" ", text).split())
+
+
+def context_fingerprint(items: Dict[str, List[str]]) -> str:
+    digest = hashlib.sha1()
+    for name in sorted(items):
+        for item in items[name] or []:
+            digest.update(name.encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(item.encode("utf-8"))
+            digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class CachedResponse:
+    text: str
+    latency_ms: int
+    model: str
+    provider: str
+
+
+class ResponseCache:
+    """Finished chat answers keyed by normalized question + intent + fingerprint of the prompt inputs.
+
+    The fingerprint covers history, memory and tool results; answers that
+    depended on any of them expire after RESPONSE_CACHE_CONTEXT_TTL_S.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_s: float = RESPONSE_CACHE_TTL_S) -> None:
+        self._cache = TTLCache(max_entries=max_entries, ttl_s=ttl_s)
+        self.saved_ms = 0
+
+    def key(self, user_message: str, intent: str, context_items: Dict[str, List[str]]) -> Optional[tuple]:
+        if not RESPONSE_CACHE_ENABLED or intent not in RESPONSE_CACHE_INTENTS:
+            return None
+        normalized = normalize_prompt(user_message)
+        if not normalized:
+            return None
+        return (intent, normalized, context_fingerprint(context_items))
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        return self._cache.get(key)
+
+    def set(self, key: tuple, response: CachedResponse, has_context: bool) -> None:
+        self._cache.set(key, response, ttl_s=RESPONSE_CACHE_CONTEXT_TTL_S if has_context else None)
+
+    def record_saving(self, cached: CachedResponse, replay_ms: int) -> int:
+        saved = max(0, cached.latency_ms - replay_ms)
+        self.saved_ms += saved
+        return saved
+
+    async def replay(self, text: str, token_ms: float = RESPONSE_CACHE_REPLAY_TOKEN_MS) -> AsyncIterator[str]:
+        """Re-emit a cached answer word by word (whitespace kept) at a steady pace."""
+        for token in _REPLAY_RE.findall(text):
+            yield token
+            if token_ms > 0:
+                await asyncio.sleep(token_ms / 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "saved_ms": self.saved_ms}
+
+
+response_cache = ResponseCache()
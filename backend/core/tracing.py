@@ -0,0 +1,265 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from config import (
+    TRACE_BUFFER_MAX_SPANS,
+    TRACE_DIR,
+    TRACE_FILE_BACKUPS,
+    TRACE_FILE_MAX_BYTES,
+    TRACE_FLUSH_INTERVAL_S,
+    TRACE_SAMPLE_RATE,
+    TRACE_SLOW_TURN_MS,
+    TRACING_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class _Trace:
+    """Spans of one turn, held until the root ends and the keep/drop decision is made.
+
+    Head sampling keeps TRACE_SAMPLE_RATE of turns; slow or failed turns are
+    always kept, since those are the ones worth reading.
+    """
+
+    def __init__(self, trace_id: str, sampled: bool) -> None:
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+        self.decided: Optional[bool] = None
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_wall", "start_perf", "duration_ms", "attrs", "status")
+
+    def __init__(self, trace: _Trace, name: str, parent_id: Optional[str], start_perf: Optional[float] = None, attrs: Optional[Dict[str, Any]] = None) -> None:
+        now = time.perf_counter()
+        self.trace = trace
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_perf = now if start_perf is None else start_perf
+        self.start_wall = time.time() - (now - self.start_perf)
+        self.duration_ms: Optional[float] = None
+        self.attrs = dict(attrs or {})
+        self.status = "ok"
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def end(self, status: Optional[str] = None, end_perf: Optional[float] = None) -> None:
+        if self.duration_ms is not None:
+            return
+        if status is not None:
+            self.status = status
+        self.duration_ms = ((end_perf or time.perf_counter()) - self.start_perf) * 1000
+        tracer._finish(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start_wall, 6),
+            "duration_ms": None if self.duration_ms is None else round(self.duration_ms, 3),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("jarvis_span", default=None)
+
+
+class JsonlSpanExporter:
+    """Buffers finished spans in memory and appends them to a size-rotated JSONL file off the loop.
+
+    export() never blocks or does I/O: it appends to a bounded deque and
+    drops (counting) when the writer falls behind. Serialization and file
+    writes happen in a worker thread every TRACE_FLUSH_INTERVAL_S.
+    """
+
+    def __init__(
+        self,
+        directory: str = TRACE_DIR,
+        max_bytes: int = TRACE_FILE_MAX_BYTES,
+        backups: int = TRACE_FILE_BACKUPS,
+        max_buffered: int = TRACE_BUFFER_MAX_SPANS,
+    ) -> None:
+        self.path = os.path.join(directory, "spans.jsonl")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer: Deque[Span] = deque()
+        self.max_buffered = max_buffered
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"exported": 0, "dropped": 0, "rotations": 0, "write_errors": 0}
+
+    def export(self, spans: List[Span]) -> None:
+        room = self.max_buffered - len(self._buffer)
+        if room < len(spans):
+            self.stats["dropped"] += len(spans) - max(room, 0)
+            spans = spans[: max(room, 0)]
+        self._buffer.extend(spans)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(TRACE_FLUSH_INTERVAL_S)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        batch = list(self._buffer)
+        self._buffer.clear()
+        try:
+            await asyncio.to_thread(self._write, batch)
+            self.stats["exported"] += len(batch)
+        except OSError as exc:
+            self.stats["write_errors"] += 1
+            logger.warning("tracing export failed spans=%s error=%s", len(batch), exc)
+
+    def _write(self, batch: List[Span]) -> None:
+        lines = "".join(json.dumps(span.as_dict(), default=str, separators=(",", ":")) + "\n" for span in batch)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(lines) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(lines)
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self.stats["rotations"] += 1
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+class Tracer:
+    """Turn-scoped spans. The active span lives in a contextvar, so tasks spawned inside a span inherit it as parent."""
+
+    def __init__(self, exporter: JsonlSpanExporter) -> None:
+        self.exporter = exporter
+        self.stats = {"turns": 0, "kept": 0}
+
+    def start_turn(self, name: str = "turn", start_perf: Optional[float] = None, **attrs: Any) -> Optional[Span]:
+        """Open a root span with a fresh turn id; None (and no child spans) when tracing is off."""
+        if not TRACING_ENABLED:
+            return None
+        self.stats["turns"] += 1
+        trace = _Trace(_new_id(), sampled=random.random() < TRACE_SAMPLE_RATE)
+        return Span(trace, name, None, start_perf=start_perf, attrs=attrs)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, start_perf: Optional[float] = None, **attrs: Any) -> Optional[Span]:
+        """Open a child of `parent` (default: the active span). Caller must end() it."""
+        parent = parent or _current.get()
+        if parent is None or parent.trace.decided is False:
+            return None
+        return Span(parent.trace, name, parent.span_id, start_perf=start_perf, attrs=attrs)
+
+    @contextmanager
+    def activate(self, span: Optional[Span]) -> Iterator[Optional[Span]]:
+        token = _current.set(span)
+        try:
+            yield span
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """Child of the active span for the duration of the block; a no-op outside a turn."""
+        span = self.start_span(name, **attrs)
+        with self.activate(span), self._ending(span):
+            yield span
+
+    @contextmanager
+    def turn(self, name: str = "turn", start_perf: Optional[float] = None, **attrs: Any) -> Iterator[Optional[Span]]:
+        root = self.start_turn(name, start_perf=start_perf, **attrs)
+        with self.activate(root), self._ending(root):
+            yield root
+
+    @contextmanager
+    def _ending(self, span: Optional[Span]) -> Iterator[None]:
+        try:
+            yield
+        except asyncio.CancelledError:
+            if span is not None:
+                span.end("cancelled")
+            raise
+        except Exception as exc:
+            if span is not None:
+                span.set(error=str(exc))
+                span.end("error")
+            raise
+        finally:
+            if span is not None:
+                span.end()
+
+    def event(self, name: str, parent: Optional[Span] = None, **attrs: Any) -> None:
+        """Zero-length span marking a moment (first token, first audio byte)."""
+        span = self.start_span(name, parent=parent, **attrs)
+        if span is not None:
+            span.end()
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current.get()
+
+    def _finish(self, span: Span) -> None:
+        trace = span.trace
+        if trace.decided is None:
+            trace.spans.append(span)
+            if span.parent_id is not None:
+                return
+            # Root ended: keep sampled, slow or failed turns; drop the rest.
+            keep = trace.sampled or span.status != "ok" or (span.duration_ms or 0) >= TRACE_SLOW_TURN_MS
+            trace.decided = keep
+            span.set(sampled=trace.sampled)
+            if keep:
+                self.stats["kept"] += 1
+                self.exporter.export(trace.spans)
+            trace.spans = []
+        elif trace.decided:
+            # Background work (e.g. the memory writer) that outlived its turn.
+            self.exporter.export([span])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, **self.exporter.stats, "buffered": len(self.exporter._buffer)}
+
+
+tracer = Tracer(JsonlSpanExporter())
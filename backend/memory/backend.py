@@ -0,0 +1,49 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from config import MEMORY_BACKEND
+
+
+@dataclass
+class MemoryHits:
+    relevant: List[str] = field(default_factory=list)
+    recent: List[str] = field(default_factory=list)
+    source: str = ""
+
+
+class MemoryBackend:
+    """Storage used by MemoryAgent (reads) and MemoryWriterAgent (writes)."""
+
+    name: str = "base"
+
+    async def retrieve(self, query: str, user_id: str, limit: int = 5, recent: int = 3) -> MemoryHits:
+        raise NotImplementedError
+
+    async def add(self, memory: str, user_id: str) -> None:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+
+_backend: Optional[MemoryBackend] = None
+
+
+def get_memory_backend() -> MemoryBackend:
+    global _backend
+    if _backend is None:
+        # Imported lazily so the local backend never touches the mem0 SDK.
+        if MEMORY_BACKEND == "local":
+            from memory.local_store import LocalVectorBackend
+
+            _backend = LocalVectorBackend()
+        elif MEMORY_BACKEND == "mem0":
+            from memory.mem0_backend import Mem0Backend
+
+            _backend = Mem0Backend()
+        else:
+            raise ValueError(f"Unknown MEMORY_BACKEND: {MEMORY_BACKEND}")
+    return _backend
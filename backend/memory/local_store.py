@@ -0,0 +1,411 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Protocol
+
+import numpy as np
+
+from agents.registry import registry
+from config import MEMORY_COMPACT_RATIO, MEMORY_EMBED_DIM, MEMORY_LOCAL_DIR
+from memory.backend import MemoryBackend, MemoryHits
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_INITIAL_CAPACITY = 1024
+
+
+class Embedder(Protocol):
+    dim: int
+    # Optional: True when vectors have only a few nonzero components (hashed
+    # n-grams). The store then searches an inverted index instead of
+    # multiplying every row.
+    sparse: bool
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder:
+    """Feature-hashed unigrams + bigrams with sublinear TF, L2-normalized.
+
+    No model download, no network; good enough for short personal facts.
+    Hashing is unsigned, so a colliding n-gram can only add weight to a
+    word's bucket, never cancel it out. Anything with the same embed()/dim
+    shape (e.g. a sentence-transformer wrapper) can be passed to
+    LocalVectorStore instead.
+    """
+
+    sparse = True
+
+    def __init__(self, dim: int = MEMORY_EMBED_DIM) -> None:
+        self.dim = dim
+        # Stored next to the vectors; a change re-embeds the store on open.
+        self.signature = f"hash-unsigned-v2:{dim}"
+
+    def _features(self, text: str) -> Dict[int, float]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        counts: Dict[int, float] = {}
+        for gram in grams:
+            digest = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+            index = digest % self.dim
+            counts[index] = counts.get(index, 0.0) + 1.0
+        return counts
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for index, count in self._features(text).items():
+                out[row, index] = 1.0 + np.log(count)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+class _Postings:
+    """One user's inverted index: vector component -> (rows, weights) of the rows where it is nonzero.
+
+    For sparse vectors the cosine score of every row is the sum, over the
+    query's few nonzero components, of query weight x row weight, so a
+    search touches only the postings of the query's n-grams instead of the
+    whole matrix. Arrays grow by doubling; deleted rows stay until compact().
+    """
+
+    def __init__(self) -> None:
+        self._rows: Dict[int, np.ndarray] = {}
+        self._weights: Dict[int, np.ndarray] = {}
+        self._sizes: Dict[int, int] = {}
+
+    def extend(self, col: int, rows: np.ndarray, weights: np.ndarray) -> None:
+        size = self._sizes.get(col, 0)
+        needed = size + len(rows)
+        current = self._rows.get(col)
+        if current is None or needed > len(current):
+            capacity = max(4, 1 << (needed - 1).bit_length())
+            grown_rows = np.empty(capacity, dtype=np.int32)
+            grown_weights = np.empty(capacity, dtype=np.float32)
+            if current is not None:
+                grown_rows[:size] = current[:size]
+                grown_weights[:size] = self._weights[col][:size]
+            self._rows[col], self._weights[col] = grown_rows, grown_weights
+        self._rows[col][size:needed] = rows
+        self._weights[col][size:needed] = weights
+        self._sizes[col] = needed
+
+    def add(self, row: int, vector: np.ndarray) -> None:
+        for col in np.flatnonzero(vector):
+            self.extend(int(col), np.array([row], dtype=np.int32), vector[col : col + 1])
+
+    def scores(self, query: np.ndarray, count: int) -> np.ndarray:
+        """Dot product of `query` with every row below `count` (zero for rows sharing no component)."""
+        rows, weights = [], []
+        for col in np.flatnonzero(query):
+            size = self._sizes.get(int(col))
+            if size:
+                rows.append(self._rows[int(col)][:size])
+                weights.append(self._weights[int(col)][:size] * query[col])
+        if not rows:
+            return np.zeros(0)
+        return np.bincount(np.concatenate(rows), weights=np.concatenate(weights), minlength=count)
+
+
+class LocalVectorStore:
+    """Append-only vector store: float32 rows in a memory-mapped file plus a JSONL log.
+
+    records.jsonl holds one {"op": "add" | "delete", ...} line per write;
+    row i of vectors.f32 belongs to the i-th "add". Deletes are tombstones
+    until compact() rewrites both files without them.
+    """
+
+    def __init__(self, directory: str = MEMORY_LOCAL_DIR, embedder: Optional[Embedder] = None) -> None:
+        self.directory = directory
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self._records_path = os.path.join(directory, "records.jsonl")
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self.signature = getattr(self.embedder, "signature", f"{type(self.embedder).__name__}:{self.dim}")
+        self._vectors: Optional[np.memmap] = None
+        self._capacity = 0
+        self._count = 0
+        self._texts: List[str] = []
+        self._users: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._owners = np.zeros(0, dtype=np.int32)
+        self._user_codes: Dict[str, int] = {}
+        self._user_rows: Dict[str, List[int]] = {}
+        self._live_keys: Dict[tuple, int] = {}
+        self._postings: Dict[int, _Postings] = {}
+        self.sparse = bool(getattr(self.embedder, "sparse", False))
+        # Dense searches run on an executor thread; writes and remaps must not interleave with them.
+        self._lock = threading.RLock()
+        self._records = None
+
+    # -- file management -------------------------------------------------
+
+    def _map(self, capacity: int) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        needed = capacity * self.dim * 4
+        mode = "r+b" if os.path.exists(self._vectors_path) else "w+b"
+        with open(self._vectors_path, mode) as fh:
+            fh.seek(0, os.SEEK_END)
+            if fh.tell() < needed:
+                fh.truncate(needed)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: len(self._alive)] = self._alive
+        self._alive = alive
+        owners = np.full(capacity, -1, dtype=np.int32)
+        owners[: len(self._owners)] = self._owners
+        self._owners = owners
+
+    def _track_row(self, row: int, memory_id: str, user_id: str, memory: str) -> None:
+        self._texts.append(memory)
+        self._users.append(user_id)
+        self._ids[memory_id] = row
+        self._user_rows.setdefault(user_id, []).append(row)
+        self._owners[row] = self._user_codes.setdefault(user_id, len(self._user_codes))
+
+    def open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        adds = []
+        deleted = set()
+        if os.path.exists(self._records_path):
+            with open(self._records_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning("local_store skipping corrupt record line")
+                        continue
+                    if record.get("op") == "delete":
+                        deleted.add(record["id"])
+                    else:
+                        adds.append(record)
+
+        # Vectors from another embedder (or dimension) are meaningless here; rebuild them from the log.
+        reembed = bool(adds) and self._stored_signature() != self.signature
+        if reembed and os.path.exists(self._vectors_path):
+            os.remove(self._vectors_path)
+        self._map(max(_INITIAL_CAPACITY, 1 << max(len(adds), 1).bit_length()))
+        for row, record in enumerate(adds):
+            self._track_row(row, record["id"], record["user_id"], record["memory"])
+            self._alive[row] = record["id"] not in deleted
+            if self._alive[row]:
+                self._live_keys[(record["user_id"], record["memory"])] = row
+        self._count = len(adds)
+        if reembed:
+            for offset in range(0, self._count, 256):
+                batch = self._texts[offset : offset + 256]
+                self._vectors[offset : offset + len(batch)] = self.embedder.embed(batch)
+            self._vectors.flush()
+            logger.info("local_store re-embedded rows=%s signature=%s", self._count, self.signature)
+        self._write_meta()
+        self._build_postings()
+        self._records = open(self._records_path, "a", encoding="utf-8")
+        logger.info("local_store opened dir=%s rows=%s alive=%s", self.directory, self._count, self.alive_count)
+
+    def _build_postings(self) -> None:
+        self._postings = {}
+        if not self.sparse or self._count == 0:
+            return
+        # One pass over the mapped rows, grouped by (user, component) with a single sort.
+        rows, cols = np.nonzero(self._vectors[: self._count])
+        weights = np.asarray(self._vectors[rows, cols], dtype=np.float32)
+        owners = self._owners[rows]
+        order = np.lexsort((rows, cols, owners))
+        rows, cols, weights, owners = rows[order], cols[order], weights[order], owners[order]
+        boundaries = np.flatnonzero((np.diff(owners) != 0) | (np.diff(cols) != 0)) + 1
+        for start, end in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(rows)]))):
+            postings = self._postings.setdefault(int(owners[start]), _Postings())
+            postings.extend(int(cols[start]), rows[start:end].astype(np.int32), weights[start:end])
+
+    def _stored_signature(self) -> Optional[str]:
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as fh:
+                return json.load(fh).get("signature")
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self) -> None:
+        if self._stored_signature() == self.signature:
+            return
+        with open(self._meta_path, "w", encoding="utf-8") as fh:
+            json.dump({"signature": self.signature, "dim": self.dim}, fh)
+
+    def close(self) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        if self._records is not None:
+            self._records.close()
+            self._records = None
+
+    def _append_record(self, record: dict) -> None:
+        self._records.write(json.dumps(record) + "\n")
+        self._records.flush()
+
+    # -- reads and writes ------------------------------------------------
+
+    @property
+    def alive_count(self) -> int:
+        return int(self._alive[: self._count].sum())
+
+    def add(self, memory: str, user_id: str) -> Optional[str]:
+        memory = memory.strip()
+        if not memory:
+            return None
+        vector = self.embedder.embed([memory])[0]
+        with self._lock:
+            if (user_id, memory) in self._live_keys:
+                return None
+            if self._count >= self._capacity:
+                self._map(self._capacity * 2)
+            row = self._count
+            self._vectors[row] = vector
+            memory_id = hashlib.sha1(f"{user_id}:{row}:{memory}:{time.time()}".encode("utf-8")).hexdigest()[:16]
+            self._append_record({"op": "add", "id": memory_id, "user_id": user_id, "memory": memory, "ts": time.time()})
+            self._track_row(row, memory_id, user_id, memory)
+            self._alive[row] = True
+            self._live_keys[(user_id, memory)] = row
+            if self.sparse:
+                self._postings.setdefault(int(self._owners[row]), _Postings()).add(row, vector)
+            self._count += 1
+        return memory_id
+
+    def delete(self, memory_id: str) -> bool:
+        with self._lock:
+            row = self._ids.get(memory_id)
+            if row is None or not self._alive[row]:
+                return False
+            self._append_record({"op": "delete", "id": memory_id})
+            self._alive[row] = False
+            self._live_keys.pop((self._users[row], self._texts[row]), None)
+        return True
+
+    def search(self, query: str, user_id: str, limit: int = 5, min_score: float = 0.05) -> List[str]:
+        if limit <= 0:
+            return []
+        query_vec = self.embedder.embed([query])[0]
+        with self._lock:
+            code = self._user_codes.get(user_id)
+            if code is None or self._count == 0:
+                return []
+            if self.sparse:
+                # Only the postings of the query's n-grams are read; other users are never touched.
+                postings = self._postings.get(code)
+                if postings is None:
+                    return []
+                scores = postings.scores(query_vec, self._count)
+                candidates = np.flatnonzero(scores >= min_score)
+                candidates = candidates[self._alive[candidates]]
+                candidate_scores = scores[candidates]
+            else:
+                # Dense embedders: one mat-vec over this user's live rows only.
+                candidates = np.asarray(self._user_rows.get(user_id, []), dtype=np.int64)
+                candidates = candidates[self._alive[candidates]]
+                candidate_scores = self._vectors[candidates] @ query_vec if candidates.size else np.zeros(0)
+                keep = candidate_scores >= min_score
+                candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+            k = min(limit, int(candidates.size))
+            if k == 0:
+                return []
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+            top = top[np.argsort(-candidate_scores[top])]
+            return [self._texts[int(candidates[i])] for i in top]
+
+    def recent(self, user_id: str, limit: int = 3) -> List[str]:
+        out: List[str] = []
+        for row in reversed(self._user_rows.get(user_id, [])):
+            if len(out) >= limit:
+                break
+            if self._alive[row]:
+                out.append(self._texts[row])
+        return out[::-1]
+
+    def needs_compaction(self) -> bool:
+        return self._count > 0 and (self._count - self.alive_count) / self._count >= MEMORY_COMPACT_RATIO
+
+    def compact(self) -> None:
+        """Rewrite both files with only live rows, then swap them in atomically."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        live = np.flatnonzero(self._alive[: self._count])
+        ids_by_row = {row: memory_id for memory_id, row in self._ids.items()}
+        tmp_records = self._records_path + ".tmp"
+        tmp_vectors = self._vectors_path + ".tmp"
+        capacity = max(_INITIAL_CAPACITY, 1 << max(int(live.size), 1).bit_length())
+        with open(tmp_records, "w", encoding="utf-8") as fh:
+            for row in live:
+                fh.write(json.dumps({"op": "add", "id": ids_by_row[int(row)], "user_id": self._users[row], "memory": self._texts[row]}) + "\n")
+        compacted = np.memmap(tmp_vectors, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        compacted[: live.size] = self._vectors[live]
+        compacted.flush()
+        del compacted
+
+        self.close()
+        os.replace(tmp_vectors, self._vectors_path)
+        os.replace(tmp_records, self._records_path)
+        removed = self._count - int(live.size)
+        self._texts, self._users, self._ids, self._user_rows, self._user_codes = [], [], {}, {}, {}
+        self._live_keys = {}
+        self._postings = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._owners = np.zeros(0, dtype=np.int32)
+        self._count = 0
+        self.open()
+        logger.info("local_store compacted removed=%s rows=%s", removed, self._count)
+
+
+class LocalVectorBackend(MemoryBackend):
+    name = "local"
+
+    def __init__(self, store: Optional[LocalVectorStore] = None) -> None:
+        self.store = store or LocalVectorStore()
+        self._opened = False
+
+    def _ensure_open(self) -> None:
+        if not self._opened:
+            self.store.open()
+            self._opened = True
+
+    async def retrieve(self, query: str, user_id: str, limit: int = 5, recent: int = 3) -> MemoryHits:
+        self._ensure_open()
+        if self.store.sparse:
+            # Inverted-index search stays well under a millisecond; not worth a thread hop.
+            relevant = self.store.search(query, user_id, limit)
+        else:
+            relevant = await registry.executor("memory_read").run(self.store.search, query, user_id, limit)
+        return MemoryHits(
+            relevant=relevant,
+            recent=self.store.recent(user_id, recent),
+            source="local",
+        )
+
+    async def add(self, memory: str, user_id: str) -> None:
+        self._ensure_open()
+        self.store.add(memory, user_id)
+
+    async def start(self) -> None:
+        self._ensure_open()
+        if self.store.needs_compaction():
+            self.store.compact()
+
+    async def stop(self) -> None:
+        if self._opened:
+            self.store.close()
+            self._opened = False
@@ -0,0 +1,56 @@
+import asyncio
+
+from agents.registry import registry
+from config import AGENT_TIMEOUT_PREFLIGHT
+from memory.backend import MemoryBackend, MemoryHits
+from memory.mem0_client import get_recent_memories, search_memory_list, store_memory
+from memory.mirror import memory_mirrors
+
+
+class Mem0Backend(MemoryBackend):
+    """Hosted mem0, read through the per-user local mirror.
+
+    The mem0 SDK is blocking; reads and writes run on separate bounded
+    executors so queued background writes never delay a turn's lookup.
+    """
+
+    name = "mem0"
+
+    async def retrieve(self, query: str, user_id: str, limit: int = 5, recent: int = 3) -> MemoryHits:
+        mirror = memory_mirrors.get(user_id)
+        if mirror.loaded:
+            hits = MemoryHits(relevant=mirror.search(query, limit), recent=mirror.recent(recent), source="mirror")
+            if not hits.relevant:
+                hits.source = "mirror+remote"
+                try:
+                    hits.relevant = await asyncio.wait_for(
+                        registry.executor("memory_read").run(search_memory_list, query, limit, user_id),
+                        timeout=AGENT_TIMEOUT_PREFLIGHT,
+                    )
+                except Exception:
+                    hits.relevant = []
+            return hits
+
+        # First turn for this user: answer remotely while the mirror loads.
+        mirror.load_in_background()
+        reads = registry.executor("memory_read")
+        relevant, recent_items = await asyncio.gather(
+            asyncio.wait_for(reads.run(search_memory_list, query, limit, user_id), timeout=AGENT_TIMEOUT_PREFLIGHT),
+            asyncio.wait_for(reads.run(get_recent_memories, recent, user_id), timeout=AGENT_TIMEOUT_PREFLIGHT),
+            return_exceptions=True,
+        )
+        return MemoryHits(
+            relevant=[] if isinstance(relevant, Exception) else relevant,
+            recent=[] if isinstance(recent_items, Exception) else recent_items,
+            source="remote",
+        )
+
+    async def add(self, memory: str, user_id: str) -> None:
+        await registry.executor("memory_write").run(store_memory, [{"role": "user", "content": memory}], user_id)
+        memory_mirrors.get(user_id).add(memory)
+
+    async def start(self) -> None:
+        memory_mirrors.start()
+
+    async def stop(self) -> None:
+        await memory_mirrors.stop()
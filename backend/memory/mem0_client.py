@@ -1,7 +1,7 @@
 from mem0 import MemoryClient
-from config import MEM0_API_KEY, USER_ID
+from config import MEM0_API_KEY, MEM0_HOST, USER_ID
 
-client = MemoryClient(api_key=MEM0_API_KEY)
+client = MemoryClient(api_key=MEM0_API_KEY, host=MEM0_HOST)
 
 def store_memory(messages: list, user_id: str = USER_ID):
     """Extract and store memories from a conversation turn."""
@@ -15,20 +15,20 @@ def search_memory(query: str) -> str:
     memories = [r["memory"] for r in results]
     return "Relevant things I remember about you:\n" + "\n".join(f"- {m}" for m in memories)
 
-def get_all_memories() -> list:
+def get_all_memories(user_id: str = USER_ID) -> list:
     """Get all stored memories."""
-    return client.get_all(user_id=USER_ID)
+    return client.get_all(user_id=user_id)
 
-def search_memory_list(query: str, limit: int = 5) -> list:
+def search_memory_list(query: str, limit: int = 5, user_id: str = USER_ID) -> list:
     """Retrieve relevant memories as a list of strings."""
-    results = client.search(query, user_id=USER_ID, limit=limit)
+    results = client.search(query, user_id=user_id, limit=limit)
     if not results:
         return []
     return [r["memory"] for r in results]
 
-def get_recent_memories(limit: int = 3) -> list:
+def get_recent_memories(limit: int = 3, user_id: str = USER_ID) -> list:
     """Get the most recent memories."""
-    all_memories = client.get_all(user_id=USER_ID)
+    all_memories = client.get_all(user_id=user_id)
     if not all_memories:
         return []
     return [m["memory"] for m in all_memories[-limit:]]
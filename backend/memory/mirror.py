@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Set
+
+from agents.registry import registry
+from config import MEMORY_MIRROR_LOCAL_ADD_TTL_S, MEMORY_MIRROR_RECENT_SIZE, MEMORY_MIRROR_REFRESH_S
+from memory.mem0_client import get_all_memories
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = {"the", "a", "an", "is", "are", "my", "i", "me", "you", "to", "of", "and", "or", "in", "on", "what", "do", "does", "did"}
+
+
+def _tokens(text: str) -> Set[str]:
+    return {t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS}
+
+
+def _memory_texts(raw) -> List[str]:
+    items = raw.get("results", []) if isinstance(raw, dict) else (raw or [])
+    return [m["memory"] for m in items if isinstance(m, dict) and m.get("memory")]
+
+
+class MemoryMirror:
+    """Local copy of one user's mem0 memories.
+
+    Loaded once, appended to when MemoryWriterAgent stores something, and
+    re-synced from mem0 on a background schedule.
+    """
+
+    def __init__(self, user_id: str, recent_size: int = MEMORY_MIRROR_RECENT_SIZE) -> None:
+        self.user_id = user_id
+        self._memories: List[str] = []
+        self._tokens: List[Set[str]] = []
+        self._recent: Deque[str] = deque(maxlen=recent_size)
+        self._local_adds: Deque[tuple] = deque(maxlen=64)
+        self._load_task: Optional[asyncio.Task] = None
+        self.loaded = False
+        self.loaded_at = 0.0
+
+    def _replace(self, memories: List[str]) -> None:
+        self._memories = list(memories)
+        self._tokens = [_tokens(m) for m in self._memories]
+        self._recent.clear()
+        self._recent.extend(self._memories[-self._recent.maxlen:])
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        raw = await registry.executor("memory_sync").run(get_all_memories, self.user_id)
+        memories = _memory_texts(raw)
+        # mem0 indexes asynchronously, so recent local writes may not be in the
+        # fetch yet; keep them until they show up or age out.
+        remote = set(memories)
+        cutoff = time.monotonic() - MEMORY_MIRROR_LOCAL_ADD_TTL_S
+        pending = [(ts, m) for ts, m in self._local_adds if ts >= cutoff and m not in remote]
+        self._local_adds = deque(pending, maxlen=self._local_adds.maxlen)
+        memories.extend(m for _, m in pending)
+        self._replace(memories)
+        logger.info("memory_mirror refreshed user=%s memories=%s", self.user_id, len(self._memories))
+
+    def load_in_background(self) -> None:
+        if self.loaded or (self._load_task and not self._load_task.done()):
+            return
+        self._load_task = asyncio.create_task(self.refresh())
+        self._load_task.add_done_callback(self._log_load_error)
+
+    @staticmethod
+    def _log_load_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("memory_mirror load failed: %s", task.exception())
+
+    def add(self, memory: str) -> None:
+        memory = memory.strip()
+        if not memory:
+            return
+        self._memories.append(memory)
+        self._tokens.append(_tokens(memory))
+        self._recent.append(memory)
+        self._local_adds.append((time.monotonic(), memory))
+
+    def recent(self, limit: int = 3) -> List[str]:
+        if limit <= 0:
+            return []
+        return list(islice(reversed(self._recent), limit))[::-1]
+
+    def search(self, query: str, limit: int = 5) -> List[str]:
+        query_tokens = _tokens(query)
+        if not query_tokens:
+            return []
+        scored = []
+        for idx, tokens in enumerate(self._tokens):
+            overlap = len(query_tokens & tokens)
+            if overlap:
+                scored.append((overlap / len(query_tokens), idx))
+        scored.sort(key=lambda item: (-item[0], -item[1]))
+        return [self._memories[idx] for _, idx in scored[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._memories)
+
+
+class MemoryMirrors:
+    def __init__(self) -> None:
+        self._mirrors: Dict[str, MemoryMirror] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def get(self, user_id: str) -> MemoryMirror:
+        mirror = self._mirrors.get(user_id)
+        if mirror is None:
+            mirror = MemoryMirror(user_id)
+            self._mirrors[user_id] = mirror
+        return mirror
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(MEMORY_MIRROR_REFRESH_S)
+            for mirror in list(self._mirrors.values()):
+                if not mirror.loaded:
+                    continue
+                try:
+                    await mirror.refresh()
+                except Exception as exc:
+                    logger.warning("memory_mirror refresh failed user=%s error=%s", mirror.user_id, exc)
+
+    def start(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+
+memory_mirrors = MemoryMirrors()
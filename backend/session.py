@@ -0,0 +1,388 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+import weakref
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from agents.conversation import ConversationState
+from config import (
+    BARGE_IN_ENABLED,
+    BARGE_IN_MIN_CHARS,
+    BARGE_IN_REQUIRE_AUDIO,
+    TURN_AUDIO_DRAIN_TIMEOUT_S,
+    TURN_MERGE_WINDOW_S,
+    TURN_POLICY,
+    TURN_QUEUE_MAX,
+    WS_BINARY_AUDIO_ENABLED,
+    WS_PROTOCOL_VERSION,
+)
+from core.metrics import active_sessions, queue_depth, ttfa, ttft, turn_phase_latency, turns
+from core.tracing import Span, tracer
+from voice.pipeline import TTSPipeline
+from voice.segmenter import SentenceSegmenter
+from voice.stt import create_deepgram_connection
+
+logger = logging.getLogger(__name__)
+
+# Live sessions, read only when /metrics is scraped.
+_sessions: "weakref.WeakSet[JarvisSession]" = weakref.WeakSet()
+queue_depth.set_function(lambda: sum(len(s._pending) for s in _sessions), "pending_turns")
+queue_depth.set_function(lambda: sum(s.tts.queued for s in _sessions), "tts_sentences")
+queue_depth.set_function(lambda: sum(s.tts.buffered_bytes for s in _sessions), "tts_buffered_bytes")
+
+
+def _voice_trace(timing: dict, segments: int) -> dict:
+    def _since_start(key: str):
+        return None if timing.get(key) is None else int((timing[key] - timing["start"]) * 1000)
+
+    ttfa_ms = _since_start("first_audio")
+    entry = {
+        "agent": "voice",
+        "duration_ms": ttfa_ms or 0,
+        "status": "ok" if ttfa_ms is not None else "skipped",
+        "skipped": ttfa_ms is None,
+        "ttft_ms": _since_start("first_token"),
+        "ttfa_ms": ttfa_ms,
+        "segments": segments,
+        "first_segment_chars": timing.get("first_segment_chars", 0),
+    }
+    ttft.observe_ms(entry["ttft_ms"])
+    ttfa.observe_ms(ttfa_ms)
+    logger.info("voice ttft_ms=%s ttfa_ms=%s segments=%s", entry["ttft_ms"], ttfa_ms, segments)
+    return entry
+
+
+class JarvisSession:
+    """One /ws connection: receive loop, STT, turns and TTS playback.
+
+    The receive loop never awaits a turn. Each turn runs as its own task so
+    mic audio keeps flowing to Deepgram while Jarvis thinks or speaks, and
+    a running turn can be cancelled mid-stream (barge-in or a newer turn,
+    depending on TURN_POLICY).
+    """
+
+    def __init__(self, websocket: WebSocket, orchestrator) -> None:
+        self.websocket = websocket
+        self.orchestrator = orchestrator
+        self.conversation = ConversationState()
+        self.dg_connection = None
+        # Switched on by the client's hello; old clients never send one.
+        self.binary_audio = False
+        self._send_lock = asyncio.Lock()
+        self._turn_lock = asyncio.Lock()
+        self._turn_task: Optional[asyncio.Task] = None
+        # (text, perf_counter when it arrived, "voice" | "text")
+        self._pending: Deque[Tuple[str, float, str]] = deque(maxlen=TURN_QUEUE_MAX)
+        # (text, received_at, source) of the last turn cancelled before it answered anything.
+        self._unanswered: Optional[Tuple[str, float, str]] = None
+        self._closed = False
+        # Per-turn voice latency, filled in by stream_token and the TTS pipeline.
+        self._turn_timing: dict = {}
+        self._turn_span: Optional[Span] = None
+        # Sentences are synthesized ahead of playback but always delivered in order.
+        self.tts = TTSPipeline(self._on_sentence_audio, on_start=self._on_sentence_start, on_done=self._on_sentence_done)
+        self.stats = {"turns": 0, "interrupted": 0, "dropped": 0}
+        _sessions.add(self)
+        active_sessions.inc()
+
+    # -- sending ---------------------------------------------------------
+
+    async def send_json(self, data: dict) -> None:
+        async with self._send_lock:
+            try:
+                await self.websocket.send_text(json.dumps(data))
+            except Exception:
+                pass
+
+    async def send_audio(self, chunk: bytes) -> None:
+        if not self.binary_audio:
+            await self.send_json({"type": "audio_chunk", "data": base64.b64encode(chunk).decode("utf-8")})
+            return
+        async with self._send_lock:
+            try:
+                await self.websocket.send_bytes(chunk)
+            except Exception:
+                pass
+
+    async def _on_sentence_audio(self, chunk: bytes) -> None:
+        if self._turn_timing.get("first_audio") is None:
+            self._turn_timing["first_audio"] = time.perf_counter()
+            tracer.event("audio.first_byte_sent", parent=self._turn_span, bytes=len(chunk))
+        await self.send_audio(chunk)
+
+    async def _on_sentence_start(self, text: str) -> None:
+        await self.send_json({"type": "status", "status": "speaking"})
+
+    async def _on_sentence_done(self, text: str, error: Optional[Exception]) -> None:
+        if error is None:
+            await self.send_json({"type": "audio_done"})
+        else:
+            print(f"TTS error: {error}")
+            await self.send_json({"type": "error", "message": f"TTS error: {error}"})
+
+    # -- speech input ----------------------------------------------------
+
+    def forward_audio(self, audio_bytes: bytes) -> Optional[str]:
+        if not (self.dg_connection and self.dg_connection.is_connected()):
+            return "Audio received while STT is not connected."
+        try:
+            self.dg_connection.send(audio_bytes)
+        except Exception as e:
+            print(f"Audio send error: {e}")
+            return f"Audio send error: {e}"
+        return None
+
+    async def on_interim_transcript(self, text: str) -> None:
+        await self.send_json({"type": "interim_transcript", "text": text})
+        if BARGE_IN_ENABLED and len(text.strip()) >= BARGE_IN_MIN_CHARS:
+            if BARGE_IN_REQUIRE_AUDIO and self._turn_timing.get("first_audio") is None:
+                return
+            async with self._turn_lock:
+                if await self.interrupt("barge_in"):
+                    await self.send_json({"type": "status", "status": "listening"})
+
+    async def on_final_transcript(self, text: str) -> None:
+        received_at = time.perf_counter()
+        await self.send_json({"type": "final_transcript", "text": text})
+        await self.submit_turn(text, received_at, source="voice")
+
+    def _stop_stt(self) -> None:
+        if self.dg_connection:
+            try:
+                self.dg_connection.finish()
+            except Exception:
+                pass
+            self.dg_connection = None
+
+    # -- turns -----------------------------------------------------------
+
+    def _turn_running(self) -> bool:
+        return self._turn_task is not None and not self._turn_task.done()
+
+    async def submit_turn(self, text: str, received_at: Optional[float] = None, source: str = "text") -> None:
+        received_at = received_at or time.perf_counter()
+        async with self._turn_lock:
+            if self._turn_running():
+                if TURN_POLICY != "interrupt":
+                    if len(self._pending) == self._pending.maxlen:
+                        self.stats["dropped"] += 1
+                        turns.inc("dropped")
+                    self._pending.append((text, received_at, source))
+                    return
+                await self.interrupt("new_turn")
+            text = self._merge_unanswered(text, received_at, source)
+            self._start_turn(text, received_at, source)
+
+    def _merge_unanswered(self, text: str, received_at: float, source: str) -> str:
+        """Rejoin an utterance that STT endpointing split in two.
+
+        Only a voice final transcript arriving within TURN_MERGE_WINDOW_S of
+        an unanswered voice fragment continues it. Typed text, a stop, or a
+        later utterance is a new request, and the cancelled one is dropped.
+        """
+        unanswered, self._unanswered = self._unanswered, None
+        if unanswered is None or source != "voice":
+            return text
+        previous, previous_at, previous_source = unanswered
+        if previous_source != "voice" or received_at - previous_at > TURN_MERGE_WINDOW_S:
+            return text
+        logger.info("session merged split utterance gap_ms=%s", int((received_at - previous_at) * 1000))
+        return f"{previous} {text}"
+
+    def _start_turn(self, text: str, received_at: float, source: str = "text") -> None:
+        self.stats["turns"] += 1
+        self._turn_task = asyncio.create_task(self._run_turn(text, received_at, source))
+        self._turn_task.add_done_callback(self._on_turn_done)
+
+    def _on_turn_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            turns.inc("interrupted")
+        elif task.exception() is not None:
+            turns.inc("error")
+            logger.warning("session turn failed: %s", task.exception())
+        else:
+            turns.inc("ok")
+        if self._turn_task is task:
+            self._turn_task = None
+            if self._pending and not self._closed:
+                self._start_turn(*self._pending.popleft())
+
+    async def interrupt(self, reason: str) -> bool:
+        """Cancel the running turn, drop its queued audio and tell the client to flush playback."""
+        task = self._turn_task
+        if task is None or task.done():
+            return False
+        task.cancel()
+        await asyncio.wait([task])
+        await self.tts.reset()
+        await self.send_json({"type": "audio_flush", "reason": reason})
+        self.stats["interrupted"] += 1
+        logger.info("session turn interrupted reason=%s", reason)
+        return True
+
+    async def _run_turn(self, user_message: str, received_at: float, source: str = "text") -> None:
+        # The root span starts when the text arrived, so queueing behind a previous turn shows up.
+        with tracer.turn("turn", start_perf=received_at, chars=len(user_message)) as root:
+            self._turn_span = root
+            wait = tracer.start_span("ws.receive", start_perf=received_at)
+            if wait is not None:
+                wait.end()
+            try:
+                await self._converse(user_message, received_at, source)
+            finally:
+                self._turn_span = None
+
+    async def _converse(self, user_message: str, received_at: float, source: str) -> None:
+        await self.send_json({"type": "status", "status": "thinking"})
+
+        segmenter = SentenceSegmenter()
+        tokens: List[str] = []
+        timing = self._turn_timing
+        timing.clear()
+        timing.update({"start": time.perf_counter(), "first_token": None, "first_audio": None})
+
+        async def stream_token(token: str):
+            if timing["first_token"] is None:
+                timing["first_token"] = time.perf_counter()
+                tracer.event("llm.first_token_sent", parent=self._turn_span)
+            tokens.append(token)
+            await self.send_json({"type": "llm_token", "token": token})
+            # Sentences hang off the turn, not the chat agent that happens to be streaming.
+            with tracer.activate(self._turn_span):
+                for segment in segmenter.push(token):
+                    if "first_segment_chars" not in timing:
+                        timing["first_segment_chars"] = len(segment)
+                    await self.tts.submit(segment)
+
+        try:
+            full_response, trace, _ = await self.orchestrator.process(
+                user_message,
+                self.conversation.history(),
+                stream_callback=stream_token
+            )
+
+            # Speak any remaining text
+            tail = segmenter.flush()
+            if tail:
+                timing.setdefault("first_segment_chars", len(tail))
+                await self.tts.submit(tail)
+
+            # Wait for all speech to finish (avoid hanging forever)
+            drain_start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.tts.drain(), timeout=TURN_AUDIO_DRAIN_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                await self.send_json({"type": "error", "message": "TTS timed out. Continuing."})
+            turn_phase_latency.observe(time.perf_counter() - drain_start, "audio_drain")
+        except asyncio.CancelledError:
+            # Keep what the user already heard so the next turn has the context.
+            partial = "".join(tokens).strip()
+            if partial:
+                self.conversation.append_turn(user_message, partial)
+            else:
+                # Nothing answered yet; submit_turn decides whether the next input continues it.
+                self._unanswered = (user_message, received_at, source)
+            raise
+
+        self.conversation.append_turn(user_message, full_response)
+        turn_phase_latency.observe(time.perf_counter() - timing["start"], "turn")
+        trace.append(_voice_trace(timing, segmenter.emitted))
+
+        await self.send_json({"type": "response_complete", "full_text": full_response})
+        turn_id = self._turn_span.trace_id if self._turn_span is not None else None
+        await self.send_json({"type": "agent_trace", "trace": trace, "turn_id": turn_id})
+        await self.send_json({"type": "status", "status": "idle"})
+
+        # Summarize older turns while the user is reading/listening; the next
+        # turn picks up whatever has been swapped in by then.
+        self.conversation.schedule_compaction()
+
+    # -- receive loop ----------------------------------------------------
+
+    async def _handle_control(self, data: dict, received_at: float) -> None:
+        msg_type = data.get("type")
+
+        if msg_type == "hello":
+            self.binary_audio = WS_BINARY_AUDIO_ENABLED and bool(data.get("binary_audio"))
+            await self.send_json({"type": "hello_ack", "protocol": WS_PROTOCOL_VERSION, "binary_audio": self.binary_audio})
+
+        elif msg_type == "start_listening":
+            loop = asyncio.get_running_loop()
+            try:
+                self.dg_connection = create_deepgram_connection(
+                    self.on_interim_transcript, self.on_final_transcript, loop
+                )
+                if self.dg_connection:
+                    await self.send_json({"type": "status", "status": "listening"})
+                else:
+                    await self.send_json({"type": "status", "status": "idle"})
+                    await self.send_json({"type": "error", "message": "Microphone connection failed. Check Deepgram key."})
+            except Exception as e:
+                await self.send_json({"type": "status", "status": "idle"})
+                await self.send_json({"type": "error", "message": f"STT setup error: {e}"})
+
+        elif msg_type == "audio_chunk":
+            try:
+                error = self.forward_audio(base64.b64decode(data["data"]))
+            except Exception as e:
+                error = f"Audio send error: {e}"
+            if error:
+                await self.send_json({"type": "error", "message": error})
+
+        elif msg_type == "stop_listening":
+            self._stop_stt()
+            self._unanswered = None
+            await self.send_json({"type": "status", "status": "idle"})
+
+        elif msg_type == "text_message":
+            if "text" not in data:
+                await self.send_json({"type": "error", "message": "Missing text in text_message."})
+            else:
+                await self.submit_turn(data["text"], received_at)
+
+        else:
+            await self.send_json({"type": "error", "message": f"Unknown message type: {msg_type}"})
+
+    async def run(self) -> None:
+        self.tts.start()
+        try:
+            while True:
+                frame = await self.websocket.receive()
+                received_at = time.perf_counter()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                if frame.get("bytes") is not None:
+                    # Binary frames are always raw mic audio; no decode, no copy.
+                    error = self.forward_audio(frame["bytes"])
+                    if error:
+                        await self.send_json({"type": "error", "message": error})
+                    continue
+                try:
+                    data = json.loads(frame.get("text") or "")
+                except json.JSONDecodeError:
+                    await self.send_json({"type": "error", "message": "Invalid JSON from client."})
+                    continue
+                await self._handle_control(data, received_at)
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            print(f"WebSocket error: {e}")
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        if not self._closed:
+            active_sessions.dec()
+        self._closed = True
+        self._pending.clear()
+        self._stop_stt()
+        if self._turn_running():
+            self._turn_task.cancel()
+            await asyncio.wait([self._turn_task])
+        await self.tts.close()
+        await self.conversation.aclose()
@@ -1,9 +1,50 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Any, Dict
+
 from tavily import TavilyClient
-import httpx
-from config import TAVILY_API_KEY
+from config import (
+    SEARCH_CACHE_MAX_BYTES,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_TTLS,
+    TAVILY_API_KEY,
+    TAVILY_BASE_URL,
+)
+from core.cache import SingleFlight, TTLCache
+from core.http_pool import http_pool
+
+logger = logging.getLogger(__name__)
 
 client = TavilyClient(api_key=TAVILY_API_KEY)
-TAVILY_URL = "https://api.tavily.com/search"
+TAVILY_URL = f"{TAVILY_BASE_URL}/search"
+
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "to", "in", "on", "for", "and", "or",
+    "what", "whats", "who", "whos", "how", "do", "does", "did", "can", "could", "would", "should",
+    "me", "my", "i", "you", "your", "tell", "about", "please", "jarvis", "hey", "it", "its", "that",
+    "this", "with", "at", "by", "from", "some", "any",
+}
+_NEWS_RE = re.compile(
+    r"\b(latest|news|today|tonight|now|current|currently|live|breaking|score|scores|price|prices|"
+    r"stock|stocks|yesterday|this week|weather|trending)\b"
+)
+_RECENT_RE = re.compile(r"\b(20\d\d|new|newest|recent|recently|release|released|update|updated|upcoming|schedule)\b")
+
+_cache = TTLCache(
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    ttl_s=SEARCH_CACHE_TTLS["evergreen"],
+    max_weight=SEARCH_CACHE_MAX_BYTES,
+    weigher=lambda payload: sum(
+        len(r.get("title", "")) + len(r.get("content", "")) + len(r.get("url", ""))
+        for r in payload.get("results", [])
+    ),
+)
+_flights = SingleFlight()
+
 
 def web_search(query: str) -> str:
     response = client.search(
@@ -28,7 +69,84 @@ async def async_web_search(query: str, max_results: int = 5) -> dict:
         "search_depth": "basic",
         "max_results": max_results,
     }
-    async with httpx.AsyncClient(timeout=5) as client_http:
-        response = await client_http.post(TAVILY_URL, json=payload)
-        response.raise_for_status()
-        return response.json()
+    response = await http_pool.client("search").post(TAVILY_URL, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+def normalize_query(query: str) -> str:
+    text = re.sub(r"[^\w\s]", " ", query.lower().replace("'", ""))
+    tokens = [t for t in text.split() if t not in _STOPWORDS]
+    return " ".join(sorted(set(tokens))) or " ".join(text.split())
+
+
+def freshness_class(query: str) -> str:
+    text = query.lower()
+    if _NEWS_RE.search(text):
+        return "news"
+    if _RECENT_RE.search(text):
+        return "recent"
+    return "evergreen"
+
+
+async def async_web_search_cached(query: str, max_results: int = 5) -> dict:
+    key = f"{max_results}:{normalize_query(query)}"
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def _fetch() -> dict:
+        response = await async_web_search(query, max_results=max_results)
+        slim = {
+            "results": [
+                {"title": r.get("title", ""), "content": r.get("content", ""), "url": r.get("url", "")}
+                for r in response.get("results", [])
+            ]
+        }
+        _cache.set(key, slim, ttl_s=SEARCH_CACHE_TTLS[freshness_class(query)])
+        return slim
+
+    return await _flights.do(key, _fetch)
+
+
+def search_cache_stats() -> Dict[str, Any]:
+    stats = _cache.stats()
+    stats["coalesced"] = _flights.shared
+    return stats
+
+
+def _write_snapshot(path: str, entries: list) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(entries, fh)
+    os.replace(tmp_path, path)
+
+
+def _read_snapshot(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+async def save_search_cache(path: str = SEARCH_CACHE_PATH) -> None:
+    if not path:
+        return
+    entries = [[key, value, ttl] for key, value, ttl in _cache.snapshot()]
+    try:
+        await asyncio.to_thread(_write_snapshot, path, entries)
+        logger.info("search_cache saved entries=%s path=%s", len(entries), path)
+    except Exception as exc:
+        logger.warning("search_cache save failed: %s", exc)
+
+
+async def load_search_cache(path: str = SEARCH_CACHE_PATH) -> None:
+    if not path or not os.path.exists(path):
+        return
+    try:
+        entries = await asyncio.to_thread(_read_snapshot, path)
+    except Exception as exc:
+        logger.warning("search_cache load failed: %s", exc)
+        return
+    for key, value, ttl in entries:
+        if ttl > 0:
+            _cache.set(key, value, ttl_s=ttl)
+    logger.info("search_cache loaded entries=%s path=%s", len(_cache), path)
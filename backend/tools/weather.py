@@ -1,8 +1,45 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Set, Tuple
+
 import httpx
-from config import OPENWEATHER_API_KEY
+from config import (
+    OPENWEATHER_API_KEY,
+    OPENWEATHER_BASE_URL,
+    WEATHER_CACHE_MAX_ENTRIES,
+    WEATHER_CACHE_STALE_S,
+    WEATHER_CACHE_TTL_S,
+)
+from core.cache import SingleFlight, TTLCache
+from core.http_pool import http_pool
+
+logger = logging.getLogger(__name__)
+
+_CITY_ALIASES = {
+    "nyc": "new york",
+    "new york city": "new york",
+    "ny": "new york",
+    "sf": "san francisco",
+    "la": "los angeles",
+    "dc": "washington",
+    "washington dc": "washington",
+    "bombay": "mumbai",
+    "bangalore": "bengaluru",
+    "calcutta": "kolkata",
+    "madras": "chennai",
+    "peking": "beijing",
+    "saigon": "ho chi minh city",
+}
+
+# Entries live for WEATHER_CACHE_STALE_S; past WEATHER_CACHE_TTL_S they are
+# served stale while a single background refresh runs.
+_cache = TTLCache(max_entries=WEATHER_CACHE_MAX_ENTRIES, ttl_s=WEATHER_CACHE_STALE_S)
+_flights = SingleFlight()
+_refresh_tasks: Set[asyncio.Task] = set()
 
 def get_weather(city: str) -> str:
-    url = "https://api.openweathermap.org/data/2.5/weather"
+    url = f"{OPENWEATHER_BASE_URL}/data/2.5/weather"
     params = {
         "q": city,
         "appid": OPENWEATHER_API_KEY,
@@ -21,13 +58,57 @@ def get_weather(city: str) -> str:
     )
 
 async def async_get_weather(city: str) -> dict:
-    url = "https://api.openweathermap.org/data/2.5/weather"
+    url = f"{OPENWEATHER_BASE_URL}/data/2.5/weather"
     params = {
         "q": city,
         "appid": OPENWEATHER_API_KEY,
         "units": "metric",
     }
-    async with httpx.AsyncClient(timeout=5) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+    response = await http_pool.client("weather").get(url, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def normalize_city(city: str) -> str:
+    key = re.sub(r"[^\w\s,'-]", "", city.lower())
+    key = re.sub(r"\s+", " ", key).strip(" ,")
+    return _CITY_ALIASES.get(key, key)
+
+
+async def _fetch_and_store(key: str) -> dict:
+    raw = await async_get_weather(key)
+    _cache.set(key, raw)
+    return raw
+
+
+def _refresh_in_background(key: str) -> None:
+    if _flights.in_flight(key):
+        return
+    task = _flights.start(key, lambda: _fetch_and_store(key))
+    _refresh_tasks.add(task)
+
+    def _done(t: asyncio.Task) -> None:
+        _refresh_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.warning("weather refresh failed city=%s error=%s", key, t.exception())
+
+    task.add_done_callback(_done)
+
+
+async def async_get_weather_cached(city: str) -> Tuple[dict, float]:
+    """Return (raw OpenWeather payload, cache age in seconds); age is 0.0 for a fresh fetch."""
+    key = normalize_city(city)
+    cached = _cache.get_with_age(key)
+    if cached is not None:
+        raw, age_s = cached
+        if age_s > WEATHER_CACHE_TTL_S:
+            _refresh_in_background(key)
+        return raw, age_s
+    raw = await _flights.do(key, lambda: _fetch_and_store(key))
+    return raw, 0.0
+
+
+def weather_cache_stats() -> Dict[str, Any]:
+    stats = _cache.stats()
+    stats["coalesced"] = _flights.shared
+    return stats
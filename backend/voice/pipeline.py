@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Deque, Optional
+
+from config import TTS_PREFETCH_DEPTH, TTS_PREFETCH_MAX_BYTES
+from core.tracing import tracer
+from voice.tts import text_to_speech_stream
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ("text", "chunks", "finished", "error", "task", "parent_span")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        # Producer/deliverer tasks don't inherit the submitter's span, so it is kept here.
+        self.parent_span = tracer.current()
+        self.chunks: Deque[bytes] = deque()
+        self.finished = False
+        self.error: Optional[Exception] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class TTSPipeline:
+    """Synthesizes upcoming sentences while the current one streams, delivering strictly in order.
+
+    The head sentence streams straight through to the client. Up to
+    `depth` sentences behind it are synthesized concurrently into memory,
+    bounded by `max_buffer_bytes`; a producer that would exceed the cap
+    waits (holding its upstream stream open) until the head drains or it
+    becomes the head itself.
+    """
+
+    def __init__(
+        self,
+        send_audio: Callable[[bytes], Awaitable[None]],
+        on_start: Optional[Callable[[str], Awaitable[None]]] = None,
+        on_done: Optional[Callable[[str, Optional[Exception]], Awaitable[None]]] = None,
+        synthesize: Callable[[str], AsyncIterator[bytes]] = text_to_speech_stream,
+        depth: int = TTS_PREFETCH_DEPTH,
+        max_buffer_bytes: int = TTS_PREFETCH_MAX_BYTES,
+    ) -> None:
+        self._send_audio = send_audio
+        self._on_start = on_start
+        self._on_done = on_done
+        self._synthesize = synthesize
+        self.depth = depth
+        self.max_buffer_bytes = max_buffer_bytes
+        self._order: Deque[_Job] = deque()
+        self._cond = asyncio.Condition()
+        self._buffered = 0
+        self._closed = False
+        self._deliver_task: Optional[asyncio.Task] = None
+        self.stats = {"sentences": 0, "prefetched": 0, "cap_waits": 0}
+
+    @property
+    def _head(self) -> Optional[_Job]:
+        return self._order[0] if self._order else None
+
+    @property
+    def queued(self) -> int:
+        """Sentences submitted but not fully delivered."""
+        return len(self._order)
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._buffered
+
+    def start(self) -> None:
+        if self._deliver_task is None:
+            self._deliver_task = asyncio.create_task(self._deliver())
+
+    async def submit(self, text: str) -> None:
+        async with self._cond:
+            self._order.append(_Job(text))
+            self.stats["sentences"] += 1
+            self._start_ready()
+            self._cond.notify_all()
+
+    def _start_ready(self) -> None:
+        for index, job in enumerate(self._order):
+            if index > self.depth:
+                break
+            if job.task is None:
+                if index > 0:
+                    self.stats["prefetched"] += 1
+                job.task = asyncio.create_task(self._produce(job))
+
+    async def _produce(self, job: _Job) -> None:
+        span = tracer.start_span("tts.synthesize", parent=job.parent_span, chars=len(job.text))
+        status = None
+        try:
+            # Closed explicitly so a cancelled producer releases its pooled TTS connection now, not at GC.
+            async with aclosing(self._synthesize(job.text)) as stream:
+                async for chunk in stream:
+                    if not chunk:
+                        continue
+                    if span is not None and "first_chunk_ms" not in span.attrs:
+                        span.set(first_chunk_ms=round((time.perf_counter() - span.start_perf) * 1000, 1))
+                    async with self._cond:
+                        if job is not self._head and self._buffered + len(chunk) > self.max_buffer_bytes:
+                            self.stats["cap_waits"] += 1
+                            await self._cond.wait_for(
+                                lambda: job is self._head or self._buffered + len(chunk) <= self.max_buffer_bytes
+                            )
+                        job.chunks.append(chunk)
+                        self._buffered += len(chunk)
+                        self._cond.notify_all()
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as exc:
+            status = "error"
+            job.error = exc
+        finally:
+            if span is not None:
+                span.end(status)
+            async with self._cond:
+                job.finished = True
+                self._cond.notify_all()
+
+    async def _deliver(self) -> None:
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: self._order or self._closed)
+                if not self._order:
+                    return
+                job = self._order[0]
+            span = tracer.start_span("tts.play", parent=job.parent_span, chars=len(job.text))
+            try:
+                if self._on_start:
+                    await self._on_start(job.text)
+                while True:
+                    async with self._cond:
+                        await self._cond.wait_for(lambda: job.chunks or job.finished)
+                        if not job.chunks:
+                            break
+                        chunk = job.chunks.popleft()
+                        self._buffered -= len(chunk)
+                        self._cond.notify_all()
+                    await self._send_audio(chunk)
+            except asyncio.CancelledError:
+                if span is not None:
+                    span.end("cancelled")
+                raise
+            if job.error is not None:
+                logger.warning("tts_pipeline sentence failed: %s", job.error)
+            if span is not None:
+                span.end("error" if job.error is not None else None)
+            if self._on_done:
+                await self._on_done(job.text, job.error)
+            async with self._cond:
+                if self._order and self._order[0] is job:
+                    self._order.popleft()
+                self._start_ready()
+                self._cond.notify_all()
+
+    async def drain(self) -> None:
+        """Wait until everything submitted so far has been delivered."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._order)
+
+    async def reset(self) -> None:
+        """Drop every queued and playing sentence, then accept new ones."""
+        await self.close()
+        self._closed = False
+        self.start()
+
+    async def close(self) -> None:
+        async with self._cond:
+            self._closed = True
+            jobs = list(self._order)
+            self._order.clear()
+            self._buffered = 0
+            self._cond.notify_all()
+        for job in jobs:
+            if job.task is not None:
+                job.task.cancel()
+        if self._deliver_task is not None:
+            self._deliver_task.cancel()
+            try:
+                await self._deliver_task
+            except asyncio.CancelledError:
+                pass
+            self._deliver_task = None
@@ -0,0 +1,136 @@
+from typing import List, Optional
+
+from config import (
+    SEGMENT_FIRST_CLAUSE_CHARS,
+    SEGMENT_FIRST_MAX_CHARS,
+    SEGMENT_FIRST_MIN_CHARS,
+    SEGMENT_MAX_CHARS,
+    SEGMENT_MIN_CHARS,
+)
+
+_TERMINALS = ".!?…"
+_CLAUSE_MARKS = ",;:—"
+_CLOSERS = "\"')]”’"
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc", "approx",
+    "no", "fig", "inc", "ltd", "co", "corp", "dept", "est", "jan", "feb", "mar", "apr",
+    "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec", "e.g", "i.e", "a.m", "p.m",
+    "u.s", "u.k", "ph.d",
+}
+
+
+class SentenceSegmenter:
+    """Splits a token stream into speakable chunks as it arrives.
+
+    Each push() only scans the characters added since the last call. A "."
+    is a boundary only when followed by whitespace and not part of an
+    abbreviation ("Dr."), an initial ("J."), or a list marker ("1."), so
+    decimals and URLs never split.
+    """
+
+    def __init__(
+        self,
+        first_min_chars: int = SEGMENT_FIRST_MIN_CHARS,
+        first_clause_chars: int = SEGMENT_FIRST_CLAUSE_CHARS,
+        first_max_chars: int = SEGMENT_FIRST_MAX_CHARS,
+        min_chars: int = SEGMENT_MIN_CHARS,
+        max_chars: int = SEGMENT_MAX_CHARS,
+    ) -> None:
+        self.first_min_chars = first_min_chars
+        self.first_clause_chars = first_clause_chars
+        self.first_max_chars = first_max_chars
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buf = ""
+        self._scan = 0
+        self._soft_cut = 0
+        self.emitted = 0
+
+    def push(self, text: str) -> List[str]:
+        self._buf += text
+        out: List[str] = []
+        buf = self._buf
+        i = self._scan
+        # The last character needs its successor before it can be judged.
+        while i < len(buf) - 1:
+            kind = self._boundary(buf, i)
+            cut = i + 1
+            first = self.emitted == 0
+            if (kind == "strong" and cut >= (self.first_min_chars if first else self.min_chars)) or (
+                kind == "weak" and first and cut >= self.first_clause_chars
+            ):
+                segment = self._take(cut)
+                if segment:
+                    out.append(segment)
+                buf, i = self._buf, 0
+                continue
+            if kind is not None:
+                self._soft_cut = cut
+            if cut >= (self.first_max_chars if first else self.max_chars):
+                segment = self._take(self._force_cut(buf, cut))
+                if segment:
+                    out.append(segment)
+                buf, i = self._buf, 0
+                continue
+            i += 1
+        self._scan = i
+        return out
+
+    def flush(self) -> Optional[str]:
+        segment = self._buf.strip()
+        self._buf, self._scan, self._soft_cut = "", 0, 0
+        if not segment:
+            return None
+        self.emitted += 1
+        return segment
+
+    def _take(self, cut: int) -> str:
+        segment = self._buf[:cut].strip()
+        self._buf = self._buf[cut:].lstrip()
+        self._scan = 0
+        self._soft_cut = 0
+        if segment:
+            self.emitted += 1
+        return segment
+
+    def _force_cut(self, buf: str, cut: int) -> int:
+        if self._soft_cut:
+            return self._soft_cut
+        space = buf.rfind(" ", 0, cut)
+        return space + 1 if space > 0 else cut
+
+    @staticmethod
+    def _boundary(buf: str, i: int) -> Optional[str]:
+        ch = buf[i]
+        if ch == "\n":
+            return "strong"
+        if not buf[i + 1].isspace():
+            return None
+        if ch in _CLOSERS and i > 0:
+            i -= 1
+            ch = buf[i]
+        if ch in _CLAUSE_MARKS:
+            return "weak"
+        if ch not in _TERMINALS:
+            return None
+        if ch == "." and not _ends_sentence(buf, i):
+            return None
+        return "strong"
+
+
+def _ends_sentence(buf: str, dot: int) -> bool:
+    start = dot
+    while start > 0 and (buf[start - 1].isalnum() or buf[start - 1] == "."):
+        start -= 1
+    word = buf[start:dot].lower()
+    if not word:
+        return True
+    if word in _ABBREVIATIONS:
+        return False
+    if len(word) == 1 and word.isalpha():
+        return False
+    if word.isdigit():
+        # "1." at the start of a line is a list marker, not a full stop.
+        line_start = buf.rfind("\n", 0, start) + 1
+        return bool(buf[line_start:start].strip())
+    return True
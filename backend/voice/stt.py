@@ -1,8 +1,8 @@
 import asyncio
-from deepgram import DeepgramClient, LiveTranscriptionEvents, LiveOptions
-from config import DEEPGRAM_API_KEY
+from deepgram import DeepgramClient, DeepgramClientOptions, LiveTranscriptionEvents, LiveOptions
+from config import DEEPGRAM_API_KEY, DEEPGRAM_URL
 
-deepgram = DeepgramClient(DEEPGRAM_API_KEY)
+deepgram = DeepgramClient(DEEPGRAM_API_KEY, DeepgramClientOptions(url=DEEPGRAM_URL) if DEEPGRAM_URL else None)
 
 def create_deepgram_connection(on_transcript, on_final, loop):
     try:
@@ -1,30 +1,84 @@
-import httpx
-from config import ELEVENLABS_API_KEY, ELEVENLABS_VOICE_ID
+import logging
 
-async def text_to_speech_stream(text: str):
+from config import ELEVENLABS_API_KEY, ELEVENLABS_BASE_URL, ELEVENLABS_VOICE_ID, TTS_CACHE_ENABLED
+from core.http_pool import http_pool
+from voice.tts_cache import iter_chunks, tts_cache, tts_cache_key
+
+logger = logging.getLogger(__name__)
+
+TTS_MODEL_ID = "eleven_turbo_v2_5"   # Lowest latency model
+TTS_OUTPUT_FORMAT = "mp3_44100_128"
+TTS_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.75,
+    "style": 0.0,
+    "use_speaker_boost": True
+}
+
+
+async def _store(key: str, parts) -> bool:
+    """Cache a finished render; a failed write only costs the next hit, never the audio already sent."""
+    try:
+        await tts_cache.put(key, b"".join(parts))
+    except Exception as exc:
+        logger.warning("tts_cache put failed key=%s error=%s", key[:12], exc)
+        return False
+    return True
+
+
+def _cache_key(text: str) -> str:
+    return tts_cache_key(text, ELEVENLABS_VOICE_ID or "", TTS_MODEL_ID, TTS_VOICE_SETTINGS, TTS_OUTPUT_FORMAT)
+
+
+async def _synthesize(text: str):
     """Stream audio chunks from ElevenLabs."""
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{ELEVENLABS_VOICE_ID}/stream"
-    
+    url = f"{ELEVENLABS_BASE_URL}/v1/text-to-speech/{ELEVENLABS_VOICE_ID}/stream"
+
     headers = {
         "xi-api-key": ELEVENLABS_API_KEY,
         "Content-Type": "application/json"
     }
-    
+
     payload = {
         "text": text,
-        "model_id": "eleven_turbo_v2_5",   # Lowest latency model
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.75,
-            "style": 0.0,
-            "use_speaker_boost": True
-        },
-        "output_format": "mp3_44100_128"
+        "model_id": TTS_MODEL_ID,
+        "voice_settings": TTS_VOICE_SETTINGS,
+        "output_format": TTS_OUTPUT_FORMAT
     }
-    
-    async with httpx.AsyncClient(timeout=30) as client:
-        async with client.stream("POST", url, headers=headers, json=payload) as response:
-            response.raise_for_status()
-            async for chunk in response.aiter_bytes(chunk_size=4096):
-                if chunk:
-                    yield chunk
+
+    async with http_pool.client("tts").stream("POST", url, headers=headers, json=payload) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes(chunk_size=4096):
+            if chunk:
+                yield chunk
+
+
+async def text_to_speech_stream(text: str):
+    """Stream audio for `text`, from the disk cache when this exact rendering exists."""
+    if not TTS_CACHE_ENABLED:
+        async for chunk in _synthesize(text):
+            yield chunk
+        return
+
+    key = _cache_key(text)
+    cached = await tts_cache.get(key)
+    if cached is not None:
+        for chunk in iter_chunks(cached):
+            yield chunk
+        return
+
+    # Tee the live stream; only complete renders are stored.
+    parts = []
+    async for chunk in _synthesize(text):
+        parts.append(chunk)
+        yield chunk
+    await _store(key, parts)
+
+
+async def render_to_cache(text: str) -> bool:
+    """Synthesize `text` into the cache unless already there; True when it was rendered."""
+    key = _cache_key(text)
+    if key in tts_cache:
+        return False
+    parts = [chunk async for chunk in _synthesize(text)]
+    return await _store(key, parts)
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from config import TTS_CACHE_CHUNK_BYTES, TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+def tts_cache_key(text: str, voice_id: str, model_id: str, voice_settings: Dict[str, Any], output_format: str) -> str:
+    """sha256 over everything that changes the rendered audio."""
+    material = json.dumps(
+        {"text": text, "voice": voice_id, "model": model_id, "settings": voice_settings, "format": output_format},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def iter_chunks(data: bytes, size: int = TTS_CACHE_CHUNK_BYTES) -> Iterator[memoryview]:
+    """Slices of the cached audio without copying it."""
+    view = memoryview(data)
+    for offset in range(0, len(view), size):
+        yield view[offset : offset + size]
+
+
+class TTSAudioCache:
+    """Rendered audio on disk, one file per content hash, evicted LRU by total size.
+
+    The index (key -> size, in LRU order) lives in memory and is rebuilt
+    from file mtimes at startup; file reads and writes run off the loop.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        # Keys being written; a concurrent put for the same key is dropped rather than double-counted.
+        self._writing: Set[str] = set()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".audio")
+
+    def _scan(self) -> List[tuple]:
+        entries = []
+        os.makedirs(self.directory, exist_ok=True)
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".audio"):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                entries.append((stat.st_mtime, name[: -len(".audio")], stat.st_size))
+        entries.sort()
+        return entries
+
+    async def load(self) -> None:
+        entries = await asyncio.to_thread(self._scan)
+        self._index.clear()
+        self.size_bytes = 0
+        for _, key, size in entries:
+            self._index[key] = size
+            self.size_bytes += size
+        logger.info("tts_cache loaded entries=%s bytes=%s", len(self._index), self.size_bytes)
+        await self._evict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key not in self._index:
+            self.misses += 1
+            return None
+        try:
+            data = await asyncio.to_thread(_read_and_touch, self._path(key))
+        except OSError:
+            self._forget(key)
+            self.misses += 1
+            return None
+        self._index.move_to_end(key)
+        self.hits += 1
+        return data
+
+    async def put(self, key: str, data: bytes) -> None:
+        if not data or len(data) > self.max_bytes or key in self._index or key in self._writing:
+            return
+        self._writing.add(key)
+        try:
+            await asyncio.to_thread(_write_atomic, self._path(key), data)
+        finally:
+            self._writing.discard(key)
+        self._index[key] = len(data)
+        self.size_bytes += len(data)
+        await self._evict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def _forget(self, key: str) -> None:
+        self.size_bytes -= self._index.pop(key, 0)
+
+    async def _evict(self) -> None:
+        doomed = []
+        while self.size_bytes > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._forget(key)
+            doomed.append(self._path(key))
+            self.evictions += 1
+        if doomed:
+            await asyncio.to_thread(_remove_all, doomed)
+
+    def start_warmup(self, phrases: List[str], render) -> None:
+        """Render missing phrases in the background; `render(text)` must fill the cache."""
+        if self._warmup_task is None or self._warmup_task.done():
+            self._warmup_task = asyncio.create_task(self._warmup(phrases, render))
+
+    async def _warmup(self, phrases: List[str], render) -> None:
+        rendered = 0
+        for phrase in phrases:
+            try:
+                if await render(phrase):
+                    rendered += 1
+            except Exception as exc:
+                logger.warning("tts_cache warmup failed phrase=%r error=%s", phrase, exc)
+        logger.info("tts_cache warmup rendered=%s of=%s", rendered, len(phrases))
+
+    async def stop(self) -> None:
+        if self._warmup_task and not self._warmup_task.done():
+            self._warmup_task.cancel()
+            try:
+                await self._warmup_task
+            except asyncio.CancelledError:
+                pass
+        self._warmup_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def _read_and_touch(path: str) -> bytes:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    os.utime(path)
+    return data
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _remove_all(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+tts_cache = TTSAudioCache()
@@ -53,6 +53,10 @@ export default function App() {
           setCurrentResponse("");
           setStatus("idle");
           break;
+        case "audio_flush":
+          // Interrupted mid-answer; playback was already stopped by the socket client.
+          setCurrentResponse("");
+          break;
         case "error":
           setMessages((prev) => [...prev, { role: "system", content: `Error: ${data.message}` }]);
           setStatus("idle");
@@ -6,22 +6,40 @@ class JarvisWebSocket {
     this.audioContext = null;
     this.audioQueue = [];
     this.isPlaying = false;
+    this.currentSource = null;
+    // Raw binary audio frames once the server acks our hello; base64 JSON until then.
+    this.binaryAudio = false;
   }
 
   connect() {
     this.ws = new WebSocket("ws://localhost:8000/ws");
+    this.ws.binaryType = "arraybuffer";
     this.ws.onmessage = (event) => {
+      if (typeof event.data !== "string") {
+        this.playAudio(event.data);
+        return;
+      }
       const data = JSON.parse(event.data);
       this.handleMessage(data);
     };
-    this.ws.onopen = () => this.onMessage({ type: "connected" });
+    this.ws.onopen = () => {
+      this.binaryAudio = false;
+      this.send({ type: "hello", protocol: 2, binary_audio: true });
+      this.onMessage({ type: "connected" });
+    };
     this.ws.onclose = () => this.onMessage({ type: "disconnected" });
     this.ws.onerror = () => this.onMessage({ type: "error", message: "WebSocket connection error." });
   }
 
   handleMessage(data) {
-    if (data.type === "audio_chunk") {
+    if (data.type === "hello_ack") {
+      this.binaryAudio = !!data.binary_audio;
+    } else if (data.type === "audio_chunk") {
       this.queueAudio(data.data);
+    } else if (data.type === "audio_flush") {
+      // The turn was interrupted: stop what is playing and drop what is queued.
+      this.flushAudio();
+      this.onMessage(data);
     } else {
       this.onMessage(data);
     }
@@ -37,13 +55,16 @@ class JarvisWebSocket {
   }
 
   async queueAudio(base64Data) {
+    const binary = atob(base64Data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    await this.playAudio(bytes.buffer);
+  }
+
+  async playAudio(arrayBuffer) {
     await this.ensureAudioContext();
     try {
-      const binary = atob(base64Data);
-      const bytes = new Uint8Array(binary.length);
-      for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
-      
-      const buffer = await this.audioContext.decodeAudioData(bytes.buffer);
+      const buffer = await this.audioContext.decodeAudioData(arrayBuffer);
       this.audioQueue.push(buffer);
       if (!this.isPlaying) this.playNext();
     } catch (err) {
@@ -54,16 +75,34 @@ class JarvisWebSocket {
   playNext() {
     if (this.audioQueue.length === 0) {
       this.isPlaying = false;
+      this.currentSource = null;
       return;
     }
     this.isPlaying = true;
     const source = this.audioContext.createBufferSource();
     source.buffer = this.audioQueue.shift();
     source.connect(this.audioContext.destination);
-    source.onended = () => this.playNext();
+    source.onended = () => {
+      if (this.currentSource === source) this.playNext();
+    };
+    this.currentSource = source;
     source.start();
   }
 
+  flushAudio() {
+    this.audioQueue = [];
+    const source = this.currentSource;
+    this.currentSource = null;
+    this.isPlaying = false;
+    if (source) {
+      try {
+        source.stop();
+      } catch (err) {
+        // Already stopped.
+      }
+    }
+  }
+
   async startListening() {
     let stream;
     try {
@@ -93,6 +132,11 @@ class JarvisWebSocket {
     };
     this.mediaRecorder.ondataavailable = async (event) => {
       if (event.data.size > 0) {
+        if (this.binaryAudio) {
+          // The Blob goes out as one binary frame as-is.
+          this.sendBinary(event.data);
+          return;
+        }
         try {
           const buffer = await event.data.arrayBuffer();
           const base64 = btoa(String.fromCharCode(...new Uint8Array(buffer)));
@@ -124,6 +168,12 @@ class JarvisWebSocket {
     this.send({ type: "text_message", text });
   }
 
+  sendBinary(data) {
+    if (this.ws?.readyState === WebSocket.OPEN) {
+      this.ws.send(data);
+    }
+  }
+
   send(data) {
     if (this.ws?.readyState === WebSocket.OPEN) {
       this.ws.send(JSON.stringify(data));